@@ -0,0 +1,65 @@
+"""
+Benchmark de arranque: tiempo de importar main y crear la app en un intérprete nuevo,
+y tiempo hasta que los modelos de IA quedan listos (carga en segundo plano).
+
+Cada repetición es un subproceso independiente, para medir el arranque en frío
+como lo ve un worker de gunicorn, un comando `flask ...` o una corrida de tests.
+
+Uso: python -m benchmarks.bench_arranque [--repeticiones 10] [--json salida.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.comun import emitir_resultados, resumir
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Código ejecutado en cada subproceso; imprime los tiempos como JSON.
+_SCRIPT = """
+import json, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+app = main.create_app()
+t2 = time.perf_counter()
+from services.ai_service import cargador_modelos
+cargador_modelos.obtener()
+t3 = time.perf_counter()
+print(json.dumps({"importar_s": t1 - t0, "create_app_s": t2 - t1, "modelos_listos_s": t3 - t0}))
+"""
+
+
+def _medir_una_vez(entorno):
+    salida = subprocess.run(
+        [sys.executable, "-c", _SCRIPT], cwd=RAIZ, env=entorno,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def ejecutar(repeticiones):
+    entorno = dict(os.environ)
+    entorno.setdefault("BMIS_ESTADO_DIR", tempfile.mkdtemp(prefix="bmis_bench_"))
+    # No hace falta una base de datos accesible: la precarga de buffers solo registra el error.
+
+    muestras = [_medir_una_vez(entorno) for _ in range(repeticiones)]
+    resultados = {
+        metrica: resumir([m[metrica] for m in muestras])
+        for metrica in ("importar_s", "create_app_s", "modelos_listos_s")
+    }
+    resultados["importar_mas_create_app"] = resumir(
+        [m["importar_s"] + m["create_app_s"] for m in muestras]
+    )
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=10)
+    parser.add_argument("--json", help="Ruta donde guardar los resultados en JSON")
+    args = parser.parse_args()
+    emitir_resultados("arranque", ejecutar(args.repeticiones), args.json)
@@ -0,0 +1,129 @@
+"""
+Tasa de aciertos de los buffers de lecturas con varios workers: cada worker (un proceso,
+como en gunicorn) recibe una parte de la ingesta (POST /api/lecturas repartido entre
+todos) y atiende consultas de dashboards (GET /api/lecturas/<sensor_id>). Se cuenta
+cuántas consultas se sirvieron desde el buffer y cuántas tuvieron que rehidratarlo.
+
+Compara la publicación de la versión compartida en cada escritura
+(--intervalos-publicacion 0) con la publicación acumulada por intervalo.
+
+Usa una base SQLite temporal (DATABASE_URL) salvo que se indique otra.
+
+Uso: python -m benchmarks.bench_buffer_workers [--workers 4] [--segundos 10]
+                                               [--escrituras-por-segundo 20] [--consultas-por-segundo 50]
+                                               [--intervalos-publicacion 0 1] [--json salida.json]
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+_directorio = tempfile.mkdtemp(prefix="bmis_bench_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_directorio, 'bench.db')}")
+os.environ.setdefault("BMIS_ESTADO_DIR", _directorio)
+os.environ.setdefault("PRECARGAR_MODELOS", "0")
+
+from benchmarks.comun import emitir_resultados, resumir  # noqa: E402
+
+
+def _worker(indice, workers, segundos, escrituras, consultas, intervalo, cola):
+    from contextlib import redirect_stdout
+    from benchmarks.datos_sinteticos import crear_app
+    from database.buffer_lecturas import buffer_lecturas
+
+    buffer_lecturas.intervalo_publicacion = intervalo
+    app = crear_app()
+    cliente = app.test_client()
+
+    hidrataciones = [0]
+    hidratar_varios = buffer_lecturas.hidratar_varios
+
+    def _contar(*args, **kwargs):
+        hidrataciones[0] += 1
+        return hidratar_varios(*args, **kwargs)
+
+    buffer_lecturas.hidratar_varios = _contar
+
+    # La ingesta total se reparte entre los workers; cada uno atiende sus propias consultas.
+    paso_escritura = workers / escrituras
+    paso_consulta = 1 / consultas
+    proxima_escritura = time.perf_counter() + indice * paso_escritura / workers
+    proxima_consulta = time.perf_counter()
+    fin = time.perf_counter() + segundos
+    tiempos, n_consultas, n_escrituras = [], 0, 0
+    with open(os.devnull, "w") as nulo, redirect_stdout(nulo):
+        while True:
+            ahora = time.perf_counter()
+            if ahora >= fin:
+                break
+            if ahora >= proxima_escritura:
+                respuesta = cliente.post("/api/lecturas", json={"sensor_id": 2, "valor": 36.5})
+                assert respuesta.status_code in (201, 202), respuesta.get_json()
+                n_escrituras += 1
+                proxima_escritura += paso_escritura
+            elif ahora >= proxima_consulta:
+                inicio = time.perf_counter()
+                respuesta = cliente.get("/api/lecturas/2")
+                tiempos.append(time.perf_counter() - inicio)
+                assert respuesta.status_code == 200
+                n_consultas += 1
+                proxima_consulta += paso_consulta
+            else:
+                time.sleep(max(min(proxima_escritura, proxima_consulta) - ahora, 0))
+        buffer_lecturas.publicar_pendientes()
+    cola.put({"consultas": n_consultas, "escrituras": n_escrituras,
+              "hidrataciones": hidrataciones[0], "tiempos": tiempos})
+
+
+def _fase(workers, segundos, escrituras, consultas, intervalo):
+    contexto = multiprocessing.get_context("fork")
+    cola = contexto.Queue()
+    procesos = [
+        contexto.Process(target=_worker, args=(i, workers, segundos, escrituras, consultas, intervalo, cola))
+        for i in range(workers)
+    ]
+    for p in procesos:
+        p.start()
+    partes = [cola.get() for _ in procesos]
+    for p in procesos:
+        p.join()
+    n_consultas = sum(p["consultas"] for p in partes)
+    hidrataciones = sum(p["hidrataciones"] for p in partes)
+    return {
+        "intervalo_publicacion_s": intervalo,
+        "escrituras": sum(p["escrituras"] for p in partes),
+        "consultas": n_consultas,
+        "hidrataciones": hidrataciones,
+        "tasa_aciertos": round(1 - hidrataciones / n_consultas, 4) if n_consultas else None,
+        "consulta": resumir([t for p in partes for t in p["tiempos"]]),
+    }
+
+
+def ejecutar(workers, segundos, escrituras, consultas, intervalos):
+    from benchmarks.datos_sinteticos import crear_app
+
+    app = crear_app()
+    with app.app_context():
+        app.test_client().post("/api/proceso/iniciar")
+    return {
+        "workers": workers,
+        "escrituras_por_segundo": escrituras,
+        "consultas_por_segundo_por_worker": consultas,
+        "fases": [_fase(workers, segundos, escrituras, consultas, i) for i in intervalos],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--segundos", type=float, default=10)
+    parser.add_argument("--escrituras-por-segundo", type=float, default=20, help="Entre todos los workers")
+    parser.add_argument("--consultas-por-segundo", type=float, default=50, help="Por worker")
+    parser.add_argument("--intervalos-publicacion", type=float, nargs="+", default=[0, 1])
+    parser.add_argument("--json", help="Ruta donde guardar los resultados en JSON")
+    args = parser.parse_args()
+    emitir_resultados("buffer_workers", ejecutar(
+        args.workers, args.segundos, args.escrituras_por_segundo,
+        args.consultas_por_segundo, args.intervalos_publicacion,
+    ), args.json)
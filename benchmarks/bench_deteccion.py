@@ -0,0 +1,79 @@
+"""
+Benchmark del detector de anomalías en línea (ml/deteccion.py): costo por lectura
+evaluada, sin base de datos, sobre una serie sintética de los tres sensores a 1 Hz
+con picos de presión y cruces de umbral intercalados.
+
+Uso: python -m benchmarks.bench_deteccion [--lecturas 300000] [--json salida.json]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.comun import emitir_resultados, resumir
+from database.db_service import SENSOR_IDS
+from ml.deteccion import DetectorAnomalias
+
+TAMANO_TANDA = 10000
+
+
+def _lecturas(cantidad, semilla=0):
+    """(sensor_id, t, valor) intercalando temperatura, presión y gas."""
+    rng = np.random.default_rng(semilla)
+    por_sensor = cantidad // 3
+    t = np.arange(por_sensor, dtype=np.float64)
+    series = {
+        SENSOR_IDS["temperatura"]: 35 + 3 * np.sin(2 * np.pi * t / 86400) + rng.normal(0, 0.1, por_sensor),
+        SENSOR_IDS["presion"]: 100 + rng.normal(0, 0.5, por_sensor),
+        SENSOR_IDS["gas"]: 500 + rng.normal(0, 20, por_sensor),
+    }
+    picos = rng.choice(por_sensor, size=por_sensor // 1000, replace=False)
+    series[SENSOR_IDS["presion"]][picos] -= 15
+    lecturas = []
+    for i in range(por_sensor):
+        for sensor_id, valores in series.items():
+            lecturas.append((sensor_id, float(t[i]), float(valores[i])))
+    return lecturas
+
+
+def ejecutar(cantidad):
+    lecturas = _lecturas(cantidad)
+    detector = DetectorAnomalias({sensor_id: nombre for nombre, sensor_id in SENSOR_IDS.items()})
+    evaluar = detector.evaluar
+
+    tiempos_tanda, transiciones = [], 0
+    for inicio in range(0, len(lecturas), TAMANO_TANDA):
+        tanda = lecturas[inicio:inicio + TAMANO_TANDA]
+        t0 = time.perf_counter()
+        for sensor_id, t, valor in tanda:
+            transiciones += len(evaluar(1, sensor_id, valor, t))
+        tiempos_tanda.append((time.perf_counter() - t0) / len(tanda))
+
+    # Latencia individual (incluye la resolución de perf_counter) de una muestra.
+    muestra = lecturas[:20000]
+    individuales = np.empty(len(muestra))
+    for i, (sensor_id, t, valor) in enumerate(muestra):
+        t0 = time.perf_counter()
+        evaluar(2, sensor_id, valor, t)
+        individuales[i] = time.perf_counter() - t0
+
+    por_lectura_us = np.asarray(tiempos_tanda) * 1e6
+    return {
+        "lecturas": len(lecturas),
+        "transiciones": transiciones,
+        "costo_medio_por_lectura_us": {
+            "p50": round(float(np.percentile(por_lectura_us, 50)), 3),
+            "p95": round(float(np.percentile(por_lectura_us, 95)), 3),
+            "max": round(float(por_lectura_us.max()), 3),
+        },
+        "latencia_individual": resumir(individuales),
+        "lecturas_por_segundo": int(1 / np.median(tiempos_tanda)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lecturas", type=int, default=300000)
+    parser.add_argument("--json", help="Ruta donde guardar los resultados en JSON")
+    args = parser.parse_args()
+    emitir_resultados("deteccion", ejecutar(args.lecturas), args.json)
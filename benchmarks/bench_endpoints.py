@@ -0,0 +1,281 @@
+"""
+Suite de benchmarks de la API sobre datos sintéticos a escala: latencia (p50/p95/p99) y
+memoria por solicitud de cada endpoint, para comparar commits entre sí.
+
+Crea la app (main.create_app) contra DATABASE_URL (por defecto, una base SQLite temporal;
+también sirve un contenedor MySQL) y la puebla con benchmarks/datos_sinteticos.py. Con
+varias escalas (--lecturas 10000 1000000 ...) las lecturas se acumulan: en cada escala se
+finaliza el proceso activo y se agregan procesos hasta llegar al total indicado; el más
+reciente queda activo.
+
+Mide, en cada escala:
+- Carga de los modelos de IA (una instancia nueva del cargador por vez).
+- GET /api/lecturas: primera página, filtro por proceso y sensor, rango de una hora y
+  la misma hora en streaming.
+- GET /api/lecturas/<sensor_id>: buffer caliente, buffer frío y reducción LTTB de las
+  últimas 24 h y del proceso completo.
+- GET /api/analizar: predicción en caché, recalculada y recalculada con buffers fríos.
+- POST /api/lecturas.
+- Rutas con hash de contraseña: registro, login correcto/incorrecto y cambio de contraseña
+  (con el limitador de intentos desactivado, para medir solo el hash).
+
+La memoria es el pico que asigna Python durante la solicitud (tracemalloc); además se
+informa la memoria residente del proceso al terminar cada escala. Los print de la app
+se descartan mientras se mide.
+
+Uso: python -m benchmarks.bench_endpoints [--lecturas 10000 1000000] [--procesos 3] [--dias 30]
+                                          [--repeticiones 200] [--repeticiones-auth 20]
+                                          [--json salida.json]
+Comparar dos corridas: python -m benchmarks.comparar base.json nuevo.json
+"""
+import argparse
+import contextlib
+import itertools
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+_directorio = tempfile.mkdtemp(prefix="bmis_bench_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_directorio, 'bench.db')}")
+os.environ.setdefault("BMIS_ESTADO_DIR", _directorio)
+os.environ.setdefault("PRECARGAR_MODELOS", "0")
+
+from benchmarks.comun import (  # noqa: E402
+    emitir_resultados, medir_latencias, medir_memoria, memoria_proceso, resumir
+)
+from benchmarks.datos_sinteticos import crear_app, generar_datos, DIAS_PROCESO  # noqa: E402
+
+TELEFONO_BENCH = "999000"
+CLAVE_BENCH = "clave-correcta"
+# Los casos que recorren un proceso completo se repiten menos veces.
+DIVISOR_CASOS_PESADOS = 20
+REPETICIONES_MODELOS = 3
+
+_telefonos = itertools.count(1)
+
+
+def _solicitud(cliente, metodo, url, esperados=(200,), **kwargs):
+    """Función sin argumentos que hace la solicitud, lee el cuerpo completo y valida el estado."""
+    def _hacer():
+        respuesta = cliente.open(url, method=metodo, **kwargs)
+        cuerpo = respuesta.get_data()
+        assert respuesta.status_code in esperados, (metodo, url, respuesta.status_code, cuerpo[:200])
+    return _hacer
+
+
+def _medir(funcion, repeticiones, preparar=None):
+    """Latencia y memoria de `funcion`. `preparar` corre antes de cada llamada (y se mide con ella)."""
+    if preparar is not None:
+        solicitud = funcion
+
+        def funcion():
+            preparar()
+            solicitud()
+
+    return {
+        **medir_latencias(funcion, repeticiones, calentamiento=min(10, repeticiones)),
+        "memoria": medir_memoria(funcion, min(5, repeticiones)),
+    }
+
+
+def _medir_carga_modelos(repeticiones):
+    from services.ai_service import CargadorModelos, cargador_modelos
+
+    tiempos = []
+    for _ in range(repeticiones):
+        cargador = CargadorModelos()
+        inicio = time.perf_counter()
+        if cargador.cargar() is None:
+            return {"error": cargador.error}
+        tiempos.append(time.perf_counter() - inicio)
+    resultado = {**resumir(tiempos), "memoria": medir_memoria(lambda: CargadorModelos().cargar(), 1)}
+    cargador_modelos.cargar()  # la instancia que usan los endpoints
+    return resultado
+
+
+def _casos_lecturas(cliente, proceso_id, fecha_inicio, repeticiones):
+    from database.buffer_lecturas import buffer_lecturas
+
+    ahora = datetime.now()
+    mitad = fecha_inicio + (ahora - fecha_inicio) / 2
+    hora = f"desde={mitad.isoformat()}&hasta={(mitad + timedelta(hours=1)).isoformat()}"
+    ultimo_dia = (ahora - timedelta(days=1)).isoformat()
+    pesadas = max(repeticiones // DIVISOR_CASOS_PESADOS, 3)
+
+    def _get(url):
+        return _solicitud(cliente, "GET", url)
+
+    def _enfriar_buffers():
+        buffer_lecturas.descartar_proceso(proceso_id)
+
+    return {
+        "GET /api/lecturas (primera página)": _medir(_get("/api/lecturas?limit=100"), repeticiones),
+        "GET /api/lecturas (proceso y sensor)": _medir(
+            _get(f"/api/lecturas?proceso_id={proceso_id}&sensor_id=2&limit=500"), repeticiones
+        ),
+        "GET /api/lecturas (rango de una hora)": _medir(
+            _get(f"/api/lecturas?proceso_id={proceso_id}&{hora}&limit=1000"), repeticiones
+        ),
+        "GET /api/lecturas (una hora, stream)": _medir(
+            _get(f"/api/lecturas?proceso_id={proceso_id}&{hora}&stream=1"), repeticiones
+        ),
+        "GET /api/lecturas/<sensor_id> (buffer caliente)": _medir(_get("/api/lecturas/2"), repeticiones),
+        "GET /api/lecturas/<sensor_id> (buffer frío)": _medir(
+            _get("/api/lecturas/2"), repeticiones, preparar=_enfriar_buffers
+        ),
+        "GET /api/lecturas/<sensor_id> (LTTB últimas 24 h)": _medir(
+            _get(f"/api/lecturas/2?max_puntos=500&desde={ultimo_dia}"), pesadas
+        ),
+        "GET /api/lecturas/<sensor_id> (LTTB proceso completo)": _medir(
+            _get("/api/lecturas/2?max_puntos=500"), pesadas
+        ),
+    }
+
+
+def _casos_analizar(cliente, proceso_id, repeticiones):
+    from database.buffer_lecturas import buffer_lecturas
+    from services.ai_service import cargador_modelos
+    from services.prediccion_cache import cache_predicciones
+
+    if not cargador_modelos.listos():
+        return {"GET /api/analizar": {"omitido": f"modelos no disponibles: {cargador_modelos.error}"}}
+
+    def _sin_cache():
+        cache_predicciones.limpiar()
+
+    def _sin_cache_ni_buffers():
+        cache_predicciones.limpiar()
+        buffer_lecturas.descartar_proceso(proceso_id)
+
+    analizar = _solicitud(cliente, "GET", "/api/analizar")
+    return {
+        "GET /api/analizar (predicción en caché)": _medir(analizar, repeticiones),
+        "GET /api/analizar (recalculada)": _medir(analizar, repeticiones, preparar=_sin_cache),
+        "GET /api/analizar (recalculada, buffers fríos)": _medir(
+            analizar, repeticiones, preparar=_sin_cache_ni_buffers
+        ),
+    }
+
+
+def _caso_ingesta(cliente, repeticiones):
+    sensores = itertools.cycle([(1, 900.0), (2, 36.5), (3, 5.2)])
+
+    def _registrar():
+        sensor_id, valor = next(sensores)
+        respuesta = cliente.post("/api/lecturas", json={"sensor_id": sensor_id, "valor": valor})
+        assert respuesta.status_code in (201, 202), respuesta.get_json()
+
+    return {"POST /api/lecturas": _medir(_registrar, repeticiones)}
+
+
+def _preparar_usuario(app):
+    from database.connection import db
+    from database.models.user import User
+
+    with app.app_context():
+        if not User.query.filter_by(telefono=TELEFONO_BENCH).first():
+            usuario = User(nombre="bench", telefono=TELEFONO_BENCH, rol="usuario", estado="activo")
+            usuario.set_password(CLAVE_BENCH)
+            db.session.add(usuario)
+            db.session.commit()
+
+
+def _casos_auth(app, cliente, repeticiones):
+    from services import limitador_service as limitador
+
+    _preparar_usuario(app)
+    # Cubetas que nunca se agotan y un hash a la vez: se mide el costo de cada solicitud.
+    limitador.limitador_ip = limitador.LimitadorTasa(10 ** 9, 10 ** 9)
+    limitador.limitador_telefono = limitador.LimitadorTasa(10 ** 9, 10 ** 9)
+    limitador._semaforo_hash = threading.BoundedSemaphore(1)
+
+    def _registrar():
+        telefono = f"7{os.getpid():06d}{next(_telefonos):06d}"
+        respuesta = cliente.post("/auth/register", json={
+            "nombre": "bench", "telefono": telefono, "password": CLAVE_BENCH, "confirm_password": CLAVE_BENCH,
+        })
+        assert respuesta.status_code == 201, respuesta.get_json()
+
+    def _login(password, esperado):
+        return _solicitud(
+            cliente, "POST", "/auth/login", (esperado,), json={"telefono": TELEFONO_BENCH, "password": password}
+        )
+
+    cambiar = _solicitud(cliente, "PATCH", "/auth/password", json={
+        "telefono": TELEFONO_BENCH, "nueva_contrasena": CLAVE_BENCH, "confirmar_contrasena": CLAVE_BENCH,
+    })
+    return {
+        "POST /auth/register": _medir(_registrar, repeticiones),
+        "POST /auth/login (correcto)": _medir(_login(CLAVE_BENCH, 200), repeticiones),
+        "POST /auth/login (incorrecto)": _medir(_login("incorrecta", 401), repeticiones),
+        "PATCH /auth/password": _medir(cambiar, repeticiones),
+    }
+
+
+def _medir_escala(app, lecturas, procesos, dias, repeticiones, repeticiones_auth, derivados):
+    from database.connection import db
+    from database.models.lectura import Lectura
+    from database.models.proceso_biodigestor import ProcesoBiodigestor
+    from sqlalchemy import func
+
+    cliente = app.test_client()
+    with app.app_context():
+        actuales = db.session.query(func.count(Lectura.id)).scalar()
+        if ProcesoBiodigestor.query.filter_by(estado="ACTIVO").first():
+            cliente.post("/api/proceso/finalizar")
+        datos = generar_datos(max(lecturas - actuales, 3 * procesos), procesos, dias, derivados)
+        fecha_inicio = db.session.get(ProcesoBiodigestor, datos["proceso_activo"]).fecha_inicio
+
+    endpoints = {}
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        modelos = _medir_carga_modelos(REPETICIONES_MODELOS)
+        endpoints.update(_casos_lecturas(cliente, datos["proceso_activo"], fecha_inicio, repeticiones))
+        endpoints.update(_casos_analizar(cliente, datos["proceso_activo"], repeticiones))
+        endpoints.update(_caso_ingesta(cliente, repeticiones))
+        endpoints.update(_casos_auth(app, cliente, repeticiones_auth))
+    return {
+        "lecturas": datos["lecturas_totales"],
+        "datos": datos,
+        "carga_modelos": modelos,
+        "endpoints": endpoints,
+        "memoria_proceso": memoria_proceso(),
+    }
+
+
+def ejecutar(escalas, procesos, dias, repeticiones, repeticiones_auth, derivados=False):
+    from database.connection import db
+
+    app = crear_app()
+    with app.app_context():
+        motor = db.engine.dialect.name
+    return {
+        "base_de_datos": motor,
+        "parametros": {
+            "procesos_por_escala": procesos, "dias_por_proceso": dias,
+            "repeticiones": repeticiones, "repeticiones_auth": repeticiones_auth, "derivados": derivados,
+        },
+        "escalas": [
+            _medir_escala(app, lecturas, procesos, dias, repeticiones, repeticiones_auth, derivados)
+            for lecturas in sorted(escalas)
+        ],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lecturas", type=int, nargs="+", default=[10000],
+                        help="Lecturas totales de cada escala (acumulativas), de 10 mil a 50 millones")
+    parser.add_argument("--procesos", type=int, default=3, help="Procesos agregados en cada escala")
+    parser.add_argument("--dias", type=float, default=DIAS_PROCESO, help="Duración de cada proceso")
+    parser.add_argument("--repeticiones", type=int, default=200)
+    parser.add_argument("--repeticiones-auth", type=int, default=20)
+    parser.add_argument("--derivados", action="store_true", help="Reconstruir agregados y estadísticas")
+    parser.add_argument("--json", help="Ruta donde guardar los resultados en JSON")
+    args = parser.parse_args()
+    emitir_resultados(
+        "endpoints",
+        ejecutar(args.lecturas, args.procesos, args.dias, args.repeticiones, args.repeticiones_auth, args.derivados),
+        args.json,
+    )
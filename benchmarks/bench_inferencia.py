@@ -0,0 +1,79 @@
+"""
+Micro-benchmark del motor de inferencia compilado (ml/inferencia.py) frente a scikit-learn.
+
+- Valida que ambos produzcan exactamente las mismas clases.
+- Latencia p50/p99 para lotes de 1 fila (el caso de /api/analizar).
+- Throughput (filas/segundo) para lotes de 1 hasta 100 000 filas.
+
+Uso: python -m benchmarks.bench_inferencia [--json salida.json]
+"""
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from benchmarks.comun import emitir_resultados, medir_latencias, medir_throughput
+from ml.inferencia import BosqueCompilado, validar_contra_sklearn
+
+ML_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ml")
+COLUMNAS = ["temperatura_celsius", "presion_biogas_kpa", "mq4_ppm", "dia_proceso"]
+TAMANOS_LOTE = [1, 10, 100, 1000, 10000, 100000]
+
+
+def _datos_prueba(n, semilla=0):
+    """Filas sintéticas en los rangos de ml/sensors.csv (y algo más allá)."""
+    rng = np.random.default_rng(semilla)
+    return np.column_stack([
+        rng.uniform(20, 45, n), rng.uniform(0, 10, n),
+        rng.uniform(0, 11000, n), rng.integers(1, 40, n),
+    ]).astype(np.float64)
+
+
+def ejecutar():
+    csv = pd.read_csv(os.path.join(ML_DIR, "sensors.csv"))[COLUMNAS].to_numpy(dtype=np.float64)
+    sinteticos = _datos_prueba(max(TAMANOS_LOTE))
+    resultados = {}
+
+    for archivo in ("modelo_alerta.pkl", "modelo_tipo_alerta.pkl"):
+        modelo = joblib.load(os.path.join(ML_DIR, archivo))
+        inicio = time.perf_counter()
+        motor = BosqueCompilado(modelo)
+        compilacion_ms = (time.perf_counter() - inicio) * 1000
+
+        diferencias = validar_contra_sklearn(modelo, motor, csv) + validar_contra_sklearn(modelo, motor, sinteticos)
+        if diferencias:
+            raise SystemExit(f"{archivo}: {diferencias} predicciones difieren de scikit-learn")
+
+        fila = sinteticos[:1]
+        fila_df = pd.DataFrame(fila, columns=COLUMNAS)
+        resultado = {
+            "arboles": motor.n_arboles,
+            "nodos": int(motor.feature.size),
+            "profundidad_max": motor.profundidad,
+            "compilacion_ms": round(compilacion_ms, 2),
+            "filas_validadas": int(len(csv) + len(sinteticos)),
+            "latencia_lote_1": {
+                "compilado": medir_latencias(lambda: motor.predecir(fila), 2000),
+                "sklearn": medir_latencias(lambda: modelo.predict(fila_df), 300),
+            },
+            "throughput_filas_s": {},
+        }
+        for tamano in TAMANOS_LOTE:
+            lote = sinteticos[:tamano]
+            lote_df = pd.DataFrame(lote, columns=COLUMNAS)
+            resultado["throughput_filas_s"][str(tamano)] = {
+                "compilado": medir_throughput(lambda: motor.predecir(lote), tamano),
+                "sklearn": medir_throughput(lambda: modelo.predict(lote_df), tamano),
+            }
+        resultados[archivo] = resultado
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", help="Ruta donde guardar los resultados en JSON")
+    args = parser.parse_args()
+    emitir_resultados("inferencia", ejecutar(), args.json)
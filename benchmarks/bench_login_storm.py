@@ -0,0 +1,129 @@
+"""
+Prueba de carga: latencia de la ingesta de lecturas (POST /api/lecturas) sola y durante
+una tormenta de logins con contraseña incorrecta desde muchas IPs, con y sin el
+limitador de services/limitador_service.py.
+
+Usa una base SQLite temporal (DATABASE_URL) salvo que se indique otra; todo corre en
+un proceso con varios hilos, como un worker gthread de gunicorn.
+
+La tormenta se envía a una tasa fija (--tasa-login intentos/s entre todos los hilos):
+sin límite de tasa, hilos en el mismo proceso competirían por el GIL aunque cada
+respuesta fuera un 429 instantáneo, algo que un atacante remoto no puede provocar.
+
+Uso: python -m benchmarks.bench_login_storm [--lecturas 300] [--hilos-login 8] [--tasa-login 400]
+                                            [--json salida.json]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+_directorio = tempfile.mkdtemp(prefix="bmis_bench_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_directorio, 'bench.db')}")
+os.environ.setdefault("BMIS_ESTADO_DIR", _directorio)
+os.environ.setdefault("PRECARGAR_MODELOS", "0")
+
+from benchmarks.comun import emitir_resultados, resumir  # noqa: E402
+
+
+def _preparar_app():
+    import main
+    from database.connection import db
+    from database.models.sensor import Sensor
+    from database.models.user import User
+    import commands.base_datos  # noqa: F401  (registra todos los modelos)
+
+    app = main.create_app()
+    with app.app_context():
+        db.create_all()
+        if not Sensor.query.count():
+            for sensor_id, (nombre, tipo, unidad) in enumerate(
+                [("gas", "MQ-4", "ppm"), ("temperatura", "DS18B20", "°C"), ("presion", "BMP280", "kPa")], 1
+            ):
+                db.session.add(Sensor(id=sensor_id, nombre=nombre, tipo=tipo, unidad=unidad))
+        if not User.query.filter_by(telefono="999").first():
+            usuario = User(nombre="bench", telefono="999", rol="usuario", estado="activo")
+            usuario.set_password("clave-correcta")
+            db.session.add(usuario)
+        db.session.commit()
+    cliente = app.test_client()
+    cliente.post("/api/proceso/iniciar")
+    return app
+
+
+def _medir_ingesta(app, lecturas):
+    cliente = app.test_client()
+    tiempos = []
+    for i in range(lecturas):
+        inicio = time.perf_counter()
+        respuesta = cliente.post("/api/lecturas", json={"sensor_id": 2, "valor": 30 + (i % 5) * 0.1})
+        tiempos.append(time.perf_counter() - inicio)
+        assert respuesta.status_code in (201, 202), respuesta.get_json()
+    return resumir(tiempos)
+
+
+def _tormenta(app, hilos, tasa, detener, codigos):
+    intervalo = hilos / tasa
+
+    def _atacar(indice):
+        cliente = app.test_client()
+        n = 0
+        proximo = time.perf_counter()
+        while not detener.is_set():
+            n += 1
+            proximo += intervalo
+            espera = proximo - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+            # Una IP distinta por intento: el límite por teléfono y el semáforo siguen actuando.
+            ip = f"10.{indice}.{(n // 250) % 250}.{n % 250}"
+            respuesta = cliente.post(
+                "/auth/login", json={"telefono": "999", "password": "incorrecta"},
+                environ_base={"REMOTE_ADDR": ip},
+            )
+            codigos[respuesta.status_code] = codigos.get(respuesta.status_code, 0) + 1
+
+    trabajadores = [threading.Thread(target=_atacar, args=(i,), daemon=True) for i in range(hilos)]
+    for t in trabajadores:
+        t.start()
+    return trabajadores
+
+
+def _fase_con_tormenta(app, lecturas, hilos, tasa):
+    detener, codigos = threading.Event(), {}
+    trabajadores = _tormenta(app, hilos, tasa, detener, codigos)
+    time.sleep(0.5)
+    latencias = _medir_ingesta(app, lecturas)
+    detener.set()
+    for t in trabajadores:
+        t.join()
+    return {"ingesta": latencias, "respuestas_login": {str(k): v for k, v in sorted(codigos.items())}}
+
+
+def ejecutar(lecturas, hilos, tasa):
+    from services import limitador_service as limitador
+
+    app = _preparar_app()
+    _medir_ingesta(app, 20)  # calentamiento
+    resultados = {"sin_tormenta": {"ingesta": _medir_ingesta(app, lecturas)}}
+    resultados["tormenta_con_limitador"] = _fase_con_tormenta(app, lecturas, hilos, tasa)
+
+    # Sin limitador: cubetas que nunca se agotan y un hash por hilo atacante.
+    limitador.limitador_ip = limitador.LimitadorTasa(10 ** 9, 10 ** 9)
+    limitador.limitador_telefono = limitador.LimitadorTasa(10 ** 9, 10 ** 9)
+    limitador._semaforo_hash = threading.BoundedSemaphore(hilos + 1)
+    resultados["tormenta_sin_limitador"] = _fase_con_tormenta(app, lecturas, hilos, tasa)
+    resultados["hilos_login"] = hilos
+    resultados["tasa_login_objetivo"] = tasa
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lecturas", type=int, default=300)
+    parser.add_argument("--hilos-login", type=int, default=8)
+    parser.add_argument("--tasa-login", type=float, default=400, help="Intentos de login por segundo")
+    parser.add_argument("--json", help="Ruta donde guardar los resultados en JSON")
+    args = parser.parse_args()
+    emitir_resultados("login_storm", ejecutar(args.lecturas, args.hilos_login, args.tasa_login), args.json)
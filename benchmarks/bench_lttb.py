@@ -0,0 +1,48 @@
+"""
+Benchmark de la reducción LTTB (services/series_service.indices_lttb) sobre series
+sintéticas: una semana a 1 Hz (604 800 puntos) reducida a distintos max_puntos.
+
+Uso: python -m benchmarks.bench_lttb [--puntos 604800] [--json salida.json]
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.comun import emitir_resultados, medir_latencias
+from services.series_service import indices_lttb
+
+SALIDAS = [100, 500, 2000, 5000]
+
+
+def _serie(puntos, semilla=0):
+    rng = np.random.default_rng(semilla)
+    x = np.arange(puntos, dtype=np.float64) * 1e6  # microsegundos, 1 Hz
+    # Ciclo diario + deriva + ruido + algunos picos aislados (lo que LTTB debe conservar).
+    y = 35 + 3 * np.sin(2 * np.pi * np.arange(puntos) / 86400) + np.cumsum(rng.normal(0, 0.002, puntos))
+    y += rng.normal(0, 0.1, puntos)
+    picos = rng.choice(puntos, size=20, replace=False)
+    y[picos] += rng.choice([-8, 8], size=picos.size)
+    return x, y, picos
+
+
+def ejecutar(puntos):
+    x, y, picos = _serie(puntos)
+    resultados = {"puntos_entrada": puntos}
+    for salida in SALIDAS:
+        seleccion = indices_lttb(x, y, salida)
+        resultados[str(salida)] = {
+            "latencia": medir_latencias(lambda: indices_lttb(x, y, salida), 20, calentamiento=2),
+            # Fracción de los picos aislados que sobreviven a la reducción.
+            "picos_conservados": round(float(np.isin(picos, seleccion).mean()), 3),
+            "bytes_json_aprox": salida * 120,
+        }
+    resultados["bytes_json_sin_reducir_aprox"] = puntos * 120
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--puntos", type=int, default=604800)
+    parser.add_argument("--json", help="Ruta donde guardar los resultados en JSON")
+    args = parser.parse_args()
+    emitir_resultados("lttb", ejecutar(args.puntos), args.json)
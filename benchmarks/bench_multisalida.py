@@ -0,0 +1,86 @@
+"""
+Compara el par de modelos actual (alerta + tipo de alerta) con un único bosque
+multisalida entrenado sobre los mismos datos: exactitud, latencia de inferencia
+(motor compilado y scikit-learn) y tamaño del modelo serializado.
+
+Uso: python -m benchmarks.bench_multisalida [--csv ml/sensors.csv] [--n-estimators 100] [--json salida.json]
+"""
+import argparse
+import io
+import os
+import time
+
+import joblib
+import numpy as np
+
+from benchmarks.comun import emitir_resultados, medir_latencias, medir_throughput
+from ml.entrenamiento import (
+    ConjuntoEntrenamiento, dividir, entrenar_modelos, entrenar_multisalida, evaluar, leer_csv, predecir_par,
+)
+from ml.inferencia import BosqueCompilado
+
+ML_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ml")
+FILAS_THROUGHPUT = 10000
+
+
+def _tamano_serializado(*modelos):
+    total = 0
+    for modelo in modelos:
+        buffer = io.BytesIO()
+        joblib.dump(modelo, buffer)
+        total += buffer.tell()
+    return total
+
+
+def ejecutar(ruta_csv, n_estimators):
+    conjunto = ConjuntoEntrenamiento()
+    for bloque in leer_csv(ruta_csv):
+        conjunto.agregar(*bloque)
+    X, y_alerta, y_tipo = conjunto.consolidar()
+    entrenamiento, prueba = dividir(len(X))
+    fila = X[prueba][:1].astype(np.float64)
+    lote = np.resize(X, (FILAS_THROUGHPUT, X.shape[1])).astype(np.float64)
+
+    inicio = time.perf_counter()
+    (alerta, _), (tipo, _) = entrenar_modelos(
+        X[entrenamiento], y_alerta[entrenamiento], y_tipo[entrenamiento], n_estimators, n_jobs=1
+    )
+    t_par = time.perf_counter() - inicio
+    multi, t_multi = entrenar_multisalida(
+        X[entrenamiento], y_alerta[entrenamiento], y_tipo[entrenamiento], n_estimators, n_jobs=1
+    )
+
+    motor_alerta, motor_tipo, motor_multi = BosqueCompilado(alerta), BosqueCompilado(tipo), BosqueCompilado(multi)
+
+    return {
+        "filas_entrenamiento": int(len(entrenamiento)),
+        "filas_prueba": int(len(prueba)),
+        "par": {
+            "metricas": evaluar(alerta, tipo, X[prueba], y_alerta[prueba], y_tipo[prueba]),
+            "entrenamiento_s": round(t_par, 3),
+            "nodos": int(motor_alerta.feature.size + motor_tipo.feature.size),
+            "bytes_serializado": _tamano_serializado(alerta, tipo),
+            "latencia_1_fila_compilado": medir_latencias(
+                lambda: (motor_alerta.predecir(fila), motor_tipo.predecir(fila)), 2000),
+            "latencia_1_fila_sklearn": medir_latencias(lambda: predecir_par(alerta, tipo, fila), 200),
+            "throughput_sklearn_filas_s": medir_throughput(lambda: predecir_par(alerta, tipo, lote), FILAS_THROUGHPUT),
+        },
+        "multisalida": {
+            "metricas": evaluar(multi, None, X[prueba], y_alerta[prueba], y_tipo[prueba]),
+            "entrenamiento_s": round(t_multi, 3),
+            "nodos": int(motor_multi.feature.size),
+            "bytes_serializado": _tamano_serializado(multi),
+            "latencia_1_fila_compilado": medir_latencias(lambda: motor_multi.predecir_salidas(fila), 2000),
+            "latencia_1_fila_sklearn": medir_latencias(lambda: predecir_par(multi, None, fila), 200),
+            "throughput_sklearn_filas_s": medir_throughput(lambda: predecir_par(multi, None, lote), FILAS_THROUGHPUT),
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=os.path.join(ML_DIR, "sensors.csv"))
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--json", help="Ruta donde guardar los resultados en JSON")
+    args = parser.parse_args()
+    emitir_resultados("multisalida", ejecutar(args.csv, args.n_estimators), args.json)
@@ -0,0 +1,53 @@
+"""
+Benchmark de la verificación de tokens de acceso (services/token_service.py):
+- verificación de un token nuevo (HMAC + JSON) y de uno ya visto (caché),
+- el before_request completo de auth_bp (lectura del header y g.usuario),
+frente a check_password_hash (PBKDF2) que hace /auth/login.
+
+Uso: python -m benchmarks.bench_tokens [--repeticiones 20000] [--json salida.json]
+"""
+import argparse
+import tempfile
+
+from flask import Flask
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from benchmarks.comun import emitir_resultados, medir_latencias
+from services.token_service import FirmadorTokens, ListaRevocacion
+
+
+def ejecutar(repeticiones):
+    import routes.auth_bp as auth
+
+    firmador = FirmadorTokens(b"x" * 32, ListaRevocacion(tempfile.mkdtemp(prefix="bmis_bench_")))
+    auth.firmador = firmador
+    tokens = [firmador.emitir(i, "usuario")[0] for i in range(repeticiones + 10)]
+    firmador._capacidad_cache = len(tokens) * 2
+    nuevos = iter(tokens)
+
+    app = Flask(__name__)
+    app.register_blueprint(auth.auth_bp, url_prefix="/auth")
+    contexto = app.test_request_context("/api/sensores", headers={"Authorization": f"Bearer {tokens[0]}"})
+    contexto.push()
+    try:
+        resultados = {
+            "verificar_token_nuevo": medir_latencias(lambda: firmador.verificar(next(nuevos)), repeticiones),
+            "verificar_token_cacheado": medir_latencias(lambda: firmador.verificar(tokens[0]), repeticiones),
+            "before_request": medir_latencias(auth.verificar_token, repeticiones),
+        }
+    finally:
+        contexto.pop()
+
+    hash_password = generate_password_hash("clave-de-prueba")
+    resultados["check_password_hash"] = medir_latencias(
+        lambda: check_password_hash(hash_password, "clave-de-prueba"), 20, calentamiento=2
+    )
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=20000)
+    parser.add_argument("--json", help="Ruta donde guardar los resultados en JSON")
+    args = parser.parse_args()
+    emitir_resultados("tokens", ejecutar(args.repeticiones), args.json)
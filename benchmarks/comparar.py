@@ -0,0 +1,79 @@
+"""
+Compara dos resultados JSON de un mismo benchmark (por ejemplo, de dos commits) y marca
+las regresiones: latencias p50/p95 o pico de memoria que empeoran más que el umbral.
+Sale con código 1 si hay alguna, para usarlo en CI.
+
+Uso: python -m benchmarks.comparar base.json nuevo.json [--umbral 10] [--minimo-ms 0.5]
+"""
+import argparse
+import json
+import sys
+
+METRICAS = ("p50_ms", "p95_ms", "pico_kib_p50")
+
+
+def _metricas(nodo, ruta=()):
+    """Recorre el documento y genera (ruta, métrica, valor) de cada medición."""
+    if isinstance(nodo, dict):
+        for clave, valor in nodo.items():
+            if clave in METRICAS and isinstance(valor, (int, float)):
+                yield " / ".join(ruta), clave, valor
+            else:
+                yield from _metricas(valor, ruta + (clave,))
+    elif isinstance(nodo, list):
+        for indice, valor in enumerate(nodo):
+            # Las escalas se identifican por su cantidad de lecturas, no por su posición.
+            etiqueta = f"{valor['lecturas']} lecturas" if isinstance(valor, dict) and "lecturas" in valor else str(indice)
+            yield from _metricas(valor, ruta + (etiqueta,))
+
+
+def comparar(base, nuevo, umbral=10.0, minimo_ms=0.5):
+    """
+    Retorna una fila por métrica presente en ambos documentos:
+    {"caso", "metrica", "base", "nuevo", "cambio_pct", "regresion"}.
+    Las latencias por debajo de `minimo_ms` en ambos lados no se marcan (son ruido).
+    """
+    anteriores = {(ruta, metrica): valor for ruta, metrica, valor in _metricas(base["resultados"])}
+    filas = []
+    for ruta, metrica, valor in _metricas(nuevo["resultados"]):
+        anterior = anteriores.get((ruta, metrica))
+        if anterior is None:
+            continue
+        cambio = (valor - anterior) / anterior * 100 if anterior else 0.0
+        ruido = metrica.endswith("_ms") and max(valor, anterior) < minimo_ms
+        filas.append({
+            "caso": ruta,
+            "metrica": metrica,
+            "base": anterior,
+            "nuevo": valor,
+            "cambio_pct": round(cambio, 1),
+            "regresion": cambio > umbral and not ruido,
+        })
+    return filas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("nuevo")
+    parser.add_argument("--umbral", type=float, default=10.0, help="Empeoramiento máximo tolerado (%%)")
+    parser.add_argument("--minimo-ms", type=float, default=0.5, help="Latencias menores se ignoran")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as archivo:
+        base = json.load(archivo)
+    with open(args.nuevo, encoding="utf-8") as archivo:
+        nuevo = json.load(archivo)
+    if base.get("benchmark") != nuevo.get("benchmark"):
+        sys.exit(f"❌ Los resultados son de benchmarks distintos: {base.get('benchmark')} y {nuevo.get('benchmark')}.")
+
+    filas = comparar(base, nuevo, args.umbral, args.minimo_ms)
+    print(f"{base['benchmark']}: {base.get('commit')} -> {nuevo.get('commit')}")
+    for fila in filas:
+        marca = "❌" if fila["regresion"] else "  "
+        print(f"{marca} {fila['caso']} [{fila['metrica']}]: {fila['base']} -> {fila['nuevo']} ({fila['cambio_pct']:+.1f}%)")
+    regresiones = [f for f in filas if f["regresion"]]
+    if regresiones:
+        print(f"❌ {len(regresiones)} regresiones por encima del {args.umbral}%.")
+        sys.exit(1)
+    print(f"✅ Sin regresiones por encima del {args.umbral}% ({len(filas)} métricas comparadas).")
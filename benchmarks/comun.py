@@ -0,0 +1,119 @@
+"""
+Utilidades compartidas por los benchmarks (medición de latencias y memoria, salida JSON).
+Los benchmarks se ejecutan desde la raíz del repositorio con: python -m benchmarks.<nombre>
+"""
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+
+def medir_latencias(funcion, repeticiones, calentamiento=10):
+    """Ejecuta `funcion` y retorna estadísticas de latencia en milisegundos."""
+    for _ in range(calentamiento):
+        funcion()
+    tiempos = np.empty(repeticiones)
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos[i] = time.perf_counter() - inicio
+    return resumir(tiempos)
+
+
+def medir_throughput(funcion, filas, minimo_segundos=0.5):
+    """Filas por segundo, repitiendo la llamada (de `filas` filas) hasta acumular al menos minimo_segundos."""
+    repeticiones, inicio = 0, time.perf_counter()
+    while True:
+        funcion()
+        repeticiones += 1
+        transcurrido = time.perf_counter() - inicio
+        if transcurrido >= minimo_segundos:
+            return round(repeticiones * filas / transcurrido, 1)
+
+
+def resumir(tiempos):
+    """Resume una lista de duraciones (segundos) en p50/p95/p99/media/max en milisegundos."""
+    tiempos_ms = np.asarray(tiempos) * 1000.0
+    return {
+        "n": int(tiempos_ms.size),
+        "p50_ms": round(float(np.percentile(tiempos_ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(tiempos_ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(tiempos_ms, 99)), 4),
+        "media_ms": round(float(tiempos_ms.mean()), 4),
+        "max_ms": round(float(tiempos_ms.max()), 4),
+    }
+
+
+def medir_memoria(funcion, repeticiones=5):
+    """
+    Pico de memoria que asigna Python durante cada llamada a `funcion` (tracemalloc), en KiB.
+    No incluye lo que reservan extensiones en C sin pasar por el asignador de Python
+    (por ejemplo, el caché de páginas de sqlite3).
+    """
+    picos = np.empty(repeticiones)
+    tracemalloc.start()
+    try:
+        for i in range(repeticiones):
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            funcion()
+            picos[i] = (tracemalloc.get_traced_memory()[1] - base) / 1024.0
+    finally:
+        tracemalloc.stop()
+    return {
+        "pico_kib_p50": round(float(np.percentile(picos, 50)), 1),
+        "pico_kib_max": round(float(picos.max()), 1),
+    }
+
+
+def memoria_proceso():
+    """Memoria residente actual (solo Linux) y máxima (Unix) del proceso en MiB."""
+    actual = None
+    try:
+        with open("/proc/self/statm") as archivo:
+            actual = int(archivo.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        pass
+    try:
+        import resource  # solo en Unix
+        # ru_maxrss está en KiB en Linux y en bytes en macOS.
+        maxima = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        maxima = maxima / 2 ** 20 if platform.system() == "Darwin" else maxima / 1024
+    except ImportError:
+        maxima = None
+    return {
+        "rss_mib": round(actual, 1) if actual is not None else None,
+        "rss_max_mib": round(maxima, 1) if maxima is not None else None,
+    }
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def emitir_resultados(nombre, resultados, ruta=None):
+    """Imprime los resultados y, si se indica una ruta, los guarda como JSON."""
+    documento = {
+        "benchmark": nombre,
+        "commit": _commit_actual(),
+        "fecha": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "maquina": platform.machine(),
+        "resultados": resultados,
+    }
+    texto = json.dumps(documento, indent=2, ensure_ascii=False)
+    print(texto)
+    if ruta:
+        with open(ruta, "w", encoding="utf-8") as archivo:
+            archivo.write(texto)
+    return documento
@@ -0,0 +1,182 @@
+"""
+Generador de datos sintéticos para los benchmarks: procesos del biodigestor con lecturas
+realistas de los tres sensores, insertadas por lotes (la memoria no depende del total).
+
+Señales (en los rangos de ml/sensors.csv, según el día del proceso):
+- temperatura: ~36 °C con ciclo diario y fallas de calefacción esporádicas.
+- presión: sube de ~2 a ~8 kPa a medida que el proceso produce biogás (curva logística).
+- gas (MQ-4): sube de ~300 a ~5800 ppm, con ruido y picos esporádicos.
+
+Para poblar una base existente (por ejemplo, un contenedor MySQL de pruebas), DATABASE_URL
+es obligatoria: el generador nunca escribe en la base configurada por defecto.
+
+Uso: DATABASE_URL=... python -m benchmarks.datos_sinteticos --lecturas 1000000 [--procesos 4]
+                                                            [--dias 30] [--derivados]
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func, insert
+
+DIAS_PROCESO = 30
+TAMANO_LOTE = 30000
+# Fracción de instantes con una anomalía (falla de calefacción o pico de gas).
+TASA_ANOMALIAS = 0.002
+
+
+def crear_app():
+    """Crea la app contra DATABASE_URL, con las tablas y el catálogo de sensores."""
+    import main
+    from database.connection import db
+    from database.models.sensor import Sensor
+    import commands.base_datos  # noqa: F401  (registra todos los modelos)
+
+    app = main.create_app()
+    with app.app_context():
+        db.create_all()
+        if not Sensor.query.count():
+            for sensor_id, (nombre, tipo, unidad) in enumerate(
+                [("gas", "MQ-4", "ppm"), ("temperatura", "DS18B20", "°C"), ("presion", "BMP280", "kPa")], 1
+            ):
+                db.session.add(Sensor(id=sensor_id, nombre=nombre, tipo=tipo, unidad=unidad))
+            db.session.commit()
+    return app
+
+
+def _senal(nombre, dias, rng):
+    """Valores de un sensor en los instantes `dias` (días desde el inicio del proceso)."""
+    n = dias.size
+    anomalias = rng.random(n) < TASA_ANOMALIAS
+    if nombre == "temperatura":
+        valores = 36.0 + 1.5 * np.sin(2 * np.pi * dias) + rng.normal(0, 0.3, n)
+        return valores - anomalias * rng.uniform(6, 12, n)
+    if nombre == "presion":
+        return 2.0 + 6.0 / (1 + np.exp(-(dias - 10) / 3)) + rng.normal(0, 0.15, n)
+    valores = 300 + 5500 / (1 + np.exp(-(dias - 12) / 3)) + rng.normal(0, 80, n)
+    return np.clip(valores + anomalias * rng.uniform(2000, 5000, n), 0, None)
+
+
+def generar_proceso(lecturas, dias=DIAS_PROCESO, activo=False, fin=None,
+                    tamano_lote=TAMANO_LOTE, semilla=0):
+    """
+    Inserta un proceso de `dias` días que termina en `fin` (por defecto, ahora) con unas
+    `lecturas` lecturas repartidas entre los tres sensores a intervalos regulares.
+    Retorna (proceso_id, lecturas insertadas).
+    """
+    from database.connection import db
+    from database.db_service import SENSOR_IDS
+    from database.models.lectura import Lectura
+    from database.models.proceso_biodigestor import ProcesoBiodigestor
+
+    rng = np.random.default_rng(semilla)
+    instantes = max(lecturas // len(SENSOR_IDS), 1)
+    fin = fin or datetime.now()
+    inicio = fin - timedelta(days=dias)
+    paso_us = dias * 86400 * 10 ** 6 / instantes
+
+    proceso = ProcesoBiodigestor(
+        fecha_inicio=inicio,
+        fecha_fin=None if activo else fin,
+        estado="ACTIVO" if activo else "FINALIZADO",
+        observaciones="Proceso sintético (benchmarks)",
+    )
+    db.session.add(proceso)
+    db.session.commit()
+    proceso_id = proceso.id
+
+    por_lote = max(tamano_lote // len(SENSOR_IDS), 1)
+    for desde in range(0, instantes, por_lote):
+        indices = np.arange(desde, min(desde + por_lote, instantes))
+        desplazamientos = (indices * paso_us).astype("timedelta64[us]")
+        fechas = (np.datetime64(inicio, "us") + desplazamientos).astype(object)
+        valores = [
+            (sensor_id, _senal(nombre, indices * paso_us / (86400 * 10 ** 6), rng).round(2).tolist())
+            for nombre, sensor_id in SENSOR_IDS.items()
+        ]
+        # Intercaladas por instante, en el orden en que llegan de la ESP32.
+        filas = [
+            {"sensor_id": sensor_id, "proceso_id": proceso_id, "fecha_hora": fecha, "valor": serie[i]}
+            for i, fecha in enumerate(fechas)
+            for sensor_id, serie in valores
+        ]
+        db.session.execute(insert(Lectura), filas)
+        db.session.commit()
+    return proceso_id, instantes * len(SENSOR_IDS)
+
+
+def generar_datos(lecturas, procesos=1, dias=DIAS_PROCESO, derivados=False,
+                  tamano_lote=TAMANO_LOTE, semilla=0):
+    """
+    Inserta `procesos` procesos consecutivos con `lecturas` lecturas en total; el último
+    queda activo. Con derivados=True reconstruye además los agregados y las estadísticas.
+    Llamar dentro de un contexto de aplicación.
+    Lanza RuntimeError si ya hay un proceso activo.
+    """
+    from database.connection import db
+    from database.buffer_lecturas import buffer_lecturas
+    from database.models.lectura import Lectura
+    from database.models.proceso_biodigestor import ProcesoBiodigestor
+    from database.proceso_estado import invalidar_proceso_activo
+    from services.agregados_service import recalcular_agregados
+    from services.estadisticas_service import recalcular_estadisticas
+
+    if ProcesoBiodigestor.query.filter_by(estado="ACTIVO").first():
+        raise RuntimeError("Ya existe un proceso activo; finalícelo antes de generar datos.")
+
+    inicio = time.perf_counter()
+    ids, insertadas = [], 0
+    ahora = datetime.now()
+    for i in range(procesos):
+        # Procesos uno tras otro, separados por un día; el último termina ahora.
+        fin = ahora - timedelta(days=(dias + 1) * (procesos - 1 - i))
+        proceso_id, n = generar_proceso(
+            lecturas // procesos, dias, fin=fin, tamano_lote=tamano_lote, semilla=semilla + i,
+        )
+        ids.append(proceso_id)
+        insertadas += n
+    duracion = time.perf_counter() - inicio
+
+    # Las estadísticas del último proceso no se congelan: se activa después.
+    if derivados:
+        for proceso_id in ids:
+            recalcular_agregados(proceso_id, tamano_lote=tamano_lote)
+        for proceso_id in ids[:-1]:
+            recalcular_estadisticas(proceso_id, tamano_lote=tamano_lote)
+    db.session.query(ProcesoBiodigestor).filter_by(id=ids[-1]).update({"estado": "ACTIVO", "fecha_fin": None})
+    db.session.commit()
+    invalidar_proceso_activo()
+    for proceso_id in ids:
+        buffer_lecturas.descartar_proceso(proceso_id)
+
+    return {
+        "procesos": ids,
+        "proceso_activo": ids[-1],
+        "lecturas_insertadas": insertadas,
+        "lecturas_totales": db.session.query(func.count(Lectura.id)).scalar(),
+        "segundos": round(duracion, 2),
+        "lecturas_por_segundo": round(insertadas / duracion, 1) if duracion else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lecturas", type=int, required=True, help="Lecturas en total")
+    parser.add_argument("--procesos", type=int, default=1)
+    parser.add_argument("--dias", type=float, default=DIAS_PROCESO, help="Duración de cada proceso")
+    parser.add_argument("--derivados", action="store_true", help="Reconstruir agregados y estadísticas")
+    parser.add_argument("--tamano-lote", type=int, default=TAMANO_LOTE)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+    if not os.environ.get("DATABASE_URL"):
+        parser.error("Defina DATABASE_URL con la base de datos a poblar.")
+    os.environ.setdefault("PRECARGAR_MODELOS", "0")
+
+    with crear_app().app_context():
+        resumen = generar_datos(
+            args.lecturas, args.procesos, args.dias, args.derivados, args.tamano_lote, args.semilla
+        )
+    print(f"✅ {resumen['lecturas_insertadas']} lecturas en {len(resumen['procesos'])} procesos "
+          f"({resumen['lecturas_por_segundo']} lecturas/s). Proceso activo: {resumen['proceso_activo']}.")
@@ -0,0 +1,30 @@
+import click
+from flask.cli import with_appcontext
+from database.connection import db
+from database.models.proceso_biodigestor import ProcesoBiodigestor
+from services.agregados_service import recalcular_agregados
+
+@click.group("agregados")
+def agregados_cli():
+    """Comandos de mantenimiento de los agregados de lecturas."""
+
+@agregados_cli.command("recalcular")
+@click.option("--proceso-id", type=int, default=None, help="Proceso a recalcular (por defecto, todos).")
+@click.option("--tamano-lote", type=int, default=10000, show_default=True)
+@with_appcontext
+def recalcular(proceso_id, tamano_lote):
+    """Reconstruye los agregados 1m/1h/1d a partir de las lecturas existentes."""
+    if proceso_id is not None:
+        procesos = [proceso_id]
+    else:
+        procesos = [
+            p for (p,) in db.session.query(ProcesoBiodigestor.id)
+            .order_by(ProcesoBiodigestor.id)
+        ]
+
+    for pid in procesos:
+        try:
+            procesadas = recalcular_agregados(pid, tamano_lote=tamano_lote)
+        except LookupError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"✅ Proceso {pid}: {procesadas} lecturas agregadas.")
@@ -0,0 +1,20 @@
+import click
+from flask.cli import with_appcontext
+from database.connection import db
+
+# Importa todos los modelos para que create_all() conozca sus tablas.
+from database.models import (  # noqa: F401
+    alerta, estadistica_sensor, graph_config, lectura, lectura_agregada, prediccion,
+    proceso_biodigestor, sensor, user, voice_config
+)
+
+@click.group("bd")
+def bd_cli():
+    """Comandos de administración de la base de datos."""
+
+@bd_cli.command("crear-tablas")
+@with_appcontext
+def crear_tablas():
+    """Crea las tablas que falten (no modifica las existentes)."""
+    db.create_all()
+    click.echo("✅ Tablas creadas/verificadas.")
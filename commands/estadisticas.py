@@ -0,0 +1,31 @@
+import click
+from flask.cli import with_appcontext
+from database.connection import db
+from database.models.proceso_biodigestor import ProcesoBiodigestor
+from services.estadisticas_service import recalcular_estadisticas
+
+@click.group("estadisticas")
+def estadisticas_cli():
+    """Comandos de mantenimiento de las estadísticas por proceso."""
+
+@estadisticas_cli.command("recalcular")
+@click.option("--proceso-id", type=int, default=None, help="Proceso a recalcular (por defecto, los finalizados).")
+@click.option("--tamano-lote", type=int, default=10000, show_default=True)
+@with_appcontext
+def recalcular(proceso_id, tamano_lote):
+    """Reconstruye las estadísticas (Welford + t-digest) a partir de las lecturas existentes."""
+    if proceso_id is not None:
+        procesos = [proceso_id]
+    else:
+        procesos = [
+            p for (p,) in db.session.query(ProcesoBiodigestor.id)
+            .filter(ProcesoBiodigestor.estado == "FINALIZADO")
+            .order_by(ProcesoBiodigestor.id)
+        ]
+
+    for pid in procesos:
+        try:
+            procesadas = recalcular_estadisticas(pid, tamano_lote=tamano_lote)
+        except LookupError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"✅ Proceso {pid}: {procesadas} lecturas procesadas.")
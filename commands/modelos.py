@@ -0,0 +1,103 @@
+import json
+import os
+import time
+from datetime import datetime
+import click
+from flask.cli import with_appcontext
+from ml import registro
+from ml.entrenamiento import ejecutar_pipeline, leer_csv
+from services.ai_service import COLUMNAS_MODELO, cargador_modelos
+
+@click.group("modelos")
+def modelos_cli():
+    """Comandos del registro de versiones de los modelos de IA."""
+
+@modelos_cli.command("registrar")
+@click.argument("version")
+@click.option("--desde", default=registro.ML_DIR, show_default=True,
+              help="Directorio con modelo_alerta.pkl y modelo_tipo_alerta.pkl.")
+@click.option("--metricas", type=click.Path(exists=True, dir_okay=False), default=None,
+              help="Archivo JSON con las métricas de entrenamiento.")
+@click.option("--descripcion", default=None)
+def registrar(version, desde, metricas, descripcion):
+    """Agrega al registro una nueva versión a partir de archivos .pkl existentes."""
+    datos_metricas = None
+    if metricas:
+        with open(metricas, encoding="utf-8") as archivo:
+            datos_metricas = json.load(archivo)
+    try:
+        manifiesto = registro.registrar_version(version, desde, COLUMNAS_MODELO, datos_metricas, descripcion)
+    except (ValueError, FileNotFoundError) as e:
+        raise click.ClickException(str(e))
+    click.echo(f"✅ Versión {version} registrada: {registro.ruta_version(version)}")
+    click.echo(json.dumps(manifiesto["archivos"], indent=2))
+
+@modelos_cli.command("entrenar")
+@click.option("--version", default=None, help="Nombre de la versión (por defecto, fecha y hora).")
+@click.option("--origen", type=click.Choice(["csv", "predicciones"]), default="csv", show_default=True,
+              help="csv: archivo etiquetado con el formato de ml/sensors.csv; predicciones: lecturas "
+                   "de la base etiquetadas con las predicciones de los propios modelos.")
+@click.option("--csv", "ruta_csv", default=os.path.join(registro.ML_DIR, "sensors.csv"), show_default=True)
+@click.option("--etiquetas-autogeneradas", is_flag=True,
+              help="Confirma el uso de --origen predicciones, cuyas etiquetas generó el modelo.")
+@click.option("--proceso-id", "proceso_ids", type=int, multiple=True, help="Procesos a usar (por defecto, todos).")
+@click.option("--n-estimators", type=int, default=100, show_default=True)
+@click.option("--n-jobs", type=int, default=-1, show_default=True, help="Núcleos a usar (-1 = todos).")
+@click.option("--tamano-lote", type=int, default=10000, show_default=True)
+@click.option("--multisalida", is_flag=True, help="Un solo bosque que predice alerta y tipo a la vez.")
+@click.option("--activar", "activar_version", is_flag=True, help="Activa la versión al terminar.")
+@with_appcontext
+def entrenar(version, origen, ruta_csv, etiquetas_autogeneradas, proceso_ids, n_estimators, n_jobs,
+             tamano_lote, multisalida, activar_version):
+    """Entrena ambos modelos y los registra como una nueva versión."""
+    from services.entrenamiento_service import iterar_datos_entrenamiento
+
+    # Las predicciones son salidas del modelo activo: entrenar con ellas solo lo imita.
+    if origen == "predicciones" and not etiquetas_autogeneradas:
+        raise click.ClickException(
+            "Las etiquetas de la tabla predicciones las generó el propio modelo; "
+            "agregue --etiquetas-autogeneradas para entrenar con ellas de todos modos."
+        )
+    version = version or datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    if origen == "csv":
+        bloques = leer_csv(ruta_csv)
+    else:
+        bloques = iterar_datos_entrenamiento(list(proceso_ids) or None, tamano_lote)
+
+    try:
+        manifiesto = ejecutar_pipeline(
+            bloques, version, n_estimators=n_estimators, n_jobs=n_jobs,
+            descripcion=f"Entrenado desde {origen}", multisalida=multisalida, informar=click.echo,
+            origen_etiquetas=f"csv:{os.path.basename(ruta_csv)}" if origen == "csv" else "predicciones",
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"✅ Versión {version} registrada con métricas {manifiesto['metricas']}")
+    if activar_version:
+        _activar(version)
+
+@modelos_cli.command("listar")
+def listar():
+    """Muestra las versiones registradas y cuál está activa."""
+    activa = registro.version_activa(forzar=True)
+    for manifiesto in registro.listar_versiones():
+        marca = "*" if manifiesto["version"] == activa else " "
+        click.echo(f"{marca} {manifiesto['version']:<20} {manifiesto.get('creado_en') or '-':<20} "
+                   f"{json.dumps(manifiesto.get('metricas') or {})}")
+
+@modelos_cli.command("activar")
+@click.argument("version")
+def activar(version):
+    """Valida y activa una versión para todos los workers."""
+    _activar(version)
+
+def _activar(version):
+    try:
+        cargador_modelos.activar(version)
+    except (LookupError, RuntimeError) as e:
+        raise click.ClickException(str(e))
+    while cargador_modelos.activacion["estado"] == "en_curso":
+        time.sleep(0.1)
+    if cargador_modelos.activacion["estado"] == "error":
+        raise click.ClickException(cargador_modelos.activacion["error"])
+    click.echo(f"✅ Versión {version} activa.")
@@ -0,0 +1,272 @@
+import atexit
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from itertools import islice, takewhile
+from sqlalchemy import desc, select, union_all
+from database.connection import db
+from database.models.lectura import Lectura
+from database.version_compartida import VersionCompartida, INTERVALO_VERIFICACION
+
+# Lectura liviana con los mismos atributos que usan las rutas al serializar.
+LecturaReciente = namedtuple(
+    "LecturaReciente", ["id", "sensor_id", "valor", "fecha_hora", "observaciones"]
+)
+
+# Cantidad de lecturas recientes que se guardan por (proceso, sensor).
+CAPACIDAD_BUFFER = int(os.environ.get("BUFFER_LECTURAS_CAPACIDAD", "100"))
+# Segundos mínimos entre dos publicaciones de la versión de un sensor desde este worker.
+# Las escrituras intermedias se anuncian juntas al cumplirse el intervalo.
+INTERVALO_PUBLICACION = float(os.environ.get("BUFFER_PUBLICACION_INTERVALO", str(INTERVALO_VERIFICACION)))
+
+
+class BufferLecturas:
+    """
+    Buffers circulares en memoria con las últimas lecturas de cada (proceso, sensor).
+    - Se llenan al registrar lecturas y se rehidratan desde la base de datos.
+    - Un buffer solo se usa si está sincronizado con la versión compartida de su
+      sensor; si otro worker escribió lecturas, se considera frío y se rehidrata.
+    - Cada worker publica la versión de un sensor como máximo una vez por
+      intervalo_publicacion: con ingesta repartida entre workers, los demás rehidratan
+      a lo sumo una vez por intervalo en lugar de en casi cada consulta. Un worker ve
+      las escrituras de otro con un retraso de hasta intervalo_publicacion más el
+      intervalo de lectura de la versión compartida.
+    """
+
+    def __init__(self, capacidad=CAPACIDAD_BUFFER, intervalo_publicacion=INTERVALO_PUBLICACION):
+        self.capacidad = capacidad
+        self.intervalo_publicacion = intervalo_publicacion
+        self._lock = threading.Lock()
+        self._buffers = {}       # (proceso_id, sensor_id) -> deque ordenado por fecha ascendente
+        self._sincronizado = {}  # (proceso_id, sensor_id) -> versión con la que se llenó
+        self._versiones = {}     # sensor_id -> VersionCompartida
+        self._pendientes = {}    # sensor_id -> escrituras de este worker aún no publicadas
+        self._publicado_en = {}  # sensor_id -> instante (monotonic) de la última publicación
+        self._programadas = set()  # sensores con una publicación diferida en curso
+
+    def _version(self, sensor_id):
+        version = self._versiones.get(sensor_id)
+        if version is None:
+            version = self._versiones.setdefault(
+                sensor_id, VersionCompartida(f"lecturas_sensor_{sensor_id}")
+            )
+        return version
+
+    def ultimas(self, proceso_id, sensor_id, limite):
+        """
+        Retorna hasta `limite` lecturas, de la más reciente a la más antigua,
+        o None si el buffer está frío o no alcanza para el límite pedido.
+        """
+        if limite > self.capacidad:
+            return None
+        clave = (proceso_id, sensor_id)
+        version = self._version(sensor_id).leer()
+        with self._lock:
+            buffer = self._buffers.get(clave)
+            if buffer is None or self._sincronizado.get(clave) != version:
+                return None
+            return list(islice(reversed(buffer), limite))
+
+    def version(self, sensor_id):
+        """
+        Versión de las lecturas de un sensor: la compartida más las escrituras de este
+        worker que todavía no se publicaron (así cambia con cada escritura local).
+        """
+        compartida = self._version(sensor_id).leer()
+        pendientes = self._pendientes.get(sensor_id)
+        return f"{compartida}+{pendientes}" if pendientes else compartida
+
+    def hidratar(self, proceso_id, sensor_id):
+        """Carga desde la base de datos las últimas lecturas de (proceso, sensor) y retorna el buffer."""
+        return self.hidratar_varios(proceso_id, [sensor_id])[sensor_id]
+
+    def hidratar_varios(self, proceso_id, sensor_ids):
+        """
+        Carga las últimas lecturas de varios sensores del proceso en una sola consulta:
+        un UNION ALL de un LIMIT por sensor, cada uno resuelto con el índice
+        (proceso_id, sensor_id, fecha_hora) sin recorrer todo el proceso.
+        Retorna {sensor_id: buffer cargado}.
+        """
+        sensor_ids = list(dict.fromkeys(sensor_ids))
+        if not sensor_ids:
+            return {}
+        # La versión se lee antes de consultar: una escritura posterior vuelve a enfriar el buffer.
+        versiones = {sensor_id: self._version(sensor_id).leer(forzar=True) for sensor_id in sensor_ids}
+        consultas = []
+        for sensor_id in sensor_ids:
+            ultimas = (
+                select(
+                    Lectura.id, Lectura.sensor_id, Lectura.valor,
+                    Lectura.fecha_hora, Lectura.observaciones
+                )
+                .where(Lectura.sensor_id == sensor_id, Lectura.proceso_id == proceso_id)
+                .order_by(desc(Lectura.fecha_hora), desc(Lectura.id))
+                .limit(self.capacidad)
+                .subquery()
+            )
+            consultas.append(select(*ultimas.c))
+        consulta = consultas[0] if len(consultas) == 1 else union_all(*consultas)
+        filas = {sensor_id: [] for sensor_id in sensor_ids}
+        for fila in db.session.execute(consulta):
+            filas[fila.sensor_id].append(LecturaReciente(*fila))
+
+        buffers = {}
+        with self._lock:
+            for sensor_id, recientes in filas.items():
+                recientes.sort(key=lambda l: (l.fecha_hora, l.id))
+                clave = (proceso_id, sensor_id)
+                buffers[sensor_id] = self._buffers[clave] = deque(recientes, maxlen=self.capacidad)
+                self._sincronizado[clave] = versiones[sensor_id]
+        return buffers
+
+    def obtener(self, proceso_id, sensor_id, limite):
+        """
+        Igual que ultimas(), pero rehidrata desde la base de datos si el buffer está frío.
+        Retorna None solo si el límite supera la capacidad del buffer.
+        """
+        if limite > self.capacidad:
+            return None
+        lecturas = self.ultimas(proceso_id, sensor_id, limite)
+        if lecturas is None:
+            buffer = self.hidratar(proceso_id, sensor_id)
+            with self._lock:
+                lecturas = list(islice(reversed(buffer), limite))
+        return lecturas
+
+    def obtener_varios(self, proceso_id, sensor_ids, limite):
+        """
+        obtener() para varios sensores: los buffers fríos se rehidratan juntos en una
+        sola consulta. Retorna {sensor_id: lecturas} o None si el límite supera la capacidad.
+        """
+        if limite > self.capacidad:
+            return None
+        resultado = {sensor_id: self.ultimas(proceso_id, sensor_id, limite) for sensor_id in sensor_ids}
+        frios = [sensor_id for sensor_id, lecturas in resultado.items() if lecturas is None]
+        if frios:
+            buffers = self.hidratar_varios(proceso_id, frios)
+            with self._lock:
+                for sensor_id, buffer in buffers.items():
+                    resultado[sensor_id] = list(islice(reversed(buffer), limite))
+        return resultado
+
+    def registrar(self, proceso_id, lectura):
+        """
+        Agrega una lectura recién confirmada al buffer de su (proceso, sensor) y anuncia
+        la escritura a los demás workers (de inmediato o al cumplirse el intervalo).
+        """
+        clave = (proceso_id, lectura.sensor_id)
+        version = self._version(lectura.sensor_id).leer()
+        with self._lock:
+            self._pendientes[lectura.sensor_id] = self._pendientes.get(lectura.sensor_id, 0) + 1
+            buffer = self._buffers.get(clave)
+            if buffer is not None:
+                # Si otro worker publicó escrituras o la lectura llega fuera de orden,
+                # el buffer ya no es confiable y se rehidratará en la próxima consulta.
+                if self._sincronizado.get(clave) != version or (
+                    buffer and lectura.fecha_hora < buffer[-1].fecha_hora
+                ):
+                    del self._buffers[clave]
+                elif not any(
+                    l.id == lectura.id for l in
+                    takewhile(lambda l: l.fecha_hora == lectura.fecha_hora, reversed(buffer))
+                ):
+                    # Una hidratación concurrente pudo haber leído ya esta fila de la base
+                    # de datos: solo puede estar en la cola con su misma fecha_hora.
+                    buffer.append(lectura)
+        self._programar_publicacion(lectura.sensor_id)
+
+    def _programar_publicacion(self, sensor_id):
+        with self._lock:
+            if sensor_id in self._programadas:
+                return
+            ahora = time.monotonic()
+            espera = self._publicado_en.get(sensor_id, -self.intervalo_publicacion) \
+                + self.intervalo_publicacion - ahora
+            if espera > 0:
+                self._programadas.add(sensor_id)
+                temporizador = threading.Timer(espera, self._publicar_programada, args=(sensor_id,))
+                temporizador.daemon = True
+                temporizador.start()
+                return
+            self._publicado_en[sensor_id] = ahora
+        self._publicar(sensor_id)
+
+    def _publicar_programada(self, sensor_id):
+        with self._lock:
+            self._programadas.discard(sensor_id)
+            self._publicado_en[sensor_id] = time.monotonic()
+        self._publicar(sensor_id)
+
+    def _publicar(self, sensor_id):
+        """Publica las escrituras pendientes de un sensor y mantiene sincronizados los buffers locales."""
+        with self._lock:
+            publicadas = self._pendientes.get(sensor_id, 0)
+        if not publicadas:
+            return
+        version_compartida = self._version(sensor_id)
+        version_previa = version_compartida.leer(forzar=True)
+        nueva_version = version_compartida.publicar()
+        with self._lock:
+            restantes = self._pendientes.get(sensor_id, 0) - publicadas
+            if restantes > 0:
+                self._pendientes[sensor_id] = restantes
+            else:
+                self._pendientes.pop(sensor_id, None)
+            for clave in [c for c in self._buffers if c[1] == sensor_id]:
+                # Un buffer al día con la versión anterior solo tiene, además, escrituras
+                # de este worker: sigue siendo válido con la nueva.
+                if self._sincronizado.get(clave) == version_previa:
+                    self._sincronizado[clave] = nueva_version
+                else:
+                    del self._buffers[clave]
+        if restantes > 0:
+            self._programar_publicacion(sensor_id)
+
+    def publicar_pendientes(self):
+        """Publica ya todas las escrituras pendientes (al terminar el worker)."""
+        for sensor_id in list(self._pendientes):
+            self._publicar(sensor_id)
+
+    def invalidar(self, proceso_id, sensor_ids):
+        """Enfría los buffers de los sensores indicados en todos los workers."""
+        for sensor_id in set(sensor_ids):
+            self._version(sensor_id).publicar()
+            with self._lock:
+                self._buffers.pop((proceso_id, sensor_id), None)
+
+    def descartar_proceso(self, proceso_id):
+        """Libera los buffers de un proceso que ya no está activo."""
+        with self._lock:
+            for clave in [c for c in self._buffers if c[0] == proceso_id]:
+                del self._buffers[clave]
+                self._sincronizado.pop(clave, None)
+
+
+buffer_lecturas = BufferLecturas()
+atexit.register(buffer_lecturas.publicar_pendientes)
+
+
+def precargar_buffers(app, sensor_ids):
+    """
+    Rehidrata en segundo plano los buffers del proceso activo al iniciar la aplicación,
+    para que las primeras consultas de los dashboards no toquen la base de datos.
+    """
+    from database.proceso_estado import obtener_proceso_activo
+
+    def _precargar():
+        with app.app_context():
+            try:
+                proceso = obtener_proceso_activo()
+                if proceso is None:
+                    return
+                buffer_lecturas.hidratar_varios(proceso.id, sensor_ids)
+                print(f"✅ Buffers de lecturas precargados (Proceso: {proceso.id})")
+            except Exception as e:
+                print(f"❌ Error al precargar buffers de lecturas: {e}")
+            finally:
+                db.session.remove()
+
+    hilo = threading.Thread(target=_precargar, name="precarga-buffers", daemon=True)
+    hilo.start()
+    return hilo
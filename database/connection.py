@@ -1,5 +1,8 @@
 import os
+import time
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
 
 # Cargar variables de entorno desde .env
@@ -7,6 +10,23 @@ load_dotenv()
 
 db = SQLAlchemy()
 
+
+class PoolMedido(QueuePool):
+    """
+    QueuePool que informa cuánto esperó cada solicitud de conexión (incluye abrir una
+    nueva si hacía falta). `observador` recibe los segundos; lo asigna el servicio de métricas.
+    """
+    observador = None
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if PoolMedido.observador is not None:
+                PoolMedido.observador(time.perf_counter() - inicio)
+
+
 def init_app(app):
     """
     Inicializa la base de datos con la aplicación Flask.
@@ -17,8 +37,17 @@ def init_app(app):
     host = os.environ.get("DB_HOST", "localhost")
     db_name = os.environ.get("DB_NAME", "biodigestor_db")
 
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"mysql+pymysql://{user}:{password}@{host}/{db_name}"
+    # DATABASE_URL (URL completa de SQLAlchemy) reemplaza a las variables DB_*;
+    # p. ej. sqlite:////tmp/bmis.db para pruebas de carga y benchmarks.
+    app.config['SQLALCHEMY_DATABASE_URI'] = (
+        os.environ.get("DATABASE_URL")
+        or f"mysql+pymysql://{user}:{password}@{host}/{db_name}"
+    )
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # SQLite en memoria usa un pool de una conexión por hilo; el resto usa QueuePool.
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if not (url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")):
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {}).setdefault('poolclass', PoolMedido)
 
     try:
         db.init_app(app)
@@ -1,7 +1,7 @@
-from database.models.lectura import Lectura
+from sqlalchemy import text
 from database.connection import db
-from sqlalchemy import desc
-from database.models.proceso_biodigestor import ProcesoBiodigestor
+from database.proceso_estado import obtener_proceso_activo
+from database.buffer_lecturas import buffer_lecturas
 
 SENSOR_IDS = {
     "gas": 1,
@@ -12,10 +12,10 @@ SENSOR_IDS = {
 class LecturaException(Exception):
     pass
 
-def obtener_ultima_lectura_combinada():
+def obtener_ultimas_lecturas():
     """
-    Retorna una tupla: (temperatura, presion, gas, timestamp)
-    Solo considera lecturas del proceso ACTIVO.
+    Retorna una tupla: (proceso_id, ultima_temp, ultima_pres, ultima_gas)
+    con la última lectura de cada sensor del proceso ACTIVO.
     Lanza LecturaException si faltan datos.
     """
     try:
@@ -26,50 +26,75 @@ def obtener_ultima_lectura_combinada():
 
         proceso_id = proceso_activo.id
 
-        # Obtener la última lectura de cada sensor para el proceso activo
-        ultima_temp = Lectura.query.filter_by(sensor_id=SENSOR_IDS["temperatura"], proceso_id=proceso_id)\
-            .order_by(desc(Lectura.fecha_hora)).first()
-        ultima_pres = Lectura.query.filter_by(sensor_id=SENSOR_IDS["presion"], proceso_id=proceso_id)\
-            .order_by(desc(Lectura.fecha_hora)).first()
-        ultima_gas = Lectura.query.filter_by(sensor_id=SENSOR_IDS["gas"], proceso_id=proceso_id)\
-            .order_by(desc(Lectura.fecha_hora)).first()
+        # Obtener la última lectura de cada sensor para el proceso activo (buffer en memoria;
+        # los buffers fríos se rehidratan juntos en una sola consulta)
+        ultimas = buffer_lecturas.obtener_varios(proceso_id, SENSOR_IDS.values(), 1)
+        ultima_temp, ultima_pres, ultima_gas = (
+            (ultimas[SENSOR_IDS[nombre]] or [None])[0] for nombre in ("temperatura", "presion", "gas")
+        )
 
         # Verificación: si alguna lectura falta
         if not (ultima_temp and ultima_pres and ultima_gas):
             raise LecturaException("Proceso activo sin lecturas completas aún.")
 
-        temperatura = float(ultima_temp.valor)
-        presion = float(ultima_pres.valor)
-        gas = float(ultima_gas.valor)
-        # Usamos la fecha más reciente entre las tres lecturas
-        timestamp = max(ultima_temp.fecha_hora, ultima_pres.fecha_hora, ultima_gas.fecha_hora)
-
-        return (temperatura, presion, gas, str(timestamp))
+        return (proceso_id, ultima_temp, ultima_pres, ultima_gas)
 
     except Exception as e:
         raise LecturaException(f"{e}")
 
+def combinar_lecturas(ultima_temp, ultima_pres, ultima_gas):
+    """Convierte las tres últimas lecturas en (temperatura, presion, gas, timestamp)."""
+    temperatura = float(ultima_temp.valor)
+    presion = float(ultima_pres.valor)
+    gas = float(ultima_gas.valor)
+    # Usamos la fecha más reciente entre las tres lecturas
+    timestamp = max(ultima_temp.fecha_hora, ultima_pres.fecha_hora, ultima_gas.fecha_hora)
+
+    return (temperatura, presion, gas, str(timestamp))
+
+def obtener_ultima_lectura_combinada():
+    """
+    Retorna una tupla: (temperatura, presion, gas, timestamp)
+    Solo considera lecturas del proceso ACTIVO.
+    Lanza LecturaException si faltan datos.
+    """
+    _, ultima_temp, ultima_pres, ultima_gas = obtener_ultimas_lecturas()
+    return combinar_lecturas(ultima_temp, ultima_pres, ultima_gas)
+
 
 def obtener_fecha_inicio_proceso_activo():
     """
     Retorna la fecha de inicio del proceso ACTIVO o None si no hay.
     """
-    proceso = ProcesoBiodigestor.query.filter_by(estado='ACTIVO').first()
+    proceso = obtener_proceso_activo()
     return proceso.fecha_inicio if proceso else None
 
 def hay_proceso_activo():
     """
-    Verifica si existe un registro de ProcesoBiodigestor con estado 'ACTIVO'.
+    Verifica si existe un ProcesoBiodigestor con estado 'ACTIVO'.
 
-    :return: El objeto ProcesoBiodigestor activo si existe, de lo contrario None.
+    :return: El ProcesoActivo (id, fecha_inicio) en caché si existe, de lo contrario None.
     """
-    # 1. Ejecuta la consulta
-    proceso_activo = ProcesoBiodigestor.query.filter_by(estado='ACTIVO').first()
+    # 1. Consulta la caché compartida del proceso activo
+    proceso_activo = obtener_proceso_activo()
 
     # 2. 🚨 LOG DE VERIFICACIÓN 🚨
     if proceso_activo:
-        print(f"✅ DB LOG: Proceso ACTIVO encontrado. ID: {proceso_activo.id}, Estado: {proceso_activo.estado}")
+        print(f"✅ DB LOG: Proceso ACTIVO encontrado. ID: {proceso_activo.id}")
     else:
         print("❌ DB LOG: NO se encontró ningún Proceso ACTIVO.")
     
     return proceso_activo
+
+def verificar_conexion():
+    """
+    Comprueba que la base de datos responde con un SELECT 1.
+
+    :return: (True, None) si responde, (False, mensaje de error) si no.
+    """
+    try:
+        db.session.execute(text("SELECT 1"))
+        return True, None
+    except Exception as e:
+        db.session.rollback()
+        return False, str(e)
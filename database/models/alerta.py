@@ -0,0 +1,41 @@
+from database.connection import db
+
+class Alerta(db.Model):
+    """
+    Evento anómalo detectado en línea sobre las lecturas de un sensor.
+    - regla: 'umbral', 'zscore' o 'tasa'; tipo: descripción (p. ej. 'Presión baja').
+    - fin es NULL mientras el evento sigue abierto.
+    - valor_minimo/valor_maximo y lecturas se completan al cerrarse el evento.
+    """
+    __tablename__ = "alertas"
+    __table_args__ = (
+        db.Index("ix_alertas_proceso_inicio", "proceso_id", "inicio"),
+        db.Index("ix_alertas_proceso_sensor_fin", "proceso_id", "sensor_id", "fin"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    proceso_id = db.Column(db.Integer, db.ForeignKey("proceso_biodigestor.id"), nullable=False)
+    sensor_id = db.Column(db.Integer, db.ForeignKey("sensores.id"), nullable=False)
+    tipo = db.Column(db.String(50), nullable=False)
+    regla = db.Column(db.String(10), nullable=False)
+    inicio = db.Column(db.DateTime, nullable=False)
+    fin = db.Column(db.DateTime, nullable=True)
+    valor_inicio = db.Column(db.Float, nullable=False)
+    valor_minimo = db.Column(db.Float, nullable=False)
+    valor_maximo = db.Column(db.Float, nullable=False)
+    lecturas = db.Column(db.Integer, nullable=False, default=1)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "proceso_id": self.proceso_id,
+            "sensor_id": self.sensor_id,
+            "tipo": self.tipo,
+            "regla": self.regla,
+            "inicio": self.inicio.isoformat(),
+            "fin": self.fin.isoformat() if self.fin else None,
+            "valor_inicio": self.valor_inicio,
+            "valor_minimo": self.valor_minimo,
+            "valor_maximo": self.valor_maximo,
+            "lecturas": self.lecturas
+        }
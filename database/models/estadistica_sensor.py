@@ -0,0 +1,27 @@
+from database.connection import db
+from datetime import datetime
+
+class EstadisticaSensor(db.Model):
+    """
+    Estadísticas acumuladas de las lecturas de un sensor durante un proceso.
+    - media y m2 (suma de cuadrados de las desviaciones) se combinan con la fórmula
+      de Welford/Chan, así los aportes de cada worker se suman sin releer lecturas.
+    - digest: t-digest serializado en JSON para estimar cuantiles (p50, p95, p99).
+    - congelado: el proceso terminó y las estadísticas ya son definitivas.
+    """
+    __tablename__ = "estadisticas_sensor"
+    __table_args__ = (
+        db.UniqueConstraint("proceso_id", "sensor_id", name="uq_estadisticas_sensor_proceso"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    proceso_id = db.Column(db.Integer, db.ForeignKey("proceso_biodigestor.id"), nullable=False)
+    sensor_id = db.Column(db.Integer, db.ForeignKey("sensores.id"), nullable=False)
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+    media = db.Column(db.Float, nullable=False, default=0.0)
+    m2 = db.Column(db.Float, nullable=False, default=0.0)
+    minimo = db.Column(db.Float, nullable=True)
+    maximo = db.Column(db.Float, nullable=True)
+    digest = db.Column(db.Text, nullable=True)
+    congelado = db.Column(db.Boolean, nullable=False, default=False)
+    actualizado_en = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -7,6 +7,14 @@ class Lectura(db.Model):
     - proceso_id nullable permite lecturas fuera de procesos activos.
     """
     __tablename__ = "lecturas"
+    __table_args__ = (
+        # Últimas lecturas por (proceso, sensor): buffers y gráficas.
+        db.Index("ix_lecturas_proceso_sensor_fecha", "proceso_id", "sensor_id", "fecha_hora"),
+        # Recorrido cronológico paginado de un proceso completo.
+        db.Index("ix_lecturas_proceso_fecha_id", "proceso_id", "fecha_hora", "id"),
+        # Paginación por clave (fecha_hora, id) en GET /api/lecturas.
+        db.Index("ix_lecturas_fecha_id", "fecha_hora", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     sensor_id = db.Column(db.Integer, db.ForeignKey('sensores.id'), nullable=False)
@@ -0,0 +1,41 @@
+from database.connection import db
+
+class LecturaAgregada(db.Model):
+    """
+    Agregado de lecturas por intervalo de tiempo (bucket) para cada sensor y proceso.
+    - resolucion: '1m', '1h' o '1d'; inicio es el comienzo del bucket.
+    - Se guarda la suma (no el promedio) para poder combinar buckets incrementalmente.
+    """
+    __tablename__ = "lecturas_agregadas"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "proceso_id", "sensor_id", "resolucion", "inicio",
+            name="uq_lecturas_agregadas_bucket"
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    proceso_id = db.Column(db.Integer, db.ForeignKey("proceso_biodigestor.id"), nullable=False)
+    sensor_id = db.Column(db.Integer, db.ForeignKey("sensores.id"), nullable=False)
+    resolucion = db.Column(db.String(3), nullable=False)
+    inicio = db.Column(db.DateTime, nullable=False)
+    minimo = db.Column(db.Float, nullable=False)
+    maximo = db.Column(db.Float, nullable=False)
+    suma = db.Column(db.Float, nullable=False)
+    cantidad = db.Column(db.Integer, nullable=False)
+    ultimo = db.Column(db.Float, nullable=False)
+    ultimo_fecha = db.Column(db.DateTime, nullable=False)
+
+    @property
+    def promedio(self):
+        return self.suma / self.cantidad if self.cantidad else None
+
+    def to_dict(self):
+        return {
+            "inicio": self.inicio.isoformat(),
+            "min": self.minimo,
+            "max": self.maximo,
+            "avg": self.promedio,
+            "count": self.cantidad,
+            "last": self.ultimo
+        }
@@ -0,0 +1,23 @@
+from database.connection import db
+from datetime import datetime
+
+class Prediccion(db.Model):
+    """
+    Predicción de los modelos de IA para un instante de un proceso.
+    Se genera al reevaluar procesos completos (auditoría de alertas).
+    """
+    __tablename__ = "predicciones"
+    __table_args__ = (
+        db.Index("ix_predicciones_proceso_fecha", "proceso_id", "fecha_hora"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    proceso_id = db.Column(db.Integer, db.ForeignKey("proceso_biodigestor.id"), nullable=False)
+    fecha_hora = db.Column(db.DateTime, nullable=False)
+    temperatura = db.Column(db.Float, nullable=False)
+    presion = db.Column(db.Float, nullable=False)
+    gas = db.Column(db.Float, nullable=False)
+    dia_proceso = db.Column(db.Integer, nullable=False)
+    alerta_ia = db.Column(db.Integer, nullable=False)
+    tipo_alerta = db.Column(db.String(50), nullable=False)
+    creado_en = db.Column(db.DateTime, default=datetime.utcnow)
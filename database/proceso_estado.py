@@ -0,0 +1,80 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from database.connection import db
+from database.models.proceso_biodigestor import ProcesoBiodigestor
+from database.version_compartida import VersionCompartida
+
+# Instantánea inmutable del proceso activo (no es un objeto ORM ligado a la sesión).
+ProcesoActivo = namedtuple("ProcesoActivo", ["id", "fecha_inicio"])
+
+# Tiempo máximo que se confía en la caché sin volver a consultar la base de datos,
+# por si el proceso se modifica fuera de la aplicación.
+TTL_PROCESO_ACTIVO = float(os.environ.get("PROCESO_CACHE_TTL", "30"))
+
+
+class EstadoProceso:
+    """
+    Caché en memoria del proceso ACTIVO compartida por todos los servicios.
+    - Se invalida en este worker al iniciar/finalizar un proceso.
+    - Los demás workers detectan el cambio a través de una VersionCompartida.
+    """
+
+    def __init__(self, ttl=TTL_PROCESO_ACTIVO):
+        self.ttl = ttl
+        self._version = VersionCompartida("proceso_activo")
+        self._lock = threading.Lock()
+        self._proceso = None
+        self._cargado = False
+        self._version_cargada = None
+        self._cargado_en = 0.0
+        self._generacion = 0
+
+    def obtener(self):
+        """Retorna el ProcesoActivo vigente o None si no hay proceso activo."""
+        version = self._version.leer()
+        if (
+            self._cargado
+            and self._version_cargada == version
+            and time.monotonic() - self._cargado_en < self.ttl
+        ):
+            return self._proceso
+        return self._recargar(version)
+
+    def _recargar(self, version):
+        generacion = self._generacion
+        fila = (
+            db.session.query(ProcesoBiodigestor.id, ProcesoBiodigestor.fecha_inicio)
+            .filter_by(estado="ACTIVO")
+            .first()
+        )
+        proceso = ProcesoActivo(fila.id, fila.fecha_inicio) if fila else None
+        with self._lock:
+            # Si hubo una invalidación mientras se consultaba, no se guarda el dato viejo.
+            if generacion == self._generacion:
+                self._proceso = proceso
+                self._cargado = True
+                self._version_cargada = version
+                self._cargado_en = time.monotonic()
+        return proceso
+
+    def invalidar(self):
+        """Descarta la caché local y avisa al resto de workers."""
+        with self._lock:
+            self._generacion += 1
+            self._cargado = False
+        self._version.publicar()
+
+
+estado_proceso = EstadoProceso()
+
+
+def obtener_proceso_activo():
+    """Retorna el ProcesoActivo (id, fecha_inicio) desde la caché, o None."""
+    return estado_proceso.obtener()
+
+
+def invalidar_proceso_activo():
+    """Debe llamarse después de confirmar cualquier cambio de estado de un proceso."""
+    estado_proceso.invalidar()
@@ -0,0 +1,67 @@
+import threading
+from database.version_compartida import VersionCompartida
+
+# Tablas de configuración y catálogo cuyas lecturas se sirven con ETag.
+SENSORES = "sensores"
+GRAFICAS = "graph_configs"
+VOZ = "voice_config"
+USUARIOS = "usuarios"
+
+
+class RecursoVersionado:
+    """
+    Contador de cambios de una tabla, compartido entre workers, y caché en memoria
+    de las respuestas ya serializadas para la versión vigente.
+    - Cada escritor llama a marcar_cambio() después de confirmar (commit).
+    - Una respuesta guardada solo se sirve mientras la versión no cambie; los demás
+      workers ven la versión nueva en a lo sumo BMIS_VERSION_INTERVALO segundos.
+    """
+
+    def __init__(self, tabla):
+        self.tabla = tabla
+        self._version = VersionCompartida(f"tabla_{tabla}")
+        self._lock = threading.Lock()
+        self._respuestas = {}  # clave -> (versión, cuerpo serializado)
+
+    def version(self):
+        """Versión vigente de la tabla (nunca '0', para no repetir ETags tras un reinicio)."""
+        version = self._version.leer()
+        if version == "0":
+            # Sin versión publicada (p. ej. se borró el directorio de estado): se
+            # inventa una nueva para que ningún ETag anterior vuelva a coincidir.
+            version = self._version.publicar()
+        return version
+
+    def etag(self, version):
+        return f"{self.tabla}-{version}"
+
+    def marcar_cambio(self):
+        """Descarta las respuestas guardadas y publica una versión nueva."""
+        with self._lock:
+            self._respuestas.clear()
+        self._version.publicar()
+
+    def obtener(self, clave, version):
+        """Cuerpo guardado para la clave si corresponde a la versión pedida, o None."""
+        guardado = self._respuestas.get(clave)
+        if guardado is not None and guardado[0] == version:
+            return guardado[1]
+        return None
+
+    def guardar(self, clave, version, cuerpo):
+        # La versión se leyó antes de consultar la BD: si hubo un cambio mientras tanto,
+        # la versión ya no coincide y la respuesta simplemente no se reutiliza.
+        with self._lock:
+            self._respuestas[clave] = (version, cuerpo)
+
+
+recursos = {tabla: RecursoVersionado(tabla) for tabla in (SENSORES, GRAFICAS, VOZ, USUARIOS)}
+
+
+def obtener_recurso(tabla):
+    return recursos[tabla]
+
+
+def marcar_cambio(tabla):
+    """Debe llamarse después de confirmar cualquier escritura en la tabla."""
+    recursos[tabla].marcar_cambio()
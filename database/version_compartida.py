@@ -0,0 +1,74 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+# Directorio compartido por todos los workers de gunicorn de la misma máquina.
+DIRECTORIO_ESTADO = os.environ.get(
+    "BMIS_ESTADO_DIR", os.path.join(tempfile.gettempdir(), "bmis_estado")
+)
+# Segundos máximos que un worker puede tardar en ver un cambio publicado por otro.
+INTERVALO_VERIFICACION = float(os.environ.get("BMIS_VERSION_INTERVALO", "1.0"))
+
+
+def proceso_vivo(pid):
+    """True si existe un proceso con ese pid en la máquina (dueño de un archivo compartido)."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class VersionCompartida:
+    """
+    Marca de versión compartida entre procesos mediante un archivo pequeño.
+    - publicar() escribe una nueva versión de forma atómica (os.replace).
+    - leer() relee el archivo como máximo una vez por intervalo, por lo que
+      el costo por llamada es casi siempre una comparación en memoria.
+    """
+
+    def __init__(self, nombre, intervalo=INTERVALO_VERIFICACION, directorio=None):
+        self.ruta = os.path.join(directorio or DIRECTORIO_ESTADO, f"{nombre}.version")
+        self.intervalo = intervalo
+        self._valor = None
+        self._verificado_en = 0.0
+
+    def leer(self, forzar=False):
+        """
+        Retorna la versión vigente (o '0' si nunca se publicó ninguna).
+        Con forzar=True ignora el intervalo y relee siempre el archivo.
+        """
+        ahora = time.monotonic()
+        if not forzar and self._valor is not None and ahora - self._verificado_en < self.intervalo:
+            return self._valor
+        try:
+            with open(self.ruta, encoding="utf-8") as archivo:
+                valor = archivo.read().strip() or "0"
+        except FileNotFoundError:
+            valor = "0"
+        except OSError as e:
+            print(f"❌ Error al leer versión compartida {self.ruta}: {e}")
+            valor = self._valor or "0"
+        self._valor = valor
+        self._verificado_en = ahora
+        return valor
+
+    def publicar(self, valor=None):
+        """Publica una nueva versión para todos los workers y la retorna."""
+        valor = str(valor) if valor is not None else uuid.uuid4().hex
+        temporal = f"{self.ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+            with open(temporal, "w", encoding="utf-8") as archivo:
+                archivo.write(valor)
+            os.replace(temporal, self.ruta)
+        except OSError as e:
+            # Sin archivo compartido el cambio solo es visible en este worker.
+            print(f"❌ Error al publicar versión compartida {self.ruta}: {e}")
+        self._valor = valor
+        self._verificado_en = time.monotonic()
+        return valor
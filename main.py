@@ -1,6 +1,11 @@
+import os
+import click
 from flask import Flask
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from database.connection import init_app
+from database.buffer_lecturas import precargar_buffers
+from database.db_service import SENSOR_IDS
 from routes.auth_bp import auth_bp
 from routes.sensors_bp import sensors_bp
 from routes.graph_bp import graph_bp
@@ -9,11 +14,77 @@ from routes.ai_bp import ai_bp
 from routes.users_bp import users_bp
 from routes.voice_bp import voice_bp
 from routes.proceso_bp import proceso_bp
+from routes.stream_bp import stream_bp
+from routes.health_bp import health_bp
+from routes.modelos_bp import modelos_bp
+from routes.dashboard_bp import dashboard_bp
+from routes.metricas_bp import metricas_bp
+from services.ai_service import iniciar_carga_modelos
+from services.estadisticas_service import iniciar_volcado_estadisticas
+from services.ingesta_service import iniciar_ingesta
+from services.metricas_service import instrumentar_app, iniciar_publicacion_metricas
+from services.eventos_service import iniciar_relevo_eventos
+from services.presupuesto_consultas import vigilar_consultas
+from commands.base_datos import bd_cli
+from commands.agregados import agregados_cli
+from commands.modelos import modelos_cli
+from commands.estadisticas import estadisticas_cli
+
+# Proxies inversos (nginx, balanceador) delante de la app. Con N > 0 la IP del cliente
+# (request.remote_addr, usada por el límite de intentos de login) se toma del N-ésimo
+# valor de X-Forwarded-For desde la derecha; con 0 se ignora el encabezado.
+PROXIES_CONFIABLES = int(os.environ.get("PROXIES_CONFIABLES", "0"))
+
+# pid del proceso que ya inició los servicios de fondo (los workers forkeados inician los suyos).
+_servicios_iniciados_en = None
+
+def _comando_cli():
+    """True si la app se crea para un comando de `flask` que no es `flask run`."""
+    contexto = click.get_current_context(silent=True)
+    return contexto is not None and contexto.command.name != "run"
+
+def iniciar_servicios_de_fondo(app):
+    """
+    Hilos y hooks de atexit de la aplicación: una sola vez por proceso, aunque se
+    cree más de una app, y nunca para los comandos de mantenimiento.
+    """
+    global _servicios_iniciados_en
+    if _servicios_iniciados_en == os.getpid() or _comando_cli():
+        return
+    _servicios_iniciados_en = os.getpid()
+
+    # Rehidrata en segundo plano los buffers de lecturas del proceso activo
+    precargar_buffers(app, SENSOR_IDS.values())
+
+    # Carga los modelos de IA en segundo plano (ver GET /api/health/ready)
+    iniciar_carga_modelos()
+
+    # Vuelca periódicamente las estadísticas por proceso acumuladas en este worker
+    iniciar_volcado_estadisticas(app)
+
+    # Escritor de la ingesta asíncrona de lecturas (solo con INGESTA_ASINCRONA=1)
+    iniciar_ingesta(app)
+
+    # Publica las métricas de este worker para GET /metrics
+    iniciar_publicacion_metricas()
+
+    # Reenvía los eventos del canal SSE entre los workers de la máquina
+    iniciar_relevo_eventos()
 
 def create_app():
     app = Flask(__name__)
     init_app(app)
 
+    if PROXIES_CONFIABLES:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXIES_CONFIABLES, x_proto=PROXIES_CONFIABLES)
+
+    # Métricas de latencia y SQL por ruta (GET /metrics). Se registra antes que los
+    # blueprints para medir también las solicitudes que rechaza la autenticación.
+    instrumentar_app(app)
+
+    # Presupuesto de consultas por endpoint y detección de N+1 (solo con CONSULTAS_VIGILAR=1)
+    vigilar_consultas(app)
+
     # Habilitar CORS para todas las rutas y orígenes
     CORS(app)
 
@@ -25,6 +96,19 @@ def create_app():
     app.register_blueprint(users_bp, url_prefix="/api") 
     app.register_blueprint(voice_bp,url_prefix="/api")
     app.register_blueprint(proceso_bp, url_prefix="/api")
+    app.register_blueprint(stream_bp, url_prefix="/api")
+    app.register_blueprint(health_bp, url_prefix="/api")
+    app.register_blueprint(modelos_bp, url_prefix="/api")
+    app.register_blueprint(dashboard_bp, url_prefix="/api")
+    app.register_blueprint(metricas_bp)
+
+    # Comandos de mantenimiento: flask bd ..., flask agregados ..., flask modelos ..., flask estadisticas ...
+    app.cli.add_command(bd_cli)
+    app.cli.add_command(agregados_cli)
+    app.cli.add_command(modelos_cli)
+    app.cli.add_command(estadisticas_cli)
+
+    iniciar_servicios_de_fondo(app)
 
     return app
 
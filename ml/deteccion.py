@@ -0,0 +1,180 @@
+"""
+Detector en línea de anomalías de los sensores del biodigestor.
+
+Se evalúa con cada lectura y mantiene por (proceso, sensor) un estado de tamaño fijo:
+- Umbrales de ml/utils (temperatura baja/alta, presión baja, gas alto).
+- Desviación respecto de la media móvil exponencial (EWMA): z-score con la varianza
+  también exponencial, activo tras unas lecturas de calentamiento.
+- Tasa de cambio entre lecturas consecutivas (unidades por segundo).
+
+Cada regla abre un evento cuando se viola y lo cierra cuando deja de violarse; las
+reglas estadísticas cierran recién a la mitad del límite (histéresis), para que una
+señal que oscila en el borde no genere eventos en ráfaga. Solo las transiciones
+(inicio/fin) salen del detector: una lectura normal no reserva memoria.
+"""
+import math
+import threading
+from collections import namedtuple
+
+from ml.utils import GAS_MAX, PRESION_MIN, TEMPERATURA_MAX, TEMPERATURA_MIN
+
+REGLA_UMBRAL = "umbral"
+REGLA_ZSCORE = "zscore"
+REGLA_TASA = "tasa"
+
+TIPO_ZSCORE = "Desviación anómala"
+TIPO_TASA = "Cambio brusco"
+
+# (tipo, mínimo, máximo) por sensor, con los mismos nombres que obtener_recomendacion.
+UMBRALES = {
+    "temperatura": (("Temperatura baja", TEMPERATURA_MIN, None), ("Temperatura alta", None, TEMPERATURA_MAX)),
+    "presion": (("Presión baja", PRESION_MIN, None),),
+    "gas": (("Nivel alto de gas", None, GAS_MAX),),
+}
+# Máxima variación esperable por segundo entre lecturas consecutivas.
+TASA_MAXIMA = {"temperatura": 0.5, "presion": 5.0, "gas": 100.0}
+
+ALFA_EWMA = 0.05
+LIMITE_Z = 4.0
+LECTURAS_CALENTAMIENTO = 30
+
+Transicion = namedtuple(
+    "Transicion",
+    ["sensor_id", "tipo", "regla", "evento", "fecha_hora", "valor", "minimo", "maximo", "lecturas"],
+)
+
+
+class EventoAbierto:
+    """Evento en curso de una regla: valor inicial, extremos y lecturas que abarca."""
+    __slots__ = ("regla", "valor_inicio", "minimo", "maximo", "lecturas")
+
+    def __init__(self, regla, valor, minimo=None, maximo=None, lecturas=1):
+        self.regla = regla
+        self.valor_inicio = valor
+        self.minimo = valor if minimo is None else minimo
+        self.maximo = valor if maximo is None else maximo
+        self.lecturas = lecturas
+
+
+class EstadoSensor:
+    """Estado compacto de un (proceso, sensor): EWMA, última lectura y eventos abiertos."""
+    __slots__ = ("n", "media", "varianza", "ultimo_valor", "ultimo_t", "abiertos")
+
+    def __init__(self, abiertos=None):
+        self.n = 0
+        self.media = 0.0
+        self.varianza = 0.0
+        self.ultimo_valor = None
+        self.ultimo_t = None
+        self.abiertos = abiertos or {}  # tipo -> EventoAbierto
+
+
+class DetectorAnomalias:
+    """
+    Estados por (proceso_id, sensor_id) y reglas por sensor.
+    nombres_sensor: sensor_id -> "temperatura" | "presion" | "gas".
+    """
+
+    def __init__(self, nombres_sensor, alfa=ALFA_EWMA, limite_z=LIMITE_Z,
+                 calentamiento=LECTURAS_CALENTAMIENTO, umbrales=UMBRALES, tasas=TASA_MAXIMA):
+        self.alfa = alfa
+        self.limite_z = limite_z
+        self.calentamiento = calentamiento
+        self._umbrales = {sid: umbrales.get(nombre, ()) for sid, nombre in nombres_sensor.items()}
+        self._tasas = {sid: tasas.get(nombre) for sid, nombre in nombres_sensor.items()}
+        self._estados = {}
+        self._lock = threading.Lock()
+
+    def conoce(self, proceso_id, sensor_id):
+        return (proceso_id, sensor_id) in self._estados
+
+    def crear(self, proceso_id, sensor_id, abiertos=None):
+        """Crea el estado de un (proceso, sensor), con los eventos que ya estaban abiertos."""
+        with self._lock:
+            self._estados.setdefault((proceso_id, sensor_id), EstadoSensor(abiertos))
+
+    def sincronizar_abiertos(self, proceso_id, sensor_id, abiertos):
+        """
+        Alinea los eventos abiertos de un (proceso, sensor) con los de `abiertos` (tipo ->
+        EventoAbierto, los vigentes para todos los workers): descarta los que ya se cerraron
+        y adopta los que se abrieron en otro lado. Los que siguen abiertos conservan sus
+        extremos locales.
+        """
+        with self._lock:
+            estado = self._estados.get((proceso_id, sensor_id))
+            if estado is None:
+                self._estados[(proceso_id, sensor_id)] = EstadoSensor(abiertos)
+                return
+            estado.abiertos = {
+                tipo: estado.abiertos.get(tipo, evento) for tipo, evento in abiertos.items()
+            }
+
+    def descartar_proceso(self, proceso_id):
+        with self._lock:
+            for clave in [c for c in self._estados if c[0] == proceso_id]:
+                del self._estados[clave]
+
+    def evaluar(self, proceso_id, sensor_id, valor, t, fecha_hora=None):
+        """
+        Evalúa una lectura (t: segundos, cualquier origen fijo) y actualiza el estado.
+        Una lectura anterior a la última evaluada (cargada tarde o fuera de orden) se
+        ignora: cerraría eventos antes de su inicio y haría retroceder la EWMA y la tasa.
+        Retorna una lista de Transicion, casi siempre vacía.
+        """
+        transiciones = []
+        with self._lock:
+            estado = self._estados.get((proceso_id, sensor_id))
+            if estado is None:
+                estado = self._estados[(proceso_id, sensor_id)] = EstadoSensor()
+            if estado.ultimo_t is not None and t < estado.ultimo_t:
+                return transiciones
+            abiertos = estado.abiertos
+
+            for tipo, minimo, maximo in self._umbrales.get(sensor_id, ()):
+                violada = (minimo is not None and valor < minimo) or (maximo is not None and valor > maximo)
+                self._transicion(transiciones, abiertos, sensor_id, tipo, REGLA_UMBRAL, violada, valor, fecha_hora)
+
+            # z-score contra la EWMA previa; después se incorpora la lectura.
+            if estado.n >= self.calentamiento and estado.varianza > 0.0:
+                z = abs(valor - estado.media) / math.sqrt(estado.varianza)
+                limite = self.limite_z / 2 if TIPO_ZSCORE in abiertos else self.limite_z
+                self._transicion(transiciones, abiertos, sensor_id, TIPO_ZSCORE, REGLA_ZSCORE,
+                                 z > limite, valor, fecha_hora)
+            if estado.n:
+                diferencia = valor - estado.media
+                incremento = self.alfa * diferencia
+                estado.media += incremento
+                estado.varianza = (1.0 - self.alfa) * (estado.varianza + diferencia * incremento)
+            else:
+                estado.media = valor
+            estado.n += 1
+
+            tasa_maxima = self._tasas.get(sensor_id)
+            if tasa_maxima is not None and estado.ultimo_t is not None and t > estado.ultimo_t:
+                tasa = abs(valor - estado.ultimo_valor) / (t - estado.ultimo_t)
+                limite = tasa_maxima / 2 if TIPO_TASA in abiertos else tasa_maxima
+                self._transicion(transiciones, abiertos, sensor_id, TIPO_TASA, REGLA_TASA,
+                                 tasa > limite, valor, fecha_hora)
+            estado.ultimo_valor = valor
+            estado.ultimo_t = t
+        return transiciones
+
+    @staticmethod
+    def _transicion(transiciones, abiertos, sensor_id, tipo, regla, violada, valor, fecha_hora):
+        evento = abiertos.get(tipo)
+        if evento is None:
+            if violada:
+                abiertos[tipo] = EventoAbierto(regla, valor)
+                transiciones.append(Transicion(sensor_id, tipo, regla, "inicio", fecha_hora, valor, valor, valor, 1))
+            return
+        if violada:
+            evento.lecturas += 1
+            if valor < evento.minimo:
+                evento.minimo = valor
+            elif valor > evento.maximo:
+                evento.maximo = valor
+            return
+        del abiertos[tipo]
+        transiciones.append(Transicion(
+            sensor_id, tipo, regla, "fin", fecha_hora, valor, evento.minimo, evento.maximo, evento.lecturas
+        ))
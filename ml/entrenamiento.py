@@ -0,0 +1,254 @@
+"""
+Pipeline de entrenamiento de los modelos de alerta.
+
+Los datos llegan como bloques (features float32 Nx4, alerta, tipo) desde cualquier
+origen (la base de datos o un CSV); se consolidan una sola vez, se dividen en
+entrenamiento/prueba y los dos bosques se entrenan en paralelo en procesos
+separados. Cada etapa queda cronometrada.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+
+from ml import registro
+
+COLUMNAS_FEATURES = ["temperatura_celsius", "presion_biogas_kpa", "mq4_ppm", "dia_proceso"]
+PROPORCION_PRUEBA = 0.2
+SEMILLA = 42
+TAMANO_BLOQUE_CSV = 100000
+
+
+class Cronometro:
+    """Registra la duración de cada etapa del pipeline e informa al terminarla."""
+
+    def __init__(self, informar=print):
+        self.etapas = {}
+        self.informar = informar
+
+    @contextmanager
+    def etapa(self, nombre):
+        inicio = time.perf_counter()
+        yield
+        duracion = time.perf_counter() - inicio
+        self.etapas[nombre] = round(duracion, 3)
+        self.informar(f"⏱️  {nombre}: {duracion:.2f}s")
+
+
+class ConjuntoEntrenamiento:
+    """
+    Acumula bloques de features y etiquetas.
+    Las features se guardan en float32 (los árboles de scikit-learn comparan en float32,
+    así que no se pierde precisión) y se concatenan una única vez al consolidar.
+    """
+
+    def __init__(self):
+        self._features, self._alertas, self._tipos = [], [], []
+        self.filas = 0
+
+    def agregar(self, features, alertas, tipos):
+        if not len(features):
+            return
+        self._features.append(np.asarray(features, dtype=np.float32))
+        self._alertas.append(np.asarray(alertas, dtype=np.int8))
+        self._tipos.append(np.asarray(tipos, dtype=object))
+        self.filas += len(features)
+
+    def consolidar(self):
+        """Retorna (X float32 Nx4, y_alerta, y_tipo) y libera los bloques."""
+        if not self.filas:
+            raise ValueError("No hay datos etiquetados para entrenar.")
+        datos = (
+            np.concatenate(self._features),
+            np.concatenate(self._alertas),
+            np.concatenate(self._tipos),
+        )
+        self._features, self._alertas, self._tipos = [], [], []
+        return datos
+
+
+def leer_csv(ruta, tamano_bloque=TAMANO_BLOQUE_CSV):
+    """
+    Lee un CSV etiquetado (formato de ml/sensors.csv) por bloques.
+    Genera (features float32, alerta 0/1, tipo_alerta).
+    """
+    import pandas as pd
+
+    lector = pd.read_csv(
+        ruta, chunksize=tamano_bloque,
+        usecols=COLUMNAS_FEATURES + ["alerta_ia", "tipo_alerta"],
+        dtype={columna: np.float32 for columna in COLUMNAS_FEATURES},
+    )
+    for bloque in lector:
+        alertas = (
+            bloque["alerta_ia"].astype(str).str.lower()
+            .map({"true": 1, "false": 0, "1": 1, "0": 0}).fillna(0).astype(np.int8)
+        )
+        tipos = bloque["tipo_alerta"].fillna("Normal").astype(str)
+        yield bloque[COLUMNAS_FEATURES].to_numpy(), alertas.to_numpy(), tipos.to_numpy()
+
+
+def dividir(filas, proporcion_prueba=PROPORCION_PRUEBA, semilla=SEMILLA):
+    """Índices (entrenamiento, prueba) de una partición aleatoria reproducible."""
+    indices = np.random.default_rng(semilla).permutation(filas)
+    corte = int(round(filas * (1 - proporcion_prueba)))
+    return np.sort(indices[:corte]), np.sort(indices[corte:])
+
+
+def _entrenar_modelo(X, y, n_estimators, n_jobs, semilla):
+    """Entrena un RandomForest (se ejecuta dentro de un proceso del pool)."""
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+
+    inicio = time.perf_counter()
+    modelo = RandomForestClassifier(n_estimators=n_estimators, n_jobs=n_jobs, random_state=semilla)
+    # Con nombres de columnas, igual que al predecir en ai_service.
+    modelo.fit(pd.DataFrame(X, columns=COLUMNAS_FEATURES), y)
+    # Los hilos del bosque no se usan al servir: las predicciones paralelizan por llamada.
+    modelo.n_jobs = None
+    return modelo, time.perf_counter() - inicio
+
+
+def entrenar_modelos(X, y_alerta, y_tipo, n_estimators=100, n_jobs=-1, semilla=SEMILLA):
+    """
+    Entrena el modelo de alerta y el de tipo de alerta.
+    Con más de un núcleo disponible, cada modelo se entrena en su propio proceso
+    y los núcleos se reparten entre ambos.
+    Retorna ((modelo_alerta, segundos), (modelo_tipo, segundos)).
+    """
+    nucleos = (os.cpu_count() or 1) if n_jobs == -1 else max(1, n_jobs)
+    if nucleos < 2:
+        return (
+            _entrenar_modelo(X, y_alerta, n_estimators, 1, semilla),
+            _entrenar_modelo(X, y_tipo, n_estimators, 1, semilla),
+        )
+
+    por_modelo = max(1, nucleos // 2)
+    # spawn: los procesos hijos no heredan conexiones a la base de datos ni hilos de la app.
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=2, mp_context=contexto) as pool:
+        alerta = pool.submit(_entrenar_modelo, X, y_alerta, n_estimators, por_modelo, semilla)
+        tipo = pool.submit(_entrenar_modelo, X, y_tipo, n_estimators, por_modelo, semilla)
+        return alerta.result(), tipo.result()
+
+
+def objetivos_multisalida(y_alerta, y_tipo):
+    """
+    Matriz Nx2 [alerta, tipo] de texto para un único bosque multisalida.
+    scikit-learn exige etiquetas comparables entre sí, por eso la alerta va como "0"/"1";
+    al predecir se convierte de nuevo a entero.
+    """
+    return np.column_stack((np.asarray(y_alerta).astype(int).astype(str), np.asarray(y_tipo).astype(str)))
+
+
+def entrenar_multisalida(X, y_alerta, y_tipo, n_estimators=100, n_jobs=-1, semilla=SEMILLA):
+    """
+    Entrena un solo bosque que predice alerta y tipo de alerta a la vez
+    (usa todos los núcleos pedidos). Retorna (modelo, segundos).
+    """
+    return _entrenar_modelo(X, objetivos_multisalida(y_alerta, y_tipo), n_estimators, n_jobs, semilla)
+
+
+def predecir_par(modelo_alerta, modelo_tipo, X):
+    """(alertas, tipos) de un par de modelos o de un bosque multisalida (modelo_tipo=None)."""
+    import pandas as pd
+
+    entrada = pd.DataFrame(X, columns=COLUMNAS_FEATURES)
+    if modelo_tipo is None:
+        predicciones = modelo_alerta.predict(entrada)
+        return predicciones[:, 0].astype(int), predicciones[:, 1].astype(str)
+    return modelo_alerta.predict(entrada), modelo_tipo.predict(entrada)
+
+
+def evaluar(modelo_alerta, modelo_tipo, X, y_alerta, y_tipo):
+    """Métricas sobre el conjunto de prueba (modelo_tipo=None para un bosque multisalida)."""
+    from sklearn.metrics import accuracy_score, f1_score
+
+    pred_alerta, pred_tipo = predecir_par(modelo_alerta, modelo_tipo, X)
+    y_alerta, y_tipo = np.asarray(y_alerta).astype(int), np.asarray(y_tipo).astype(str)
+    return {
+        "accuracy_alerta": round(float(accuracy_score(y_alerta, pred_alerta)), 4),
+        "f1_alerta": round(float(f1_score(y_alerta, pred_alerta, zero_division=0)), 4),
+        "accuracy_tipo": round(float(accuracy_score(y_tipo, pred_tipo)), 4),
+        "f1_macro_tipo": round(float(f1_score(y_tipo, pred_tipo, average="macro", zero_division=0)), 4),
+    }
+
+
+def guardar_en_registro(version, modelo_alerta, modelo_tipo, metricas, descripcion=None):
+    """
+    Serializa los modelos y los agrega al registro como una nueva versión.
+    Con modelo_tipo=None, modelo_alerta es un bosque multisalida.
+    """
+    import joblib
+
+    temporal = tempfile.mkdtemp(prefix="bmis_modelos_")
+    try:
+        if modelo_tipo is None:
+            archivos = (registro.ARCHIVO_MULTISALIDA,)
+            joblib.dump(modelo_alerta, os.path.join(temporal, registro.ARCHIVO_MULTISALIDA))
+        else:
+            archivos = registro.ARCHIVOS_MODELO
+            joblib.dump(modelo_alerta, os.path.join(temporal, archivos[0]))
+            joblib.dump(modelo_tipo, os.path.join(temporal, archivos[1]))
+        return registro.registrar_version(
+            version, temporal, COLUMNAS_FEATURES, metricas, descripcion, archivos_modelo=archivos
+        )
+    finally:
+        shutil.rmtree(temporal, ignore_errors=True)
+
+
+def ejecutar_pipeline(bloques, version, n_estimators=100, n_jobs=-1, proporcion_prueba=PROPORCION_PRUEBA,
+                      descripcion=None, multisalida=False, informar=print, origen_etiquetas=None):
+    """
+    Ejecuta el pipeline completo sobre un iterable de bloques (features, alerta, tipo)
+    y registra el resultado como `version`. Retorna el manifiesto de la versión.
+    Con multisalida=True entrena un único bosque para ambos objetivos.
+    `origen_etiquetas` queda en las métricas del manifiesto.
+    Lanza ValueError si no hay datos etiquetados.
+    """
+    cronometro = Cronometro(informar)
+    conjunto = ConjuntoEntrenamiento()
+
+    with cronometro.etapa("extraccion"):
+        for features, alertas, tipos in bloques:
+            conjunto.agregar(features, alertas, tipos)
+    informar(f"📊 {conjunto.filas} filas etiquetadas.")
+
+    with cronometro.etapa("consolidacion"):
+        X, y_alerta, y_tipo = conjunto.consolidar()
+        entrenamiento, prueba = dividir(len(X), proporcion_prueba)
+
+    with cronometro.etapa("entrenamiento"):
+        if multisalida:
+            modelo_alerta, t_alerta = entrenar_multisalida(
+                X[entrenamiento], y_alerta[entrenamiento], y_tipo[entrenamiento], n_estimators, n_jobs
+            )
+            modelo_tipo = None
+        else:
+            (modelo_alerta, t_alerta), (modelo_tipo, t_tipo) = entrenar_modelos(
+                X[entrenamiento], y_alerta[entrenamiento], y_tipo[entrenamiento], n_estimators, n_jobs
+            )
+    if multisalida:
+        informar(f"   modelo_multisalida: {t_alerta:.2f}s")
+    else:
+        informar(f"   modelo_alerta: {t_alerta:.2f}s | modelo_tipo_alerta: {t_tipo:.2f}s")
+
+    with cronometro.etapa("evaluacion"):
+        metricas = evaluar(modelo_alerta, modelo_tipo, X[prueba], y_alerta[prueba], y_tipo[prueba])
+    informar(f"   {metricas}")
+
+    metricas.update({
+        "filas_entrenamiento": int(len(entrenamiento)),
+        "filas_prueba": int(len(prueba)),
+        "n_estimators": n_estimators,
+        "origen_etiquetas": origen_etiquetas,
+    })
+    with cronometro.etapa("guardado"):
+        manifiesto = guardar_en_registro(version, modelo_alerta, modelo_tipo,
+                                         {**metricas, "tiempos_s": cronometro.etapas}, descripcion)
+    return manifiesto
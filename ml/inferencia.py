@@ -0,0 +1,132 @@
+"""
+Motor de inferencia compilado para los RandomForestClassifier del biodigestor.
+
+Aplana todos los árboles de un bosque en arreglos NumPy contiguos y los recorre
+de forma vectorizada (todos los árboles y filas a la vez), sin la construcción de
+DataFrames ni la validación por llamada de scikit-learn.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Filas evaluadas a la vez: acota la memoria temporal (árboles x filas x clases).
+TAMANO_BLOQUE_INFERENCIA = 2048
+
+
+class BosqueCompilado:
+    """
+    Representación plana de un RandomForestClassifier ya entrenado.
+    - feature/umbral/izquierdo/derecho: un elemento por nodo de todos los árboles.
+    - Las hojas apuntan a sí mismas, así el recorrido puede hacer siempre
+      max_depth pasos sin comprobar si cada árbol ya terminó.
+    - valores: probabilidades de clase por nodo (n_nodos, n_salidas, max_clases).
+    Soporta modelos de una o varias salidas.
+    """
+
+    def __init__(self, modelo):
+        arboles = [estimador.tree_ for estimador in modelo.estimators_]
+        self.n_features = modelo.n_features_in_
+        self.n_salidas = modelo.n_outputs_
+        self.clases = list(modelo.classes_) if self.n_salidas > 1 else [modelo.classes_]
+        max_clases = max(len(c) for c in self.clases)
+
+        desplazamientos = np.cumsum([0] + [a.node_count for a in arboles])
+        self.raices = desplazamientos[:-1].astype(np.intp)
+        self.profundidad = max(a.max_depth for a in arboles)
+
+        features, umbrales, izquierdos, derechos, valores = [], [], [], [], []
+        for inicio, arbol in zip(self.raices, arboles):
+            es_hoja = arbol.children_left == -1
+            propios = np.arange(arbol.node_count) + inicio
+            features.append(np.where(es_hoja, 0, arbol.feature))
+            umbrales.append(arbol.threshold)
+            izquierdos.append(np.where(es_hoja, propios, arbol.children_left + inicio))
+            derechos.append(np.where(es_hoja, propios, arbol.children_right + inicio))
+
+            valor = np.zeros((arbol.node_count, self.n_salidas, max_clases))
+            valor[:, :, :arbol.value.shape[2]] = arbol.value
+            # Igual que DecisionTreeClassifier.predict_proba: normaliza por nodo.
+            normalizador = valor.sum(axis=2, keepdims=True)
+            normalizador[normalizador == 0.0] = 1.0
+            valores.append(valor / normalizador)
+
+        self.feature = np.ascontiguousarray(np.concatenate(features), dtype=np.intp)
+        self.umbral = np.ascontiguousarray(np.concatenate(umbrales), dtype=np.float64)
+        self.izquierdo = np.ascontiguousarray(np.concatenate(izquierdos), dtype=np.intp)
+        self.derecho = np.ascontiguousarray(np.concatenate(derechos), dtype=np.intp)
+        self.valores = np.ascontiguousarray(np.concatenate(valores))
+        self.n_arboles = len(arboles)
+
+    def _preparar(self, X):
+        # scikit-learn compara en float32 contra umbrales float64; se replica exactamente.
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Se esperaban {self.n_features} columnas, se recibieron {X.shape[1]}.")
+        return X
+
+    def _probabilidades_bloque(self, X):
+        # Índices planos (árbol, fila) -> take() evita el costo del indexado avanzado 2D.
+        n_filas = X.shape[0]
+        X_plano = X.ravel()
+        base_filas = np.tile(np.arange(n_filas) * X.shape[1], self.n_arboles)
+        nodos = np.repeat(self.raices, n_filas)
+        for _ in range(self.profundidad):
+            a_izquierda = X_plano.take(base_filas + self.feature.take(nodos)) <= self.umbral.take(nodos)
+            nodos = np.where(a_izquierda, self.izquierdo.take(nodos), self.derecho.take(nodos))
+        valores = self.valores.take(nodos, axis=0)
+        return valores.reshape(self.n_arboles, n_filas, *self.valores.shape[1:]).sum(axis=0) / self.n_arboles
+
+    def predecir_proba(self, X, n_jobs=1):
+        """
+        Probabilidades promedio del bosque: arreglo (n_filas, n_salidas, max_clases).
+        Con n_jobs > 1 los bloques de filas se reparten entre hilos (NumPy libera el GIL).
+        """
+        X = self._preparar(X)
+        if X.shape[0] <= TAMANO_BLOQUE_INFERENCIA:
+            return self._probabilidades_bloque(X)
+        bloques = [
+            X[i:i + TAMANO_BLOQUE_INFERENCIA]
+            for i in range(0, X.shape[0], TAMANO_BLOQUE_INFERENCIA)
+        ]
+        if n_jobs and n_jobs != 1:
+            with ThreadPoolExecutor(max_workers=None if n_jobs < 0 else n_jobs) as ejecutor:
+                return np.concatenate(list(ejecutor.map(self._probabilidades_bloque, bloques)))
+        return np.concatenate([self._probabilidades_bloque(b) for b in bloques])
+
+    def predecir_salidas(self, X, n_jobs=1):
+        """Lista con las clases predichas de cada salida, en un único recorrido del bosque."""
+        proba = self.predecir_proba(X, n_jobs)
+        return [
+            clases.take(np.argmax(proba[:, k, :len(clases)], axis=1))
+            for k, clases in enumerate(self.clases)
+        ]
+
+    def predecir(self, X, n_jobs=1):
+        """
+        Clases predichas, como RandomForestClassifier.predict:
+        (n_filas,) para una salida o (n_filas, n_salidas) para varias.
+        """
+        salidas = self.predecir_salidas(X, n_jobs)
+        if self.n_salidas == 1:
+            return salidas[0]
+        return np.column_stack(salidas)
+
+
+def validar_contra_sklearn(modelo, motor, X):
+    """
+    Compara las predicciones del motor compilado con las de scikit-learn.
+    Retorna la cantidad de filas en las que difieren (0 = salidas idénticas).
+    """
+    import pandas as pd
+
+    entrada = X
+    nombres = getattr(modelo, "feature_names_in_", None)
+    if nombres is not None:
+        entrada = pd.DataFrame(np.asarray(X), columns=nombres)
+    esperado = np.asarray(modelo.predict(entrada))
+    obtenido = motor.predecir(X)
+    diferentes = esperado != obtenido
+    if diferentes.ndim > 1:
+        diferentes = diferentes.any(axis=1)
+    return int(diferentes.sum())
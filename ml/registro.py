@@ -0,0 +1,198 @@
+"""
+Registro de versiones de los modelos de IA.
+
+Estructura del directorio del registro:
+    <registro>/<version>/modelo_alerta.pkl
+    <registro>/<version>/modelo_tipo_alerta.pkl
+        o bien <registro>/<version>/modelo_multisalida.pkl (un solo bosque para ambos objetivos)
+    <registro>/<version>/manifest.json    (tipo de modelo, features, métricas, sha256 de cada archivo)
+    <registro>/activa.version             (versión activa, compartida por todos los workers)
+    <registro>/activaciones.json          (historial de activaciones, para el rollback)
+
+La versión "base" son los .pkl sueltos de ml/ generados por train_model.py;
+es la que se usa mientras no se haya activado ninguna versión del registro.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from datetime import datetime
+
+from database.version_compartida import VersionCompartida
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+DIRECTORIO_REGISTRO = os.environ.get("MODELOS_REGISTRO_DIR", os.path.join(ML_DIR, "registro"))
+
+VERSION_BASE = "base"
+ARCHIVOS_MODELO = ("modelo_alerta.pkl", "modelo_tipo_alerta.pkl")
+ARCHIVO_MULTISALIDA = "modelo_multisalida.pkl"
+TIPO_PAR = "par"
+TIPO_MULTISALIDA = "multisalida"
+ARCHIVO_MANIFIESTO = "manifest.json"
+ARCHIVO_ACTIVACIONES = "activaciones.json"
+MAX_HISTORIAL_ACTIVACIONES = 50
+
+_PATRON_VERSION = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$")
+_lock_historial = threading.Lock()
+
+# Versión activa: cada worker la relee como máximo una vez por intervalo.
+puntero_activo = VersionCompartida("activa", directorio=DIRECTORIO_REGISTRO)
+
+
+def sha256_archivo(ruta):
+    digest = hashlib.sha256()
+    with open(ruta, "rb") as archivo:
+        for bloque in iter(lambda: archivo.read(1024 * 1024), b""):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+def ruta_version(version):
+    """Directorio con los archivos de una versión."""
+    if version == VERSION_BASE:
+        return ML_DIR
+    if not _PATRON_VERSION.match(version or ""):
+        raise ValueError("Nombre de versión inválido.")
+    return os.path.join(DIRECTORIO_REGISTRO, version)
+
+
+def existe_version(version):
+    try:
+        ruta = ruta_version(version)
+    except ValueError:
+        return False
+    if version == VERSION_BASE:
+        return all(os.path.exists(os.path.join(ruta, nombre)) for nombre in ARCHIVOS_MODELO)
+    return os.path.isfile(os.path.join(ruta, ARCHIVO_MANIFIESTO))
+
+
+def leer_manifiesto(version):
+    """
+    Retorna el manifiesto de una versión.
+    La versión base no tiene manifiesto: se genera uno mínimo con las sumas actuales.
+    Lanza LookupError si la versión no existe.
+    """
+    if not existe_version(version):
+        raise LookupError(f"No existe la versión de modelos '{version}'.")
+    ruta = ruta_version(version)
+    if version == VERSION_BASE:
+        return {
+            "version": VERSION_BASE,
+            "tipo_modelo": TIPO_PAR,
+            "creado_en": None,
+            "features": None,
+            "metricas": {},
+            "archivos": {n: sha256_archivo(os.path.join(ruta, n)) for n in ARCHIVOS_MODELO},
+        }
+    with open(os.path.join(ruta, ARCHIVO_MANIFIESTO), encoding="utf-8") as archivo:
+        return json.load(archivo)
+
+
+def listar_versiones():
+    """Manifiestos de todas las versiones registradas (más la base si existe), por fecha."""
+    versiones = []
+    if existe_version(VERSION_BASE):
+        versiones.append(leer_manifiesto(VERSION_BASE))
+    if os.path.isdir(DIRECTORIO_REGISTRO):
+        for nombre in sorted(os.listdir(DIRECTORIO_REGISTRO)):
+            if os.path.isfile(os.path.join(DIRECTORIO_REGISTRO, nombre, ARCHIVO_MANIFIESTO)):
+                versiones.append(leer_manifiesto(nombre))
+    return sorted(versiones, key=lambda m: m.get("creado_en") or "")
+
+
+def registrar_version(version, directorio_origen, features, metricas=None, descripcion=None,
+                      archivos_modelo=ARCHIVOS_MODELO):
+    """
+    Copia los archivos de modelo de directorio_origen a una nueva versión del registro,
+    junto con su manifiesto. La versión aparece completa o no aparece (rename atómico).
+    archivos_modelo: el par (alerta, tipo) o (ARCHIVO_MULTISALIDA,).
+    Lanza ValueError si el nombre es inválido o la versión ya existe.
+    """
+    if version == VERSION_BASE:
+        raise ValueError(f"'{VERSION_BASE}' es un nombre reservado.")
+    destino = ruta_version(version)
+    if os.path.exists(destino):
+        raise ValueError(f"La versión '{version}' ya existe.")
+
+    temporal = os.path.join(DIRECTORIO_REGISTRO, f".{version}.{os.getpid()}.tmp")
+    os.makedirs(temporal)
+    try:
+        archivos = {}
+        for nombre in archivos_modelo:
+            shutil.copyfile(os.path.join(directorio_origen, nombre), os.path.join(temporal, nombre))
+            archivos[nombre] = sha256_archivo(os.path.join(temporal, nombre))
+        manifiesto = {
+            "version": version,
+            "tipo_modelo": TIPO_MULTISALIDA if ARCHIVO_MULTISALIDA in archivos_modelo else TIPO_PAR,
+            "creado_en": datetime.utcnow().isoformat(timespec="seconds"),
+            "descripcion": descripcion,
+            "features": list(features),
+            "metricas": metricas or {},
+            "archivos": archivos,
+        }
+        with open(os.path.join(temporal, ARCHIVO_MANIFIESTO), "w", encoding="utf-8") as archivo:
+            json.dump(manifiesto, archivo, indent=2, ensure_ascii=False)
+        os.rename(temporal, destino)
+        return manifiesto
+    except Exception:
+        shutil.rmtree(temporal, ignore_errors=True)
+        raise
+
+
+def cargar_version(version):
+    """
+    Verifica las sumas sha256 contra el manifiesto y deserializa los modelos.
+    Retorna (modelos, manifiesto), con modelos: nombre de archivo -> estimador.
+    Lanza LookupError si la versión no existe y ValueError si un archivo no coincide.
+    """
+    import joblib
+
+    manifiesto = leer_manifiesto(version)
+    ruta = ruta_version(version)
+    modelos = {}
+    for nombre, suma in manifiesto["archivos"].items():
+        ruta_archivo = os.path.join(ruta, nombre)
+        if version != VERSION_BASE and sha256_archivo(ruta_archivo) != suma:
+            raise ValueError(f"La suma sha256 de {nombre} no coincide con el manifiesto de '{version}'.")
+        modelos[nombre] = joblib.load(ruta_archivo)
+    return modelos, manifiesto
+
+
+def version_activa(forzar=False):
+    """Versión activa publicada en el registro (la base si nunca se activó ninguna)."""
+    valor = puntero_activo.leer(forzar)
+    return VERSION_BASE if valor == "0" else valor
+
+
+def _leer_activaciones():
+    try:
+        with open(os.path.join(DIRECTORIO_REGISTRO, ARCHIVO_ACTIVACIONES), encoding="utf-8") as archivo:
+            return json.load(archivo)
+    except (FileNotFoundError, ValueError):
+        return []
+
+
+def publicar_activacion(version):
+    """Publica la versión activa para todos los workers y la agrega al historial."""
+    with _lock_historial:
+        historial = _leer_activaciones()
+        historial.append({"version": version, "fecha": datetime.utcnow().isoformat(timespec="seconds")})
+        historial = historial[-MAX_HISTORIAL_ACTIVACIONES:]
+        os.makedirs(DIRECTORIO_REGISTRO, exist_ok=True)
+        ruta = os.path.join(DIRECTORIO_REGISTRO, ARCHIVO_ACTIVACIONES)
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump(historial, archivo, indent=2)
+        os.replace(temporal, ruta)
+    puntero_activo.publicar(version)
+
+
+def version_anterior():
+    """Versión activa antes de la actual según el historial, o None si no hay."""
+    actual = version_activa(forzar=True)
+    for entrada in reversed(_leer_activaciones()):
+        if entrada["version"] != actual:
+            return entrada["version"]
+    return VERSION_BASE if actual != VERSION_BASE and existe_version(VERSION_BASE) else None
@@ -2,6 +2,13 @@
 Funciones para interpretar las predicciones del biodigestor.
 """
 
+# Rangos típicos de biodigestores usados para refinar las alertas
+# (también los aplica el detector en línea de ml/deteccion.py).
+TEMPERATURA_MIN = 25
+TEMPERATURA_MAX = 40
+PRESION_MIN = 90
+GAS_MAX = 700
+
 def obtener_recomendacion(estado, temperatura, presion, gas):
     """
     Retorna una recomendación según el estado binario (0 = normal, 1 = alerta).
@@ -30,21 +37,21 @@ def obtener_recomendacion(estado, temperatura, presion, gas):
         # 💡 Lógica basada en rangos típicos de biodigestores para refinar la recomendación
         
         # Temperatura: El rango mesofílico va de 20-45°C. Usamos 25-40 para alertas preventivas.
-        if temperatura < 25:
+        if temperatura < TEMPERATURA_MIN:
             tipo = "Temperatura baja"
             recomendacion = "Aumenta la temperatura del biodigestor o mejora el aislamiento térmico."
-        elif temperatura > 40:
+        elif temperatura > TEMPERATURA_MAX:
             tipo = "Temperatura alta"
             recomendacion = "Evita exposición directa al sol o usa una cubierta parcial."
         
         # Presión: Valores de biogás saludables pueden variar, pero una caída es crítica.
-        elif presion < 90:
+        elif presion < PRESION_MIN:
             tipo = "Presión baja"
             recomendacion = "Verifica fugas o bloqueos en las tuberías. Puede indicar baja actividad."
         
         # Gas (MQ-4, metano): Los valores altos de metano son buenos, pero un sensor MQ-4 con lectura muy alta 
         # sin liberar puede indicar riesgo o un problema de ventilación.
-        elif gas > 700:
+        elif gas > GAS_MAX:
             tipo = "Nivel alto de gas"
             recomendacion = "Libera gas gradualmente o verifica el sistema de ventilación/almacenamiento."
             
@@ -1,10 +1,15 @@
 from flask import Blueprint, jsonify
-from services.ai_service import predecir_alerta
-from database.db_service import obtener_ultima_lectura_combinada, hay_proceso_activo, LecturaException
+from services.ai_service import predecir_ultimas_lecturas, cargador_modelos
+from database.db_service import obtener_ultimas_lecturas, hay_proceso_activo, LecturaException
+from services.presupuesto_consultas import presupuesto_consultas
 
 ai_bp = Blueprint("ai_bp", __name__)
 
+# Segundos sugeridos al cliente para reintentar mientras los modelos se cargan.
+REINTENTO_CARGA_MODELOS = 5
+
 @ai_bp.get("/analizar")
+@presupuesto_consultas(2)
 def analizar_biodigestor():
     """
     Endpoint de análisis de biodigestor que unifica la respuesta de error de 'no datos' y 'no proceso'.
@@ -26,7 +31,7 @@ def analizar_biodigestor():
 
         # Intentamos obtener la última lectura combinada del proceso activo
         try:
-            lectura = obtener_ultima_lectura_combinada()
+            proceso_id, ultima_temp, ultima_pres, ultima_gas = obtener_ultimas_lecturas()
         except LecturaException as le:
             # Caso 2: Proceso activo pero aún no hay lecturas completas
             return jsonify({
@@ -38,11 +43,26 @@ def analizar_biodigestor():
                 "detalle": str(le)
             }), 200
 
-        # Caso 3: Lecturas completas → hacer predicción
-        temperatura, presion, gas, timestamp = lectura
-        resultado = predecir_alerta(temperatura, presion, gas, timestamp)
+        # Caso 3: Modelos aún cargándose → respuesta inmediata, sin bloquear al worker
+        if not cargador_modelos.listos() and cargador_modelos.estado()["estado"] != "error":
+            cargador_modelos.iniciar()
+            respuesta = jsonify({
+                "alerta_ia": 0,
+                "dia_proceso": 0,
+                "mensaje_lectura": "Los modelos de IA se están cargando.",
+                "recomendacion": "Reintente en unos segundos.",
+                "tipo_estado": "Iniciando"
+            })
+            respuesta.headers["Retry-After"] = str(REINTENTO_CARGA_MODELOS)
+            return respuesta, 503
 
-        return jsonify(resultado), 200
+        # Caso 4: Lecturas completas → hacer predicción (o reutilizarla si las lecturas no cambiaron)
+        resultado, desde_cache, edad = predecir_ultimas_lecturas(proceso_id, ultima_temp, ultima_pres, ultima_gas)
+
+        return jsonify({
+            **resultado,
+            "cache": {"hit": desde_cache, "edad_segundos": round(edad, 3)}
+        }), 200
 
     except Exception as e:
         # Cualquier otro error inesperado
@@ -1,24 +1,85 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, g, request, jsonify
 from services.user_service import (
     crear_usuario, 
     login_usuario, 
     verificar_existencia_telefono, 
-    restablecer_contrasena
+    restablecer_contrasena,
+    renovar_acceso
 )
+from services.token_service import emitir_tokens, firmador, TokenInvalido
+from services.limitador_service import verificar_intentos, LimiteExcedido
+from services.presupuesto_consultas import presupuesto_consultas
 
 # Importaciones de la base de datos y modelos (asumiendo que están disponibles)
 from database.models.user import User 
 from database.connection import db 
 from datetime import datetime 
+from functools import wraps
+import os
 
 auth_bp = Blueprint("auth", __name__)
 
+# Con AUTH_REQUERIDA=1 las rutas no públicas exigen un token de acceso válido.
+AUTH_REQUERIDA = os.environ.get("AUTH_REQUERIDA", "0") == "1"
+if AUTH_REQUERIDA and not os.environ.get("AUTH_SECRETO"):
+    # La clave generada en el directorio de estado es solo para desarrollo.
+    raise RuntimeError("AUTH_REQUERIDA=1 requiere AUTH_SECRETO (la misma clave en todas las máquinas).")
+RUTAS_PUBLICAS = (
+    "/auth/login", "/auth/register", "/auth/refresh", "/auth/password", "/api/health",
+) + tuple(r for r in os.environ.get("AUTH_RUTAS_PUBLICAS", "").split(",") if r)
+
+# -----------------------------------------------------------------
+# Verificación del token de acceso en cada solicitud de la aplicación.
+# Solo comprueba firma, vencimiento y revocación: no consulta la tabla usuarios.
+# Deja los datos del token en g.usuario ({"id", "rol"}) o None.
+# -----------------------------------------------------------------
+@auth_bp.before_app_request
+def verificar_token():
+    g.usuario = None
+    encabezado = request.headers.get("Authorization", "")
+    if encabezado[:7].lower() == "bearer ":
+        try:
+            claims = firmador.verificar(encabezado[7:].strip())
+            g.usuario = {"id": claims["sub"], "rol": claims["rol"]}
+            return None
+        except TokenInvalido as e:
+            error = str(e)
+    else:
+        error = "Falta el token de acceso."
+
+    # Sin AUTH_REQUERIDA solo se identifica al usuario (los clientes actuales no envían token).
+    if not AUTH_REQUERIDA or request.method == "OPTIONS" or request.path.startswith(RUTAS_PUBLICAS):
+        return None
+    return jsonify({"error": error}), 401, {"WWW-Authenticate": "Bearer"}
+
+# -----------------------------------------------------------------
+# Restringe una vista a un rol. Se exige siempre, con o sin AUTH_REQUERIDA:
+# sin un token de acceso válido responde 401 y con otro rol 403.
+# -----------------------------------------------------------------
+def requiere_rol(rol):
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            usuario = g.get("usuario")
+            if usuario is None:
+                return jsonify({"error": "Se requiere un token de acceso válido."}), 401, {"WWW-Authenticate": "Bearer"}
+            if usuario["rol"] != rol:
+                return jsonify({"error": f"Se requiere el rol '{rol}'."}), 403
+            return vista(*args, **kwargs)
+        return envoltura
+    return decorador
+
+def _respuesta_limite(error):
+    """429 inmediato con el tiempo sugerido de reintento."""
+    return jsonify({"error": str(error)}), 429, {"Retry-After": str(error.reintentar_en)}
+
 # -----------------------------------------------------------------
 # 1. Registro de Usuario (RESTful: Creación de recurso Usuario)
 # Ruta: /register
 # Método: POST
 # -----------------------------------------------------------------
 @auth_bp.route("/register", methods=["POST"])
+@presupuesto_consultas(4)
 def register():
     data = request.json
 
@@ -49,6 +110,8 @@ def register():
             "rol": user.rol,
             "estado": user.estado
         }), 201
+    except LimiteExcedido as e:
+        return _respuesta_limite(e)
     except Exception as e:
         # Error interno del servidor
         return jsonify({"error": "Error interno al crear usuario"}), 500
@@ -59,14 +122,19 @@ def register():
 # Método: POST
 # -----------------------------------------------------------------
 @auth_bp.route("/login", methods=["POST"])
+@presupuesto_consultas(4)
 def login():
     data = request.json
 
     if not data or "telefono" not in data or "password" not in data:
         return jsonify({"error": "Debe ingresar teléfono y contraseña"}), 400
 
-    # 🔍 Llamada al servicio para verificar credenciales
-    user = login_usuario(data["telefono"], data["password"])
+    # 🔍 Llamada al servicio para verificar credenciales (limitada por teléfono e IP)
+    try:
+        verificar_intentos(data["telefono"], request.remote_addr)
+        user = login_usuario(data["telefono"], data["password"])
+    except LimiteExcedido as e:
+        return _respuesta_limite(e)
 
     if not user:
         return jsonify({"error": "Teléfono o contraseña incorrecta"}), 401
@@ -86,9 +154,28 @@ def login():
         "ultima_conexion": (
             user.ultima_conexion.strftime("%Y-%m-%d %H:%M:%S")
             if user.ultima_conexion else None
-        )
+        ),
+        **emitir_tokens(user)
     }), 200
 
+# -----------------------------------------------------------------
+# 2.1 Renovación del Token de Acceso
+# Ruta: /refresh
+# Método: POST
+# Body JSON esperado: {"refresh_token": str}
+# -----------------------------------------------------------------
+@auth_bp.route("/refresh", methods=["POST"])
+def refresh():
+    data = request.get_json(silent=True) or {}
+    token = data.get("refresh_token")
+    if not token:
+        return jsonify({"error": "Debe enviar el refresh_token"}), 400
+
+    tokens, error = renovar_acceso(token)
+    if error:
+        return jsonify({"error": error}), 401
+    return jsonify(tokens), 200
+
 
 # -----------------------------------------------------------------
 # 3. Paso 1: Solicitud de Restablecimiento (Verificación)
@@ -133,8 +220,9 @@ def cambiar_contrasena_ruta():
     if nueva_contrasena != confirmar_contrasena:
         return jsonify({"error": "Las contraseñas no coinciden"}), 400
 
-    # Llamada al servicio
+    # Llamada al servicio (limitada por teléfono e IP)
     try:
+        verificar_intentos(telefono, request.remote_addr)
         exito, error = restablecer_contrasena(telefono, nueva_contrasena)
         
         if error:
@@ -143,5 +231,7 @@ def cambiar_contrasena_ruta():
 
         # 200 OK para una actualización exitosa con PATCH
         return jsonify({"mensaje": "Contraseña actualizada correctamente"}), 200
+    except LimiteExcedido as e:
+        return _respuesta_limite(e)
     except Exception as e:
         return jsonify({"error": "Error interno al actualizar la contraseña"}), 500
\ No newline at end of file
@@ -0,0 +1,47 @@
+from flask import Blueprint, current_app, jsonify, request
+from services.dashboard_service import (
+    construir_dashboard, version_dashboard, SECCIONES, LECTURAS_POR_SENSOR
+)
+from services.presupuesto_consultas import presupuesto_consultas
+
+dashboard_bp = Blueprint("dashboard", __name__)
+
+# Todo lo que la app necesita al abrir el dashboard en una sola solicitud: catálogo de
+# sensores, configuración de gráficas y de voz, proceso activo con su día, últimas
+# lecturas por sensor y la última predicción.
+# Query params opcionales:
+#   secciones=sensores,graficas,...  (por defecto todas)
+#   lecturas=20                       (lecturas por sensor)
+#   conocidas=sensores:<versión>,...  (secciones que el cliente ya tiene: se omiten si no cambiaron)
+# La respuesta incluye "versiones" (versión de cada sección) y un ETag del conjunto:
+# con If-None-Match vigente responde 304.
+@dashboard_bp.get("/dashboard")
+@presupuesto_consultas(5)
+def get_dashboard():
+    secciones = tuple(
+        s for s in request.args.get("secciones", ",".join(SECCIONES)).split(",") if s
+    )
+    lecturas = request.args.get("lecturas", LECTURAS_POR_SENSOR, type=int)
+    conocidas = dict(
+        c.split(":", 1) for c in request.args.get("conocidas", "").split(",") if ":" in c
+    )
+
+    try:
+        versiones, etag = version_dashboard(secciones, lecturas)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if request.if_none_match.contains_weak(etag):
+        respuesta = current_app.response_class(status=304)
+    else:
+        sin_cambios = [s for s in secciones if conocidas.get(s) == versiones[s]]
+        try:
+            datos = construir_dashboard(
+                tuple(s for s in secciones if s not in sin_cambios), lecturas
+            )
+        except Exception as e:
+            return jsonify({"error": "Error al armar el dashboard", "detalle": str(e)}), 500
+        respuesta = jsonify({**datos, "versiones": versiones, "sin_cambios": sin_cambios})
+    respuesta.set_etag(etag)
+    respuesta.headers["Cache-Control"] = "no-cache"
+    return respuesta
@@ -2,8 +2,12 @@ from flask import Blueprint, request, jsonify
 from services.graph_service import (
     guardar_o_actualizar_config,
     obtener_todas_configs,
-    obtener_config_por_sensor
+    obtener_config_por_sensor,
+    config_to_dict
 )
+from database.recursos_versionados import obtener_recurso, GRAFICAS
+from routes.respuesta_condicional import respuesta_versionada
+from services.presupuesto_consultas import presupuesto_consultas
 
 graph_bp = Blueprint("graph", __name__)
 
@@ -25,29 +29,23 @@ def update_graph():
         "tipo_grafica": config.tipo_grafica
     }), 200
 
-# Obtiene todas las configuraciones de gráficas.
+# Obtiene todas las configuraciones de gráficas (con ETag: 304 si no cambiaron).
 @graph_bp.get("/graficas")
+@presupuesto_consultas(1)
 def get_graphs():
-    configs = obtener_todas_configs()
-    result = [
-        {
-            "sensor_id": c.sensor_id,
-            "tipo_grafica": c.tipo_grafica,
-            "fecha_modificacion": c.fecha_modificacion
-        }
-        for c in configs
-    ]
-    return jsonify(result), 200
+    def construir():
+        configs = obtener_todas_configs()
+        return [config_to_dict(c) for c in configs], 200
+    return respuesta_versionada(obtener_recurso(GRAFICAS), "todas", construir)
 
 # Obtiene la configuración de gráfica para un sensor específico.
 @graph_bp.get("/graficas/<int:sensor_id>")
+@presupuesto_consultas(1)
 def get_graph(sensor_id):
-    config = obtener_config_por_sensor(sensor_id)
-    if not config:
-        return jsonify({"error": "No hay configuración para este sensor"}), 404
+    def construir():
+        config = obtener_config_por_sensor(sensor_id)
+        if not config:
+            return {"error": "No hay configuración para este sensor"}, 404
 
-    return jsonify({
-        "sensor_id": config.sensor_id,
-        "tipo_grafica": config.tipo_grafica,
-        "fecha_modificacion": config.fecha_modificacion
-    }), 200
+        return config_to_dict(config), 200
+    return respuesta_versionada(obtener_recurso(GRAFICAS), sensor_id, construir)
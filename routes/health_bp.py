@@ -0,0 +1,30 @@
+from flask import Blueprint, jsonify
+from services.ai_service import estado_modelos
+from database.db_service import verificar_conexion
+from services.ingesta_service import cola_ingesta
+
+health_bp = Blueprint("health", __name__)
+
+@health_bp.get("/health/ready")
+def readiness():
+    """
+    Indica si la instancia está lista para atender tráfico:
+    base de datos accesible y modelos de IA cargados.
+    Retorna 200 si ambos están listos y 503 en caso contrario.
+    """
+    db_ok, db_error = verificar_conexion()
+    modelos = estado_modelos()
+    listo = db_ok and modelos["estado"] == "listo"
+    return jsonify({
+        "listo": listo,
+        "base_datos": {"ok": db_ok, "error": db_error},
+        "modelos": modelos
+    }), 200 if listo else 503
+
+@health_bp.get("/health/ingesta")
+def ingesta():
+    """
+    Estado de la cola de ingesta asíncrona de este worker: profundidad, contadores
+    y latencias de volcado de los últimos lotes.
+    """
+    return jsonify(cola_ingesta.estado()), 200
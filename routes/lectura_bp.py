@@ -1,15 +1,32 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from services.lectura_service import (
-    registrar_lectura, obtener_lecturas,
-    obtener_lecturas_por_sensor, eliminar_lecturas_sensor
+    registrar_lectura, registrar_lecturas_lote, obtener_lecturas, iterar_lecturas,
+    obtener_lecturas_por_sensor, obtener_lecturas_reducidas, eliminar_lecturas_sensor,
+    parsear_fecha_hora, MAX_LECTURAS_LOTE, LIMITE_PAGINA_DEFECTO, LIMITE_PAGINA_MAX, MAX_PUNTOS_LTTB
 )
+from services.agregados_service import obtener_serie
+from services.ingesta_service import cola_ingesta, ingesta_asincrona_activa, ColaLlena, REINTENTO_COLA_LLENA
+from database.proceso_estado import obtener_proceso_activo
+from datetime import datetime, timedelta
+import json
+from services.presupuesto_consultas import presupuesto_consultas
 
 lectura_bp = Blueprint("lectura", __name__)
 
+def serializar_lectura(l):
+    return {
+        "id": l.id,
+        "sensor_id": l.sensor_id,
+        "valor": l.valor,
+        "fecha_hora": l.fecha_hora.isoformat(),
+        "observaciones": l.observaciones
+    }
+
 """
 Registra una nueva lectura para un sensor.
 """
 @lectura_bp.post("/lecturas")
+@presupuesto_consultas(8)
 def create_lectura():
     data = request.json
     sensor_id = data.get("sensor_id")
@@ -19,8 +36,13 @@ def create_lectura():
     if not sensor_id or valor is None:
         return jsonify({"error": "Faltan datos obligatorios"}), 400
 
+    if ingesta_asincrona_activa():
+        return _encolar_lectura(sensor_id, valor, observaciones)
+
     try:
         lectura = registrar_lectura(sensor_id, valor, observaciones)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except RuntimeError as e:
         # Captura el error si no hay proceso activo
         return jsonify({"error": str(e)}), 409 
@@ -34,22 +56,119 @@ def create_lectura():
         "observaciones": lectura.observaciones
     }), 201
 
-# Obtiene todas las lecturas registradas.
+def _encolar_lectura(sensor_id, valor, observaciones):
+    """
+    Ingesta asíncrona (INGESTA_ASINCRONA=1): la lectura queda en la cola del worker
+    y se escribe en el próximo lote. Responde 202 sin id, o 429 si la cola está llena.
+    """
+    try:
+        fila = cola_ingesta.encolar({"sensor_id": sensor_id, "valor": valor, "observaciones": observaciones})
+    except ColaLlena as e:
+        return jsonify({"error": str(e)}), 429, {"Retry-After": str(REINTENTO_COLA_LLENA)}
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+
+    return jsonify({
+        "message": "Lectura aceptada, pendiente de escritura",
+        "sensor_id": fila["sensor_id"],
+        "valor": fila["valor"],
+        "fecha_hora": fila["fecha_hora"].isoformat(),
+        "observaciones": fila["observaciones"]
+    }), 202
+
+# Registra un lote de lecturas en una sola transacción.
+# Body JSON esperado: {"lecturas": [{"sensor_id": int, "valor": float,
+#                      "fecha_hora": str ISO 8601 (opcional), "observaciones": str (opcional)}]}
+@lectura_bp.post("/lecturas/batch")
+@presupuesto_consultas(6)
+def create_lecturas_batch():
+    data = request.get_json(silent=True) or {}
+    items = data.get("lecturas")
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Debe enviar una lista 'lecturas' no vacía"}), 400
+    if len(items) > MAX_LECTURAS_LOTE:
+        return jsonify({"error": f"El lote excede el máximo de {MAX_LECTURAS_LOTE} lecturas"}), 413
+
+    try:
+        resultados, filas = registrar_lecturas_lote(items)
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+
+    aceptadas = len(filas)
+    return jsonify({
+        "message": "Lote procesado",
+        "aceptadas": aceptadas,
+        "rechazadas": len(resultados) - aceptadas,
+        "resultados": resultados
+    }), 201 if aceptadas else 400
+
+def _filtros_lecturas(args):
+    """Lee los filtros opcionales de lecturas. Lanza ValueError si alguno es inválido."""
+    return {
+        "sensor_id": args.get("sensor_id", type=int),
+        "proceso_id": args.get("proceso_id", type=int),
+        "desde": parsear_fecha_hora(args["desde"]) if "desde" in args else None,
+        "hasta": parsear_fecha_hora(args["hasta"]) if "hasta" in args else None,
+    }
+
+def _generar_json_lecturas(filtros):
+    """Genera un arreglo JSON por fragmentos, un lote del cursor a la vez."""
+    yield "["
+    primero = True
+    for lote in iterar_lecturas(**filtros):
+        fragmento = ",".join(json.dumps(serializar_lectura(l)) for l in lote)
+        yield fragmento if primero else "," + fragmento
+        primero = False
+    yield "]"
+
+# Obtiene las lecturas registradas, paginadas de la más reciente a la más antigua.
+# Query params: limit, cursor, sensor_id, proceso_id, desde, hasta (ISO 8601)
+# y stream=1 para recibir todo el resultado en streaming sin paginar.
+# El cursor de la página siguiente se devuelve en el header X-Siguiente-Cursor.
+# Con sensor_id, max_puntos reduce todo el rango con LTTB (igual que /lecturas/<sensor_id>).
 @lectura_bp.get("/lecturas")
 def get_lecturas():
-    lecturas = obtener_lecturas()
-    result = [{
-        "id": l.id,
-        "sensor_id": l.sensor_id,
-        "valor": l.valor,
-        "fecha_hora": l.fecha_hora.isoformat(),
-        "observaciones": l.observaciones
-    } for l in lecturas]
-    return jsonify(result), 200
+    try:
+        filtros = _filtros_lecturas(request.args)
+    except ValueError:
+        return jsonify({"error": "desde/hasta inválidos, use formato ISO 8601"}), 400
+
+    if "max_puntos" in request.args:
+        if filtros["sensor_id"] is None:
+            return jsonify({"error": "max_puntos requiere sensor_id"}), 400
+        return _get_lecturas_reducidas(filtros["sensor_id"])
+
+    if request.args.get("stream") in ("1", "true"):
+        return Response(
+            stream_with_context(_generar_json_lecturas(filtros)),
+            mimetype="application/json"
+        )
+
+    limite = request.args.get("limit", LIMITE_PAGINA_DEFECTO, type=int)
+    if not 1 <= limite <= LIMITE_PAGINA_MAX:
+        return jsonify({"error": f"limit debe estar entre 1 y {LIMITE_PAGINA_MAX}"}), 400
+
+    try:
+        lecturas, siguiente = obtener_lecturas(limite, request.args.get("cursor"), **filtros)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    response = jsonify([serializar_lectura(l) for l in lecturas])
+    if siguiente:
+        response.headers["X-Siguiente-Cursor"] = siguiente
+    return response, 200
 
 # Obtiene las últimas lecturas de un sensor específico (máx 20) del PROCESO ACTIVO.
+# Query params opcionales: max_puntos (reducción LTTB sobre todo el rango),
+# desde, hasta (ISO 8601) y proceso_id (por defecto, el proceso activo).
 @lectura_bp.get("/lecturas/<int:sensor_id>")
+@presupuesto_consultas(2)
 def get_lecturas_por_sensor_endpoint(sensor_id):
+    if "max_puntos" in request.args:
+        return _get_lecturas_reducidas(sensor_id)
     try:
         # Esta llamada ahora trae solo datos del proceso activo o []
         lecturas = obtener_lecturas_por_sensor(sensor_id, limite=20)
@@ -58,13 +177,65 @@ def get_lecturas_por_sensor_endpoint(sensor_id):
             # Si no hay lecturas, retorna lista vacía 200 OK.
             return jsonify([]), 200 
         
-        result = [{
-            "id": l.id,
-            "sensor_id": l.sensor_id,
-            "valor": l.valor,
-            "fecha_hora": l.fecha_hora.isoformat(),
-            "observaciones": l.observaciones
-        } for l in lecturas]
-        return jsonify(result), 200
+        return jsonify([serializar_lectura(l) for l in lecturas]), 200
     except Exception as e:
-        return jsonify({"error": f"Error al obtener lecturas del sensor {sensor_id}: {e}"}), 500
\ No newline at end of file
+        return jsonify({"error": f"Error al obtener lecturas del sensor {sensor_id}: {e}"}), 500
+
+def _get_lecturas_reducidas(sensor_id):
+    max_puntos = request.args.get("max_puntos", type=int)
+    if max_puntos is None or not 3 <= max_puntos <= MAX_PUNTOS_LTTB:
+        return jsonify({"error": f"max_puntos debe ser un entero entre 3 y {MAX_PUNTOS_LTTB}"}), 400
+
+    proceso_id = request.args.get("proceso_id", type=int)
+    if proceso_id is None:
+        proceso = obtener_proceso_activo()
+        if not proceso:
+            return jsonify([]), 200
+        proceso_id = proceso.id
+
+    try:
+        desde = parsear_fecha_hora(request.args["desde"]) if "desde" in request.args else None
+        hasta = parsear_fecha_hora(request.args["hasta"]) if "hasta" in request.args else None
+    except ValueError:
+        return jsonify({"error": "desde/hasta inválidos, use formato ISO 8601"}), 400
+
+    try:
+        lecturas = obtener_lecturas_reducidas(sensor_id, proceso_id, max_puntos, desde, hasta)
+        return jsonify([serializar_lectura(l) for l in lecturas]), 200
+    except Exception as e:
+        return jsonify({"error": f"Error al obtener lecturas del sensor {sensor_id}: {e}"}), 500
+
+# Obtiene la serie agregada (min, max, avg, count, last por bucket) de un sensor.
+# Query params: desde, hasta (ISO 8601), resolucion (auto|1m|1h|1d), proceso_id (opcional)
+@lectura_bp.get("/lecturas/<int:sensor_id>/serie")
+def get_serie_sensor(sensor_id):
+    proceso_id = request.args.get("proceso_id", type=int)
+    if proceso_id is None:
+        proceso = obtener_proceso_activo()
+        if not proceso:
+            return jsonify({"error": "No hay proceso activo; indique proceso_id"}), 404
+        proceso_id = proceso.id
+
+    try:
+        hasta = parsear_fecha_hora(request.args["hasta"]) if "hasta" in request.args else datetime.utcnow()
+        desde = parsear_fecha_hora(request.args["desde"]) if "desde" in request.args else hasta - timedelta(days=1)
+    except ValueError:
+        return jsonify({"error": "desde/hasta inválidos, use formato ISO 8601"}), 400
+    if desde > hasta:
+        return jsonify({"error": "'desde' debe ser anterior a 'hasta'"}), 400
+
+    try:
+        resolucion, buckets = obtener_serie(
+            sensor_id, proceso_id, desde, hasta, request.args.get("resolucion", "auto")
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "sensor_id": sensor_id,
+        "proceso_id": proceso_id,
+        "resolucion": resolucion,
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "puntos": [b.to_dict() for b in buckets]
+    }), 200
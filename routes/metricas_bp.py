@@ -0,0 +1,9 @@
+from flask import Blueprint, Response
+from services.metricas_service import exponer_metricas
+
+metricas_bp = Blueprint("metricas", __name__)
+
+# Métricas de todos los workers de la máquina en formato de texto de Prometheus.
+@metricas_bp.get("/metrics")
+def metrics():
+    return Response(exponer_metricas(), mimetype="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,47 @@
+from flask import Blueprint, jsonify, request
+from services.ai_service import cargador_modelos, listar_versiones_modelos
+from routes.auth_bp import requiere_rol
+
+modelos_bp = Blueprint("modelos", __name__)
+
+# Lista las versiones del registro, la activa, la anterior y su latencia en este worker.
+@modelos_bp.get("/modelos")
+def listar_modelos():
+    try:
+        return jsonify(listar_versiones_modelos()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Carga, valida y activa una versión en segundo plano (solo administradores).
+@modelos_bp.post("/modelos/activar")
+@requiere_rol("admin")
+def activar_modelos():
+    data = request.get_json(silent=True) or {}
+    version = data.get("version")
+    if not isinstance(version, str) or not version:
+        return jsonify({"error": "Se requiere 'version'"}), 400
+
+    try:
+        trabajo = cargador_modelos.activar(version)
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify(trabajo), 202
+
+# Vuelve a la versión activa anterior (solo administradores).
+@modelos_bp.post("/modelos/rollback")
+@requiere_rol("admin")
+def revertir_modelos():
+    try:
+        trabajo = cargador_modelos.revertir()
+    except (LookupError, RuntimeError) as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify(trabajo), 202
+
+# Estado del último cambio de versión en este worker.
+@modelos_bp.get("/modelos/activacion")
+def estado_activacion():
+    if not cargador_modelos.activacion:
+        return jsonify({"error": "No hay cambios de versión en este worker"}), 404
+    return jsonify(cargador_modelos.activacion), 200
@@ -1,10 +1,16 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 from services.proceso_service import (
     iniciar_proceso,
     finalizar_proceso,
     hay_proceso_activo,
     proceso_to_dict
 )
+from services.export_service import exportar_proceso, TIPOS_MIME
+from services.reevaluacion_service import iniciar_reevaluacion, obtener_trabajo
+from services.estadisticas_service import obtener_estadisticas
+from services.alertas_service import obtener_alertas, LIMITE_ALERTAS_DEFECTO, LIMITE_ALERTAS_MAX
+from services.presupuesto_consultas import presupuesto_consultas
+from routes.auth_bp import requiere_rol
 
 proceso_bp = Blueprint("proceso_bp", __name__)
 
@@ -21,6 +27,7 @@ def iniciar():
 
 # Finaliza el proceso activo
 @proceso_bp.post("/proceso/finalizar")
+@presupuesto_consultas(8)
 def finalizar():
     try:
         proceso = finalizar_proceso()
@@ -45,3 +52,83 @@ def verificar_estado_proceso_route():
             "error": "Error interno del servidor al verificar el estado.",
             "detalle": str(e)
         }), 500
+
+# Exporta las lecturas de un proceso en formato ancho (una columna por sensor) para análisis
+# y reentrenamiento. Query params: formato=csv|parquet|xlsx, intervalo (segundos; 0, por defecto,
+# = cada lectura). Parquet requiere pyarrow (501 sin él); XLSX reparte en hojas de 1.048.575 filas.
+@proceso_bp.get("/procesos/<int:proceso_id>/export")
+def exportar(proceso_id):
+    formato = request.args.get("formato", "csv")
+    intervalo = request.args.get("intervalo", 0, type=int)
+    if intervalo < 0:
+        return jsonify({"error": "intervalo debe ser mayor o igual a 0"}), 400
+
+    try:
+        contenido = exportar_proceso(proceso_id, formato, intervalo)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 501
+
+    return Response(
+        stream_with_context(contenido),
+        mimetype=TIPOS_MIME[formato],
+        headers={"Content-Disposition": f"attachment; filename=proceso_{proceso_id}.{formato}"}
+    )
+
+# Reevalúa con los modelos de IA cada instante de un proceso en segundo plano (solo administradores).
+# Body JSON opcional: {"n_jobs": int, "tamano_lote": int}
+@proceso_bp.post("/procesos/<int:proceso_id>/rescore")
+@requiere_rol("admin")
+def reevaluar(proceso_id):
+    data = request.get_json(silent=True) or {}
+    n_jobs = data.get("n_jobs", -1)
+    tamano_lote = data.get("tamano_lote", 50000)
+    if not isinstance(n_jobs, int) or not isinstance(tamano_lote, int) or tamano_lote <= 0:
+        return jsonify({"error": "n_jobs y tamano_lote deben ser enteros (tamano_lote > 0)"}), 400
+
+    try:
+        trabajo = iniciar_reevaluacion(
+            current_app._get_current_object(), proceso_id, n_jobs, tamano_lote
+        )
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify(trabajo), 202
+
+# Consulta el progreso de la última reevaluación de un proceso.
+@proceso_bp.get("/procesos/<int:proceso_id>/rescore")
+def estado_reevaluacion(proceso_id):
+    trabajo = obtener_trabajo(proceso_id)
+    if not trabajo:
+        return jsonify({"error": "No hay reevaluaciones para este proceso"}), 404
+    return jsonify(trabajo), 200
+
+# Estadísticas por sensor del proceso (count, mean, std, min, max, p50/p95/p99),
+# mantenidas al registrar lecturas: no recorre la tabla de lecturas.
+@proceso_bp.get("/procesos/<int:proceso_id>/estadisticas")
+@presupuesto_consultas(2)
+def estadisticas(proceso_id):
+    try:
+        return jsonify(obtener_estadisticas(proceso_id)), 200
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": "Error interno del servidor", "detalle": str(e)}), 500
+
+# Alertas detectadas en línea al registrar lecturas (umbrales, z-score EWMA y tasa de cambio).
+# Query params: abiertas=1 para solo las que siguen en curso, limit.
+@proceso_bp.get("/procesos/<int:proceso_id>/alertas")
+@presupuesto_consultas(2)
+def alertas(proceso_id):
+    limite = request.args.get("limit", LIMITE_ALERTAS_DEFECTO, type=int)
+    if not 1 <= limite <= LIMITE_ALERTAS_MAX:
+        return jsonify({"error": f"limit debe estar entre 1 y {LIMITE_ALERTAS_MAX}"}), 400
+    abiertas = request.args.get("abiertas") in ("1", "true")
+    try:
+        return jsonify([a.to_dict() for a in obtener_alertas(proceso_id, abiertas, limite)]), 200
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
@@ -0,0 +1,27 @@
+from flask import current_app, jsonify, request
+
+
+def respuesta_versionada(recurso, clave, construir):
+    """
+    GET condicional sobre un RecursoVersionado.
+    - Si el If-None-Match del cliente coincide con la versión vigente: 304 sin consultar la BD.
+    - Si la respuesta de esta versión ya está serializada en memoria: se reenvía tal cual.
+    - Si no, construir() -> (datos, código) consulta la BD; solo se guardan las respuestas 200.
+    """
+    version = recurso.version()
+    etag = recurso.etag(version)
+    if request.if_none_match.contains_weak(etag):
+        respuesta = current_app.response_class(status=304)
+    else:
+        cuerpo = recurso.obtener(clave, version)
+        if cuerpo is None:
+            datos, codigo = construir()
+            if codigo != 200:
+                return jsonify(datos), codigo
+            cuerpo = jsonify(datos).get_data()
+            recurso.guardar(clave, version, cuerpo)
+        respuesta = current_app.response_class(cuerpo, mimetype="application/json")
+    respuesta.set_etag(etag)
+    # El cliente puede guardar la respuesta pero debe revalidarla en cada uso.
+    respuesta.headers["Cache-Control"] = "no-cache"
+    return respuesta
@@ -1,8 +1,11 @@
 from flask import Blueprint, request, jsonify
 from services.sensor_service import (
     crear_sensor, obtener_sensores, obtener_sensor_por_id,
-    actualizar_sensor, eliminar_sensor
+    actualizar_sensor, eliminar_sensor, sensor_to_dict
 )
+from database.recursos_versionados import obtener_recurso, SENSORES
+from routes.respuesta_condicional import respuesta_versionada
+from services.presupuesto_consultas import presupuesto_consultas
 
 sensors_bp = Blueprint("sensor", __name__)
 
@@ -30,9 +33,11 @@ def create_sensor():
         "unidad": sensor.unidad
     }), 201
 
-# Obtiene todos los sensores registrados.
+# Obtiene todos los sensores registrados (con ETag: 304 si el catálogo no cambió).
 @sensors_bp.get("/sensores")
+@presupuesto_consultas(1)
 def get_sensors():
-    sensores = obtener_sensores()
-    result = [{"id": s.id, "nombre": s.nombre, "tipo": s.tipo, "unidad": s.unidad} for s in sensores]
-    return jsonify(result), 200
+    def construir():
+        sensores = obtener_sensores()
+        return [sensor_to_dict(s) for s in sensores], 200
+    return respuesta_versionada(obtener_recurso(SENSORES), "todos", construir)
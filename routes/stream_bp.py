@@ -0,0 +1,60 @@
+import json
+import os
+import queue
+from flask import Blueprint, Response, jsonify, request
+from services.eventos_service import bus_eventos, TIPOS_EVENTO
+
+stream_bp = Blueprint("stream", __name__)
+
+# Segundos sin eventos tras los cuales se envía un comentario de heartbeat.
+INTERVALO_HEARTBEAT = float(os.environ.get("SSE_HEARTBEAT", "15"))
+# Segundos que el cliente espera antes de reconectarse (retry del stream y Retry-After).
+REINTENTO_STREAM = 5
+
+def _lista_parametro(nombre):
+    valor = request.args.get(nombre)
+    return [v.strip() for v in valor.split(",") if v.strip()] if valor else None
+
+def _formatear_evento(evento):
+    datos = json.dumps(evento.datos, default=str)
+    return f"id: {evento.id}\nevent: {evento.tipo}\ndata: {datos}\n\n"
+
+def _generar_eventos(suscripcion):
+    try:
+        yield f"retry: {REINTENTO_STREAM * 1000}\n\n"
+        while True:
+            try:
+                evento = suscripcion.cola.get(timeout=INTERVALO_HEARTBEAT)
+            except queue.Empty:
+                yield ": heartbeat\n\n"
+                continue
+            yield _formatear_evento(evento)
+    finally:
+        bus_eventos.cancelar(suscripcion)
+
+# Canal Server-Sent Events con lecturas nuevas, cambios de proceso y predicciones.
+# Query params opcionales: sensores=1,2,3 y tipos=lectura,proceso,prediccion
+@stream_bp.get("/stream")
+def stream_eventos():
+    tipos = _lista_parametro("tipos")
+    if tipos and any(t not in TIPOS_EVENTO for t in tipos):
+        return jsonify({"error": f"Tipos válidos: {', '.join(TIPOS_EVENTO)}"}), 400
+    try:
+        sensores = [int(s) for s in _lista_parametro("sensores") or []]
+    except ValueError:
+        return jsonify({"error": "sensores debe ser una lista de ids separados por comas"}), 400
+
+    suscripcion = bus_eventos.suscribir(tipos, sensores)
+    if suscripcion is None:
+        return jsonify({"error": "Demasiados clientes conectados al stream"}), 503, {
+            "Retry-After": str(REINTENTO_STREAM)
+        }
+
+    response = Response(
+        _generar_eventos(suscripcion),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    # Libera la suscripción aunque el cliente se desconecte antes del primer evento.
+    response.call_on_close(lambda: bus_eventos.cancelar(suscripcion))
+    return response
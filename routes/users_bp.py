@@ -1,6 +1,10 @@
 from flask import Blueprint, jsonify, request
 from database.connection import db
 from database.models.user import User
+from services.token_service import firmador
+from database.recursos_versionados import obtener_recurso, marcar_cambio, USUARIOS
+from routes.respuesta_condicional import respuesta_versionada
+from services.presupuesto_consultas import presupuesto_consultas
 
 users_bp = Blueprint("users", __name__)
 
@@ -18,32 +22,36 @@ def serialize_user(user):
         )
     }
 
-# Obtiene todos los usuarios excepto admin.
-@users_bp.get("/users")
-def get_users():
+def _lista_usuarios(clave, consulta):
+    """Lista de usuarios con ETag: 304 si la tabla no cambió desde la última consulta."""
+    def construir():
+        return [serialize_user(user) for user in consulta().all()], 200
     try:
-        users = User.query.filter(User.rol != "admin").all()
-        return jsonify([serialize_user(user) for user in users]), 200
+        return respuesta_versionada(obtener_recurso(USUARIOS), clave, construir)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Obtiene todos los usuarios excepto admin.
+@users_bp.get("/users")
+@presupuesto_consultas(1)
+def get_users():
+    return _lista_usuarios("todos", lambda: User.query.filter(User.rol != "admin"))
+
 # Obtiene usuarios activos.
 @users_bp.get("/users/active")
+@presupuesto_consultas(1)
 def get_active_users():
-    try:
-        activos = User.query.filter_by(estado="activo").filter(User.rol != "admin").all()
-        return jsonify([serialize_user(user) for user in activos]), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return _lista_usuarios(
+        "activos", lambda: User.query.filter_by(estado="activo").filter(User.rol != "admin")
+    )
 
 # Obtiene usuarios bloqueado.
 @users_bp.get("/users/blocked")
+@presupuesto_consultas(1)
 def get_blocked_users():
-    try:
-        users = User.query.filter_by(estado="bloqueado").filter(User.rol != "admin").all()
-        return jsonify([serialize_user(user) for user in users]), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return _lista_usuarios(
+        "bloqueados", lambda: User.query.filter_by(estado="bloqueado").filter(User.rol != "admin")
+    )
 
 # Actualiza el estado de un usuario (activo o bloqueado).
 # Body JSON esperado: {"estado": "activo"|"bloqueado"}
@@ -63,6 +71,10 @@ def update_user_state(user_id):
 
         user.estado = nuevo_estado
         db.session.commit()
+        marcar_cambio(USUARIOS)
+        # Los tokens ya emitidos dejan de aceptarse en todos los workers sin consultar la BD.
+        if nuevo_estado == "bloqueado":
+            firmador.revocacion.revocar(user.id)
         return jsonify({
             "message": f"Estado del usuario {user.nombre} actualizado a '{nuevo_estado}' correctamente.",
             "user": serialize_user(user)
@@ -1,17 +1,24 @@
 from flask import Blueprint, jsonify, request
 from database.connection import db
 from database.models.voice_config import VoiceConfig 
+from database.recursos_versionados import obtener_recurso, marcar_cambio, VOZ
+from routes.respuesta_condicional import respuesta_versionada
+from services.presupuesto_consultas import presupuesto_consultas
 
 voice_bp = Blueprint('voice', __name__)
 
 # Recupera la configuración de voz guardada. Si no existe, devuelve valores por defecto.
+# Con ETag: 304 si no cambió desde la última consulta del cliente.
 @voice_bp.get('/voice')
+@presupuesto_consultas(1)
 def get_voice_config():
-    config = VoiceConfig.query.get(1)
-    if config:
-        return jsonify(config.to_dict()), 200
-    default_config = VoiceConfig()
-    return jsonify(default_config.to_dict()), 200
+    def construir():
+        config = VoiceConfig.query.get(1)
+        if config:
+            return config.to_dict(), 200
+        default_config = VoiceConfig()
+        return default_config.to_dict(), 200
+    return respuesta_versionada(obtener_recurso(VOZ), 1, construir)
 
 # Guarda o actualiza la configuración de voz.
 # Body JSON esperado: {"voice_gender": str, "voice_pitch": float}
@@ -32,6 +39,7 @@ def save_voice_config():
             config.voice_gender = gender
             config.voice_pitch = pitch
         db.session.commit()
+        marcar_cambio(VOZ)
         return jsonify(config.to_dict()), 200
     except Exception as e:
         db.session.rollback()
@@ -0,0 +1,200 @@
+import os
+from datetime import timedelta
+from sqlalchemy import case, func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database.connection import db
+from database.models.lectura import Lectura
+from database.models.lectura_agregada import LecturaAgregada
+from database.models.proceso_biodigestor import ProcesoBiodigestor
+
+# Resoluciones disponibles, de la más fina a la más gruesa.
+RESOLUCIONES = {
+    "1m": timedelta(minutes=1),
+    "1h": timedelta(hours=1),
+    "1d": timedelta(days=1),
+}
+
+# Máximo de buckets que se devuelven al elegir la resolución automáticamente.
+MAX_PUNTOS_SERIE = int(os.environ.get("MAX_PUNTOS_SERIE", "1000"))
+
+_COLUMNAS_CLAVE = ("proceso_id", "sensor_id", "resolucion", "inicio")
+
+
+def inicio_bucket(fecha, resolucion):
+    """Trunca una fecha al comienzo de su bucket en la resolución indicada."""
+    if resolucion == "1m":
+        return fecha.replace(second=0, microsecond=0)
+    if resolucion == "1h":
+        return fecha.replace(minute=0, second=0, microsecond=0)
+    return fecha.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def acumular(buckets, proceso_id, sensor_id, fecha_hora, valor):
+    """
+    Acumula una lectura en los buckets de todas las resoluciones.
+    buckets: dict clave -> [minimo, maximo, suma, cantidad, ultimo, ultimo_fecha]
+    """
+    for resolucion in RESOLUCIONES:
+        clave = (proceso_id, sensor_id, resolucion, inicio_bucket(fecha_hora, resolucion))
+        bucket = buckets.get(clave)
+        if bucket is None:
+            buckets[clave] = [valor, valor, valor, 1, valor, fecha_hora]
+            continue
+        if valor < bucket[0]:
+            bucket[0] = valor
+        if valor > bucket[1]:
+            bucket[1] = valor
+        bucket[2] += valor
+        bucket[3] += 1
+        if fecha_hora >= bucket[5]:
+            bucket[4] = valor
+            bucket[5] = fecha_hora
+
+
+def _sentencia_upsert():
+    """
+    INSERT que combina el bucket nuevo con el existente según el motor de base de datos.
+    En MySQL las asignaciones se evalúan en orden, por eso 'ultimo' va antes que 'ultimo_fecha'.
+    """
+    tabla = LecturaAgregada.__table__
+    dialecto = db.session.get_bind().dialect.name
+
+    if dialecto == "mysql":
+        stmt = mysql_insert(tabla)
+        nuevo = stmt.inserted
+        return stmt.on_duplicate_key_update([
+            ("minimo", func.least(tabla.c.minimo, nuevo.minimo)),
+            ("maximo", func.greatest(tabla.c.maximo, nuevo.maximo)),
+            ("suma", tabla.c.suma + nuevo.suma),
+            ("cantidad", tabla.c.cantidad + nuevo.cantidad),
+            ("ultimo", case((nuevo.ultimo_fecha >= tabla.c.ultimo_fecha, nuevo.ultimo), else_=tabla.c.ultimo)),
+            ("ultimo_fecha", func.greatest(tabla.c.ultimo_fecha, nuevo.ultimo_fecha)),
+        ])
+
+    if dialecto in ("sqlite", "postgresql"):
+        stmt = sqlite_insert(tabla) if dialecto == "sqlite" else postgresql_insert(tabla)
+        nuevo = stmt.excluded
+        # En SQLite min()/max() con dos argumentos son funciones escalares.
+        menor, mayor = (func.min, func.max) if dialecto == "sqlite" else (func.least, func.greatest)
+        return stmt.on_conflict_do_update(
+            index_elements=list(_COLUMNAS_CLAVE),
+            set_={
+                "minimo": menor(tabla.c.minimo, nuevo.minimo),
+                "maximo": mayor(tabla.c.maximo, nuevo.maximo),
+                "suma": tabla.c.suma + nuevo.suma,
+                "cantidad": tabla.c.cantidad + nuevo.cantidad,
+                "ultimo": case((nuevo.ultimo_fecha >= tabla.c.ultimo_fecha, nuevo.ultimo), else_=tabla.c.ultimo),
+                "ultimo_fecha": mayor(tabla.c.ultimo_fecha, nuevo.ultimo_fecha),
+            },
+        )
+
+    raise RuntimeError(f"Motor de base de datos no soportado para agregados: {dialecto}")
+
+
+def guardar_buckets(buckets):
+    """Combina los buckets acumulados con los persistidos (sin confirmar la transacción)."""
+    if not buckets:
+        return
+    filas = [
+        {
+            "proceso_id": proceso_id, "sensor_id": sensor_id,
+            "resolucion": resolucion, "inicio": inicio,
+            "minimo": b[0], "maximo": b[1], "suma": b[2],
+            "cantidad": b[3], "ultimo": b[4], "ultimo_fecha": b[5],
+        }
+        for (proceso_id, sensor_id, resolucion, inicio), b in buckets.items()
+    ]
+    db.session.execute(_sentencia_upsert(), filas)
+
+
+def registrar_en_agregados(proceso_id, lecturas):
+    """
+    Actualiza los agregados con lecturas nuevas dentro de la transacción en curso.
+    lecturas: iterable de (sensor_id, fecha_hora, valor).
+    """
+    buckets = {}
+    for sensor_id, fecha_hora, valor in lecturas:
+        acumular(buckets, proceso_id, sensor_id, fecha_hora, float(valor))
+    guardar_buckets(buckets)
+
+
+def recalcular_agregados(proceso_id, tamano_lote=10000):
+    """
+    Reconstruye los agregados de un proceso a partir de la tabla lecturas.
+    Recorre las lecturas por lotes (paginación por id), por lo que la memoria usada no
+    depende del tamaño del proceso. El borrado y la reconstrucción se confirman en una
+    sola transacción: si algo falla, quedan los agregados anteriores.
+    En un proceso activo solo se reconstruyen las lecturas hasta el id máximo leído al
+    comenzar (después del borrado): las posteriores las suma registrar_en_agregados en
+    línea, que espera los bloqueos del borrado y se aplica sobre la reconstrucción.
+    Retorna la cantidad de lecturas procesadas.
+    Lanza LookupError si el proceso no existe.
+    """
+    if db.session.get(ProcesoBiodigestor, proceso_id) is None:
+        raise LookupError(f"No existe el proceso {proceso_id}.")
+
+    try:
+        LecturaAgregada.query.filter_by(proceso_id=proceso_id).delete()
+        corte = (
+            db.session.query(func.max(Lectura.id))
+            .filter(Lectura.proceso_id == proceso_id)
+            .scalar()
+        ) or 0
+
+        ultimo_id, procesadas = 0, 0
+        while True:
+            lote = (
+                db.session.query(Lectura.id, Lectura.sensor_id, Lectura.fecha_hora, Lectura.valor)
+                .filter(Lectura.proceso_id == proceso_id, Lectura.id > ultimo_id, Lectura.id <= corte)
+                .order_by(Lectura.id)
+                .limit(tamano_lote)
+                .all()
+            )
+            if not lote:
+                break
+            buckets = {}
+            for _, sensor_id, fecha_hora, valor in lote:
+                acumular(buckets, proceso_id, sensor_id, fecha_hora, float(valor))
+            guardar_buckets(buckets)
+            ultimo_id = lote[-1].id
+            procesadas += len(lote)
+        db.session.commit()
+        return procesadas
+    except Exception as e:
+        db.session.rollback()
+        raise RuntimeError(f"Error al recalcular agregados del proceso {proceso_id}: {e}")
+
+
+def elegir_resolucion(desde, hasta, max_puntos=MAX_PUNTOS_SERIE):
+    """Elige la resolución más fina cuyo número de buckets no supera max_puntos."""
+    rango = hasta - desde
+    for resolucion, duracion in RESOLUCIONES.items():
+        if rango / duracion <= max_puntos:
+            return resolucion
+    return "1d"
+
+
+def obtener_serie(sensor_id, proceso_id, desde, hasta, resolucion="auto"):
+    """
+    Retorna (resolucion, buckets) de un sensor entre desde y hasta.
+    Lanza ValueError si la resolución no es válida.
+    """
+    if resolucion == "auto":
+        resolucion = elegir_resolucion(desde, hasta)
+    elif resolucion not in RESOLUCIONES:
+        raise ValueError(f"Resolución inválida. Valores válidos: auto, {', '.join(RESOLUCIONES)}")
+
+    buckets = (
+        LecturaAgregada.query.filter(
+            LecturaAgregada.proceso_id == proceso_id,
+            LecturaAgregada.sensor_id == sensor_id,
+            LecturaAgregada.resolucion == resolucion,
+            LecturaAgregada.inicio >= inicio_bucket(desde, resolucion),
+            LecturaAgregada.inicio <= hasta,
+        )
+        .order_by(LecturaAgregada.inicio)
+        .all()
+    )
+    return resolucion, buckets
@@ -1,22 +1,354 @@
 import os
-import joblib
-import pandas as pd
+import threading
+import time
+from collections import deque, namedtuple
 from datetime import datetime
+import numpy as np
 from ml.utils import obtener_recomendacion
-from database.db_service import obtener_fecha_inicio_proceso_activo
+from ml.inferencia import BosqueCompilado, validar_contra_sklearn
+from ml import registro
+from database.db_service import obtener_fecha_inicio_proceso_activo, combinar_lecturas
+from services.eventos_service import publicar_evento
+from services.prediccion_cache import cache_predicciones
+from services.metricas_service import observar_inferencia
 
-# --- Rutas de Modelos ---
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-ML_DIR = os.path.join(BASE_DIR, '..', 'ml')
+# Columnas de entrada de los modelos, en el orden usado al entrenar.
+COLUMNAS_MODELO = ["temperatura_celsius", "presion_biogas_kpa", "mq4_ppm", "dia_proceso"]
 
-# --- Carga de modelos ---
-try:
-    modelo_alerta = joblib.load(os.path.join(ML_DIR, "modelo_alerta.pkl"))
-    modelo_tipo = joblib.load(os.path.join(ML_DIR, "modelo_tipo_alerta.pkl"))
-except FileNotFoundError:
-    print("FATAL ERROR: No se pudieron cargar los modelos de IA. Ejecute el script de entrenamiento.")
-    modelo_alerta = None
-    modelo_tipo = None
+# A partir de este tamaño de lote, el recorrido en Cython de scikit-learn es más rápido
+# que el motor compilado (ver benchmarks/bench_inferencia.py).
+UMBRAL_LOTE_SKLEARN = 256
+
+# Si es "0", create_app no inicia la carga en segundo plano (se cargan en el primer uso).
+PRECARGAR_MODELOS = os.environ.get("PRECARGAR_MODELOS", "1") != "0"
+
+# Espera antes de reintentar una carga fallida; se duplica en cada fallo hasta el máximo.
+REINTENTO_CARGA_MODELOS = float(os.environ.get("MODELOS_REINTENTO_S", "5"))
+REINTENTO_CARGA_MODELOS_MAX = float(os.environ.get("MODELOS_REINTENTO_MAX_S", "300"))
+
+# Latencias recientes que se conservan por versión de modelos.
+MUESTRAS_LATENCIA = 1000
+
+# En una versión multisalida `alerta` y `tipo` son el mismo bosque (y lo mismo sus motores).
+ModelosIA = namedtuple(
+    "ModelosIA", ["version", "alerta", "tipo", "motor_alerta", "motor_tipo", "manifiesto", "multisalida"]
+)
+
+
+class ModelosNoDisponibles(RuntimeError):
+    """Los modelos todavía se están cargando o no se pudieron cargar."""
+
+
+def _compilar(modelo):
+    """
+    Compila un bosque y verifica que prediga igual que scikit-learn sobre un lote de prueba.
+    Retorna None (se usará scikit-learn) si no es posible.
+    """
+    try:
+        motor = BosqueCompilado(modelo)
+        prueba = np.random.default_rng(0).uniform(
+            [0, 0, 0, 1], [60, 150, 12000, 60], size=(256, len(COLUMNAS_MODELO))
+        )
+        if validar_contra_sklearn(modelo, motor, prueba):
+            print("❌ El motor compilado no coincide con scikit-learn; se usará scikit-learn.")
+            return None
+        return motor
+    except Exception as e:
+        print(f"❌ No se pudo compilar el modelo: {e}")
+        return None
+
+
+def _prueba_humo(modelos):
+    """
+    Predice un lote fijo con la nueva versión antes de activarla.
+    Lanza ValueError si las features no coinciden o las salidas no son válidas.
+    """
+    features = modelos.manifiesto.get("features")
+    if features is not None and list(features) != COLUMNAS_MODELO:
+        raise ValueError(f"Features de la versión {modelos.version} distintas de {COLUMNAS_MODELO}.")
+    for modelo in (modelos.alerta, modelos.tipo):
+        if getattr(modelo, "n_features_in_", len(COLUMNAS_MODELO)) != len(COLUMNAS_MODELO):
+            raise ValueError(f"La versión {modelos.version} espera {modelo.n_features_in_} columnas.")
+    if modelos.multisalida and getattr(modelos.alerta, "n_outputs_", 1) != 2:
+        raise ValueError(f"El modelo multisalida de la versión {modelos.version} debe tener 2 salidas.")
+
+    lote = np.random.default_rng(1).uniform(
+        [15, 0, 0, 1], [50, 120, 11000, 60], size=(UMBRAL_LOTE_SKLEARN * 2, len(COLUMNAS_MODELO))
+    )
+    for filas in (lote[:1], lote[:UMBRAL_LOTE_SKLEARN - 1], lote):
+        alertas, tipos = _predecir(modelos, filas)
+        if len(alertas) != len(filas) or len(tipos) != len(filas):
+            raise ValueError(f"La versión {modelos.version} no retornó una predicción por fila.")
+        if not np.isin(alertas, (0, 1)).all():
+            raise ValueError(f"La versión {modelos.version} predijo alertas distintas de 0/1.")
+
+
+def _predecir(modelos, entradas, n_jobs=None):
+    if modelos.motor_alerta is not None and modelos.motor_tipo is not None \
+            and len(entradas) < UMBRAL_LOTE_SKLEARN:
+        if modelos.multisalida:
+            # Un único recorrido del bosque produce ambas salidas.
+            alertas, tipos = modelos.motor_alerta.predecir_salidas(entradas)
+            return alertas.astype(int), tipos.astype(str)
+        return modelos.motor_alerta.predecir(entradas).astype(int), modelos.motor_tipo.predecir(entradas).astype(str)
+
+    import pandas as pd
+    from joblib import parallel_config
+
+    entrada = pd.DataFrame(entradas, columns=COLUMNAS_MODELO)
+    with parallel_config(n_jobs=n_jobs):
+        if modelos.multisalida:
+            predicciones = modelos.alerta.predict(entrada)
+            alertas, tipos = predicciones[:, 0], predicciones[:, 1]
+        else:
+            alertas = modelos.alerta.predict(entrada)
+            tipos = modelos.tipo.predict(entrada)
+    return alertas.astype(int), tipos.astype(str)
+
+
+class LatenciasPorVersion:
+    """Latencia de inferencia por versión de modelos (llamadas, filas y percentiles recientes)."""
+
+    def __init__(self, muestras=MUESTRAS_LATENCIA):
+        self.muestras = muestras
+        self._lock = threading.Lock()
+        self._por_version = {}  # version -> [llamadas, filas, segundos_totales, deque de (filas, segundos)]
+
+    def registrar(self, version, filas, segundos):
+        with self._lock:
+            datos = self._por_version.get(version)
+            if datos is None:
+                datos = self._por_version[version] = [0, 0, 0.0, deque(maxlen=self.muestras)]
+            datos[0] += 1
+            datos[1] += filas
+            datos[2] += segundos
+            datos[3].append((filas, segundos))
+
+    def resumen(self, version):
+        with self._lock:
+            datos = self._por_version.get(version)
+            if datos is None:
+                return None
+            llamadas, filas, total, recientes = datos[0], datos[1], datos[2], list(datos[3])
+        # Los percentiles se calculan sobre las llamadas de una fila (el caso de /api/analizar).
+        individuales = np.array([s for n, s in recientes if n == 1]) * 1000
+        return {
+            "llamadas": llamadas,
+            "filas": filas,
+            "ms_por_fila": round(total * 1000 / filas, 4) if filas else None,
+            "p50_ms_1_fila": round(float(np.percentile(individuales, 50)), 4) if individuales.size else None,
+            "p99_ms_1_fila": round(float(np.percentile(individuales, 99)), 4) if individuales.size else None,
+        }
+
+
+class CargadorModelos:
+    """
+    Carga diferida y recambio en caliente de los modelos de IA.
+    - iniciar() lanza la carga de la versión activa en un hilo de fondo (idempotente).
+    - obtener() retorna los modelos y, si aún no están, los carga (o espera la carga en curso).
+      También detecta si otro worker activó otra versión y la carga en segundo plano.
+    - Una carga fallida se reintenta tras una espera creciente, o de inmediato si cambia
+      la versión activa publicada.
+    - activar() prepara una versión (checksums, compilación, prueba de humo) y recién
+      entonces reemplaza la referencia: las solicitudes en curso terminan con la anterior.
+    La deserialización (joblib/scikit-learn/pandas) ocurre solo al cargar, así importar
+    este módulo o crear la app no paga ese costo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._lock_cambio = threading.Lock()  # un solo cambio de versión a la vez por worker
+        self.modelos = None
+        self.error = None
+        self._fallos = 0           # cargas fallidas seguidas
+        self._fallo_en = None      # instante (monotonic) del último fallo
+        self._version_error = None  # versión activa cuando falló la carga
+        self.duracion = None
+        self.activacion = None  # estado del último cambio de versión
+        self._version_fallida = None
+        self.latencias = LatenciasPorVersion()
+
+    def _preparar(self, version):
+        inicio = time.perf_counter()
+        archivos, manifiesto = registro.cargar_version(version)
+        if manifiesto.get("tipo_modelo") == registro.TIPO_MULTISALIDA:
+            bosque = archivos[registro.ARCHIVO_MULTISALIDA]
+            motor = _compilar(bosque)
+            modelos = ModelosIA(version, bosque, bosque, motor, motor, manifiesto, True)
+        else:
+            alerta, tipo = (archivos[nombre] for nombre in registro.ARCHIVOS_MODELO)
+            modelos = ModelosIA(version, alerta, tipo, _compilar(alerta), _compilar(tipo), manifiesto, False)
+        _prueba_humo(modelos)
+        return modelos, time.perf_counter() - inicio
+
+    def _espera_reintento(self):
+        """Segundos que faltan para reintentar la carga fallida (0 si ya se puede)."""
+        if self.error is None:
+            return 0
+        if registro.version_activa() != self._version_error:
+            return 0
+        espera = min(REINTENTO_CARGA_MODELOS * 2 ** (self._fallos - 1), REINTENTO_CARGA_MODELOS_MAX)
+        return max(self._fallo_en + espera - time.monotonic(), 0)
+
+    def cargar(self):
+        """
+        Carga la versión activa si aún no está cargada. Retorna ModelosIA, o None si
+        falló (se reintenta en una llamada posterior, cumplida la espera).
+        """
+        with self._lock:
+            if self.modelos is not None or self._espera_reintento() > 0:
+                return self.modelos
+            version = registro.version_activa(forzar=True)
+            try:
+                self.modelos, self.duracion = self._preparar(version)
+                self.error, self._fallos = None, 0
+                print(f"✅ Modelos de IA (versión {version}) cargados en {self.duracion:.2f}s.")
+            except (FileNotFoundError, LookupError):
+                print("FATAL ERROR: No se pudieron cargar los modelos de IA. Ejecute el script de entrenamiento.")
+                self._registrar_fallo(version, f"Modelos de IA no encontrados (versión {version}).")
+            except Exception as e:
+                print(f"❌ Error al cargar los modelos de IA (versión {version}): {e}")
+                self._registrar_fallo(version, str(e))
+            return self.modelos
+
+    def _registrar_fallo(self, version, error):
+        # Una versión distinta a la que falló antes reinicia la espera.
+        self._fallos = self._fallos + 1 if version == self._version_error else 1
+        self._fallo_en = time.monotonic()
+        self._version_error = version
+        self.error = error
+
+    def iniciar(self):
+        """Inicia la carga en segundo plano si no se hizo ya."""
+        with self._lock:
+            if self._hilo is not None or self.modelos is not None or self.error is not None:
+                return
+            self._hilo = threading.Thread(target=self.cargar, name="carga-modelos-ia", daemon=True)
+            self._hilo.start()
+
+    def listos(self):
+        return self.modelos is not None
+
+    def obtener(self):
+        """Retorna los modelos cargándolos si hace falta. Lanza ModelosNoDisponibles si fallaron."""
+        modelos = self.modelos or self.cargar()
+        if modelos is None:
+            raise ModelosNoDisponibles(f"Modelos de IA no cargados: {self.error}")
+        publicada = registro.version_activa()
+        if publicada not in (modelos.version, self._version_fallida) and not self._lock_cambio.locked():
+            # Otro worker activó una versión: se carga en segundo plano y mientras tanto
+            # se sigue respondiendo con la actual.
+            try:
+                self.activar(publicada, publicar=False)
+            except Exception as e:
+                print(f"❌ No se pudo seguir la versión de modelos {publicada}: {e}")
+                self._version_fallida = publicada
+        return modelos
+
+    def activar(self, version, publicar=True):
+        """
+        Prepara y activa una versión en un hilo de fondo.
+        Con publicar=True la versión queda activa para todos los workers.
+        Lanza LookupError si la versión no existe y RuntimeError si ya hay un cambio en curso.
+        """
+        if not registro.existe_version(version):
+            raise LookupError(f"No existe la versión de modelos '{version}'.")
+        if not self._lock_cambio.acquire(blocking=False):
+            raise RuntimeError("Ya hay un cambio de versión en curso.")
+
+        self.activacion = {
+            "version": version,
+            "anterior": self.modelos.version if self.modelos else None,
+            "estado": "en_curso",
+            "inicio": datetime.utcnow().isoformat(),
+            "fin": None,
+            "duracion_carga_s": None,
+            "error": None,
+        }
+        trabajo = self.activacion
+
+        def _ejecutar():
+            try:
+                modelos, duracion = self._preparar(version)
+                # Reemplazo atómico de la referencia: quien ya obtuvo los modelos anteriores
+                # termina su predicción con ellos.
+                self.modelos, self.duracion, self.error, self._fallos = modelos, duracion, None, 0
+                if publicar:
+                    registro.publicar_activacion(version)
+                trabajo.update(estado="completado", duracion_carga_s=round(duracion, 3))
+                print(f"✅ Versión de modelos {version} activada en {duracion:.2f}s.")
+            except Exception as e:
+                trabajo.update(estado="error", error=str(e))
+                self._version_fallida = version
+                print(f"❌ No se pudo activar la versión de modelos {version}: {e}")
+            finally:
+                trabajo["fin"] = datetime.utcnow().isoformat()
+                self._lock_cambio.release()
+
+        threading.Thread(target=_ejecutar, name=f"activar-modelos-{version}", daemon=True).start()
+        return dict(trabajo)
+
+    def revertir(self):
+        """Activa la versión anterior. Lanza LookupError si no hay a cuál volver."""
+        anterior = registro.version_anterior()
+        if anterior is None:
+            raise LookupError("No hay una versión anterior a la cual volver.")
+        return self.activar(anterior)
+
+    def version(self):
+        return self.modelos.version if self.modelos else None
+
+    def estado(self):
+        """Estado para el endpoint de readiness: pendiente, cargando, listo o error."""
+        if self.modelos is not None:
+            estado = "listo"
+        elif self.error is not None:
+            estado = "error"
+        elif self._hilo is not None:
+            estado = "cargando"
+        else:
+            estado = "pendiente"
+        return {
+            "estado": estado,
+            "version": self.version(),
+            "error": self.error,
+            "reintento_en_s": round(self._espera_reintento(), 1) if self.modelos is None and self.error else None,
+            "duracion_carga_s": round(self.duracion, 3) if self.duracion is not None else None,
+            "multisalida": bool(self.modelos and self.modelos.multisalida),
+            "motor_compilado": bool(self.modelos and self.modelos.motor_alerta and self.modelos.motor_tipo),
+        }
+
+
+cargador_modelos = CargadorModelos()
+
+
+def iniciar_carga_modelos():
+    """Lanza la carga de los modelos en segundo plano (llamado desde create_app)."""
+    if PRECARGAR_MODELOS:
+        cargador_modelos.iniciar()
+
+
+def modelos_listos():
+    return cargador_modelos.listos()
+
+
+def estado_modelos():
+    return cargador_modelos.estado()
+
+
+def listar_versiones_modelos():
+    """Versiones del registro con su latencia medida en este worker."""
+    return {
+        "activa": registro.version_activa(forzar=True),
+        "cargada": cargador_modelos.version(),
+        "anterior": registro.version_anterior(),
+        "versiones": [
+            {**manifiesto, "latencia": cargador_modelos.latencias.resumen(manifiesto["version"])}
+            for manifiesto in registro.listar_versiones()
+        ],
+        "activacion": dict(cargador_modelos.activacion) if cargador_modelos.activacion else None,
+    }
 
 # -------------------------------------------------------------------
 # AI SERVICE FUNCTIONS
@@ -26,13 +358,13 @@ def calcular_dia_proceso(timestamp_str):
     """
     Calcula el día del proceso basándose en el timestamp de la lectura.
     Devuelve 0 si no hay proceso activo.
-    Soporta formatos: '%Y-%m-%d %H:%M:%S' y '%d/%m/%Y %H:%M'.
+    Soporta formatos: '%Y-%m-%d %H:%M:%S' (con o sin microsegundos) y '%d/%m/%Y %H:%M'.
     """
     fecha_inicio = obtener_fecha_inicio_proceso_activo()
     if fecha_inicio is None:
         return 0
 
-    for fmt in ("%Y-%m-%d %H:%M:%S", "%d/%m/%Y %H:%M"):
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M:%S.%f", "%d/%m/%Y %H:%M"):
         try:
             timestamp = datetime.strptime(timestamp_str, fmt)
             break
@@ -44,13 +376,33 @@ def calcular_dia_proceso(timestamp_str):
     delta = timestamp - fecha_inicio
     return delta.days + 1
 
+def predecir_lote(entradas, n_jobs=None):
+    """
+    Predice alerta y tipo de alerta para una matriz Nx4 (columnas COLUMNAS_MODELO).
+    Con n_jobs los árboles de cada bosque se evalúan en paralelo.
+    Retorna (alertas, tipos) como arreglos NumPy.
+    Si los modelos aún no están cargados, los carga (o espera la carga en curso).
+    Lanza ModelosNoDisponibles (RuntimeError) si no se pudieron cargar.
+    """
+    modelos = cargador_modelos.obtener()
+    entradas = np.asarray(entradas, dtype=np.float64)
+
+    inicio = time.perf_counter()
+    resultado = _predecir(modelos, entradas, n_jobs)
+    duracion = time.perf_counter() - inicio
+    cargador_modelos.latencias.registrar(modelos.version, len(entradas), duracion)
+    observar_inferencia(modelos.version, len(entradas), duracion)
+    return resultado
+
 def predecir_alerta(temperatura, presion, gas, timestamp):
     """
     Realiza predicción de alerta utilizando modelos de IA.
     Maneja escenarios donde no hay proceso activo o modelos no cargados.
     Retorna un diccionario estandarizado con resultados y recomendaciones.
     """
-    if modelo_alerta is None or modelo_tipo is None:
+    try:
+        cargador_modelos.obtener()
+    except ModelosNoDisponibles:
         return {
             "alerta_ia": 0,
             "tipo_estado": "Error de Sistema",
@@ -69,15 +421,9 @@ def predecir_alerta(temperatura, presion, gas, timestamp):
             "dia_proceso": 0
         }
 
-    entrada = pd.DataFrame([{
-        "temperatura_celsius": temperatura,
-        "presion_biogas_kpa": presion,
-        "mq4_ppm": gas,
-        "dia_proceso": dia_proceso
-    }])
-
-    alerta_pred = int(modelo_alerta.predict(entrada)[0])
-    tipo_pred = str(modelo_tipo.predict(entrada)[0])
+    alertas, tipos = predecir_lote([[temperatura, presion, gas, dia_proceso]])
+    alerta_pred = int(alertas[0])
+    tipo_pred = str(tipos[0])
 
     recomendacion_data = obtener_recomendacion(
         estado=alerta_pred,
@@ -92,5 +438,22 @@ def predecir_alerta(temperatura, presion, gas, timestamp):
         "tipo_estado": recomendacion_data.get("tipo", ""),
         "mensaje_lectura": recomendacion_data.get("mensaje", ""),
         "recomendacion": recomendacion_data.get("recomendacion", ""),
-        "dia_proceso": dia_proceso
+        "dia_proceso": dia_proceso,
+        "version_modelo": cargador_modelos.version()
     }
+
+def predecir_ultimas_lecturas(proceso_id, ultima_temp, ultima_pres, ultima_gas):
+    """
+    Predicción para las últimas lecturas de un proceso, reutilizada mientras no cambien.
+    Retorna (resultado, desde_cache, edad_segundos).
+    """
+    temperatura, presion, gas, timestamp = combinar_lecturas(ultima_temp, ultima_pres, ultima_gas)
+
+    def calcular():
+        resultado = predecir_alerta(temperatura, presion, gas, timestamp)
+        publicar_evento("prediccion", {"proceso_id": proceso_id, "timestamp": timestamp, **resultado})
+        return resultado
+
+    # La versión de los modelos forma parte de la clave: tras un cambio no se reutilizan resultados viejos.
+    clave = (cargador_modelos.version(), proceso_id, ultima_temp.id, ultima_pres.id, ultima_gas.id)
+    return cache_predicciones.obtener_o_calcular(clave, calcular)
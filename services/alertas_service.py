@@ -0,0 +1,158 @@
+import os
+from datetime import datetime
+from database.connection import db
+from database.db_service import SENSOR_IDS
+from database.models.alerta import Alerta
+from database.models.proceso_biodigestor import ProcesoBiodigestor
+from database.version_compartida import VersionCompartida
+from ml.deteccion import ALFA_EWMA, LECTURAS_CALENTAMIENTO, LIMITE_Z, DetectorAnomalias, EventoAbierto
+from services.eventos_service import publicar_evento
+
+_EPOCA = datetime(1970, 1, 1)
+
+# Cada worker evalúa las lecturas que él mismo registra; los eventos abiertos se
+# comparten a través de la tabla alertas (un evento abierto no se duplica) y cada
+# worker los relee cuando otro publica una apertura o un cierre. La media EWMA y la
+# tasa de cambio, en cambio, son de cada worker y solo ven sus propias lecturas:
+# para z-score y tasa exactos la ingesta debe tener un solo escritor por máquina
+# (INGESTA_ASINCRONA=1 con un solo worker atendiendo POST /api/lecturas).
+detector = DetectorAnomalias(
+    {sensor_id: nombre for nombre, sensor_id in SENSOR_IDS.items()},
+    alfa=float(os.environ.get("DETECCION_ALFA", ALFA_EWMA)),
+    limite_z=float(os.environ.get("DETECCION_LIMITE_Z", LIMITE_Z)),
+    calentamiento=int(os.environ.get("DETECCION_CALENTAMIENTO", LECTURAS_CALENTAMIENTO)),
+)
+
+LIMITE_ALERTAS_DEFECTO = 100
+LIMITE_ALERTAS_MAX = 1000
+
+_versiones = {}     # sensor_id -> VersionCompartida de sus eventos de alerta
+_sincronizado = {}  # (proceso_id, sensor_id) -> versión con la que se leyeron los abiertos
+
+
+def _version(sensor_id):
+    version = _versiones.get(sensor_id)
+    if version is None:
+        version = _versiones.setdefault(sensor_id, VersionCompartida(f"alertas_sensor_{sensor_id}"))
+    return version
+
+
+def _consulta_abiertas(proceso_id, sensor_id, tipo=None):
+    consulta = Alerta.query.filter(
+        Alerta.proceso_id == proceso_id, Alerta.sensor_id == sensor_id, Alerta.fin.is_(None)
+    )
+    return consulta.filter(Alerta.tipo == tipo) if tipo is not None else consulta
+
+
+def _sincronizar_estado(proceso_id, sensor_id):
+    """
+    Retoma los eventos abiertos en la base de datos la primera vez que este worker ve
+    un (proceso, sensor) y cada vez que otro worker abre o cierra uno, para poder
+    cerrar los que abrió otro y no volver a cerrar los que otro ya cerró.
+    """
+    version = _version(sensor_id).leer()
+    clave = (proceso_id, sensor_id)
+    if detector.conoce(proceso_id, sensor_id) and _sincronizado.get(clave) == version:
+        return
+    abiertos = {
+        a.tipo: EventoAbierto(a.regla, a.valor_inicio, a.valor_minimo, a.valor_maximo, a.lecturas)
+        for a in _consulta_abiertas(proceso_id, sensor_id)
+    }
+    detector.sincronizar_abiertos(proceso_id, sensor_id, abiertos)
+    _sincronizado[clave] = version
+
+
+def _guardar_transiciones(proceso_id, transiciones):
+    """
+    Abre o cierra las filas de alertas de cada transición y difunde el evento.
+    Retorna las transiciones aplicadas (sin las que ya aplicó otro worker).
+    """
+    aplicadas = []
+    for t in transiciones:
+        alerta = _consulta_abiertas(proceso_id, t.sensor_id, t.tipo).first()
+        if t.evento == "inicio":
+            if alerta is not None:
+                continue  # Ya la abrió otro worker.
+            alerta = Alerta(
+                proceso_id=proceso_id, sensor_id=t.sensor_id, tipo=t.tipo, regla=t.regla,
+                inicio=t.fecha_hora, valor_inicio=t.valor,
+                valor_minimo=t.minimo, valor_maximo=t.maximo, lecturas=t.lecturas
+            )
+            db.session.add(alerta)
+        else:
+            if alerta is None:
+                continue  # Ya la cerró otro worker.
+            if t.fecha_hora < alerta.inicio:
+                # Otro worker la abrió con una lectura posterior: sigue abierta, y este
+                # worker la retoma de la base de datos en su próxima evaluación.
+                _sincronizado.pop((proceso_id, t.sensor_id), None)
+                continue
+            alerta.fin = t.fecha_hora
+            alerta.valor_minimo = min(alerta.valor_minimo, t.minimo)
+            alerta.valor_maximo = max(alerta.valor_maximo, t.maximo)
+            alerta.lecturas = max(alerta.lecturas, t.lecturas)
+        aplicadas.append(t)
+    db.session.commit()
+    # Los demás workers releen los eventos abiertos de estos sensores.
+    for sensor_id in {t.sensor_id for t in aplicadas}:
+        _version(sensor_id).publicar()
+    for t in aplicadas:
+        publicar_evento("alerta", {
+            "evento": t.evento,
+            "proceso_id": proceso_id,
+            "sensor_id": t.sensor_id,
+            "tipo": t.tipo,
+            "regla": t.regla,
+            "valor": t.valor,
+            "fecha_hora": t.fecha_hora.isoformat(),
+        }, sensor_id=t.sensor_id)
+    return aplicadas
+
+
+def evaluar_lecturas(proceso_id, lecturas):
+    """
+    Pasa lecturas ya confirmadas por el detector en línea y persiste los eventos.
+    lecturas: iterable de (sensor_id, fecha_hora, valor); se evalúan en orden de fecha.
+    Un error al guardar alertas se registra sin afectar a las lecturas ya guardadas.
+    """
+    lecturas = sorted(lecturas, key=lambda l: l[1])
+    try:
+        for sensor_id in {l[0] for l in lecturas}:
+            _sincronizar_estado(proceso_id, sensor_id)
+        transiciones = []
+        for sensor_id, fecha_hora, valor in lecturas:
+            t = (fecha_hora - _EPOCA).total_seconds()
+            transiciones += detector.evaluar(proceso_id, sensor_id, float(valor), t, fecha_hora)
+        if transiciones:
+            transiciones = _guardar_transiciones(proceso_id, transiciones)
+        return transiciones
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Error en la detección de anomalías (Proceso: {proceso_id}): {e}")
+        return []
+
+
+def cerrar_alertas_proceso(proceso_id, fecha_fin):
+    """Cierra los eventos abiertos de un proceso que terminó y libera su estado."""
+    detector.descartar_proceso(proceso_id)
+    try:
+        Alerta.query.filter(Alerta.proceso_id == proceso_id, Alerta.fin.is_(None)).update(
+            {"fin": fecha_fin}, synchronize_session=False
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise RuntimeError(f"Error al cerrar alertas del proceso {proceso_id}: {e}")
+
+
+def obtener_alertas(proceso_id, abiertas=False, limite=LIMITE_ALERTAS_DEFECTO):
+    """
+    Alertas de un proceso, de la más reciente a la más antigua.
+    Lanza LookupError si el proceso no existe.
+    """
+    if not ProcesoBiodigestor.query.get(proceso_id):
+        raise LookupError(f"No existe el proceso {proceso_id}.")
+    consulta = Alerta.query.filter(Alerta.proceso_id == proceso_id)
+    if abiertas:
+        consulta = consulta.filter(Alerta.fin.is_(None))
+    return consulta.order_by(Alerta.inicio.desc(), Alerta.id.desc()).limit(limite).all()
@@ -0,0 +1,129 @@
+import math
+import numpy as np
+
+# Compresión por defecto: ~100 centroides, error de cuantiles típico < 1% en las colas.
+COMPRESION_DEFECTO = 100
+
+
+class TDigest:
+    """
+    t-digest de fusión (Dunning): resumen acotado y combinable para estimar cuantiles.
+    - Los valores nuevos se acumulan en un buffer y se comprimen en centroides por lotes.
+    - Dos digests se combinan con fusionar(), así cada worker puede resumir sus
+      lecturas por separado y el resultado se une en la base de datos.
+    - La escala k1 (arcoseno) deja centroides pequeños en los extremos, que es donde
+      importan p95/p99.
+    """
+
+    def __init__(self, compresion=COMPRESION_DEFECTO):
+        self.compresion = compresion
+        self.medias = np.empty(0)
+        self.pesos = np.empty(0)
+        self.minimo = math.inf
+        self.maximo = -math.inf
+        self._buffer = []
+        self._capacidad_buffer = 5 * compresion
+
+    @property
+    def total(self):
+        return float(self.pesos.sum()) + len(self._buffer)
+
+    def agregar(self, valor):
+        self._buffer.append(float(valor))
+        if len(self._buffer) >= self._capacidad_buffer:
+            self._comprimir()
+
+    def agregar_lote(self, valores):
+        valores = np.asarray(valores, dtype=np.float64)
+        if len(self._buffer) + valores.size < self._capacidad_buffer:
+            self._buffer.extend(valores.tolist())
+        elif valores.size:
+            self._comprimir(valores, np.ones(valores.size))
+
+    def fusionar(self, otro):
+        """Incorpora los datos de otro digest."""
+        otro._comprimir()
+        if otro.medias.size:
+            self._comprimir(otro.medias, otro.pesos)
+            self.minimo = min(self.minimo, otro.minimo)
+            self.maximo = max(self.maximo, otro.maximo)
+
+    def _escala(self, q):
+        return self.compresion / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _escala_inversa(self, k):
+        return (math.sin(2 * math.pi * k / self.compresion) + 1) / 2
+
+    def _comprimir(self, medias=None, pesos=None):
+        partes_m, partes_w = [self.medias], [self.pesos]
+        if self._buffer:
+            partes_m.append(np.array(self._buffer))
+            partes_w.append(np.ones(len(self._buffer)))
+            self._buffer = []
+        if medias is not None:
+            partes_m.append(np.asarray(medias, dtype=np.float64))
+            partes_w.append(np.asarray(pesos, dtype=np.float64))
+        todas_m = np.concatenate(partes_m)
+        if todas_m.size == self.medias.size:
+            return
+        todas_w = np.concatenate(partes_w)
+        self.minimo = min(self.minimo, float(todas_m.min()))
+        self.maximo = max(self.maximo, float(todas_m.max()))
+
+        orden = np.argsort(todas_m, kind="stable")
+        todas_m, todas_w = todas_m[orden].tolist(), todas_w[orden].tolist()
+        total = sum(todas_w)
+
+        nuevas_m, nuevas_w = [], []
+        actual_m, actual_w = todas_m[0], todas_w[0]
+        q0 = 0.0
+        limite = self._escala_inversa(self._escala(q0) + 1)
+        for media, peso in zip(todas_m[1:], todas_w[1:]):
+            if q0 + (actual_w + peso) / total <= limite:
+                actual_w += peso
+                actual_m += (media - actual_m) * peso / actual_w
+            else:
+                nuevas_m.append(actual_m)
+                nuevas_w.append(actual_w)
+                q0 += actual_w / total
+                limite = self._escala_inversa(self._escala(q0) + 1)
+                actual_m, actual_w = media, peso
+        nuevas_m.append(actual_m)
+        nuevas_w.append(actual_w)
+        self.medias, self.pesos = np.array(nuevas_m), np.array(nuevas_w)
+
+    def cuantil(self, q):
+        """Estimación del cuantil q (0..1), o None si el digest está vacío."""
+        self._comprimir()
+        if not self.medias.size:
+            return None
+        if self.medias.size == 1:
+            return float(self.medias[0])
+        total = self.pesos.sum()
+        objetivo = q * total
+        # Cada centroide representa la masa centrada en su media.
+        centros = np.cumsum(self.pesos) - self.pesos / 2
+        if objetivo <= centros[0]:
+            return float(np.interp(objetivo, [0, centros[0]], [self.minimo, self.medias[0]]))
+        if objetivo >= centros[-1]:
+            return float(np.interp(objetivo, [centros[-1], total], [self.medias[-1], self.maximo]))
+        return float(np.interp(objetivo, centros, self.medias))
+
+    def to_dict(self):
+        self._comprimir()
+        return {
+            "compresion": self.compresion,
+            "medias": self.medias.tolist(),
+            "pesos": self.pesos.tolist(),
+            "min": self.minimo if self.medias.size else None,
+            "max": self.maximo if self.medias.size else None,
+        }
+
+    @classmethod
+    def from_dict(cls, datos):
+        digest = cls(datos.get("compresion", COMPRESION_DEFECTO))
+        digest.medias = np.array(datos.get("medias", []), dtype=np.float64)
+        digest.pesos = np.array(datos.get("pesos", []), dtype=np.float64)
+        if digest.medias.size:
+            digest.minimo, digest.maximo = datos["min"], datos["max"]
+        return digest
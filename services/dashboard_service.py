@@ -0,0 +1,190 @@
+"""
+Datos de arranque del dashboard móvil en una sola respuesta (GET /api/dashboard).
+
+Cada sección se arma desde su propia caché y tiene su propia versión:
+- sensores, graficas, voz: RecursoVersionado de su tabla (consulta solo si la tabla cambió).
+- proceso: caché compartida del proceso activo.
+- lecturas: buffers en memoria; los fríos se rehidratan juntos en una sola consulta.
+- prediccion: caché de predicciones, con la misma clave que GET /api/analizar.
+Con todo en caché la respuesta no consulta la base de datos.
+"""
+import hashlib
+from datetime import datetime
+from database.buffer_lecturas import buffer_lecturas
+from database.db_service import SENSOR_IDS
+from database.models.voice_config import VoiceConfig
+from database.proceso_estado import obtener_proceso_activo
+from database.recursos_versionados import obtener_recurso, SENSORES, GRAFICAS, VOZ
+from ml import registro
+from services.ai_service import cargador_modelos, predecir_ultimas_lecturas
+from services.graph_service import obtener_todas_configs, config_to_dict
+from services.sensor_service import obtener_sensores, sensor_to_dict
+
+SECCIONES = ("sensores", "graficas", "voz", "proceso", "lecturas", "prediccion")
+# Lecturas por sensor, como GET /api/lecturas/<sensor_id>.
+LECTURAS_POR_SENSOR = 20
+# Clave bajo la que cada RecursoVersionado guarda su sección del dashboard.
+CLAVE_DASHBOARD = "dashboard"
+
+
+def _seccion_versionada(tabla, construir):
+    recurso = obtener_recurso(tabla)
+    version = recurso.version()
+    datos = recurso.obtener(CLAVE_DASHBOARD, version)
+    if datos is None:
+        datos = construir()
+        recurso.guardar(CLAVE_DASHBOARD, version, datos)
+    return datos
+
+
+def _sensores():
+    return [sensor_to_dict(s) for s in obtener_sensores()]
+
+
+def _graficas():
+    return [config_to_dict(c) for c in obtener_todas_configs()]
+
+
+def _voz():
+    config = VoiceConfig.query.get(1) or VoiceConfig()
+    return config.to_dict()
+
+
+def _dia_proceso(proceso, ahora=None):
+    """Día en curso del proceso (1 el día en que inició)."""
+    ahora = ahora or datetime.now()
+    return max((ahora - proceso.fecha_inicio).days + 1, 1)
+
+
+def _sensor_ids():
+    """Sensores del catálogo (desde la caché de la sección sensores)."""
+    return [s["id"] for s in _seccion_versionada(SENSORES, _sensores)]
+
+
+def _version_seccion(seccion, proceso, lecturas_por_sensor):
+    """Versión barata (sin consultar la BD) del contenido de una sección."""
+    if seccion == "sensores":
+        return obtener_recurso(SENSORES).version()
+    if seccion == "graficas":
+        return obtener_recurso(GRAFICAS).version()
+    if seccion == "voz":
+        return obtener_recurso(VOZ).version()
+    if seccion == "proceso":
+        return f"{proceso.id}:{_dia_proceso(proceso)}" if proceso else "sin-proceso"
+    # lecturas y prediccion cambian con cada escritura de sus sensores en el proceso activo.
+    if proceso is None:
+        return "sin-proceso"
+    if seccion == "lecturas":
+        escrituras = ",".join(buffer_lecturas.version(sensor_id) for sensor_id in _sensor_ids())
+        return f"{proceso.id}:{obtener_recurso(SENSORES).version()}:{lecturas_por_sensor}:{escrituras}"
+    escrituras = ",".join(buffer_lecturas.version(sensor_id) for sensor_id in SENSOR_IDS.values())
+    estado_modelos = cargador_modelos.estado()["estado"]
+    return f"{proceso.id}:{estado_modelos}:{registro.version_activa()}:{escrituras}"
+
+
+def _validar(secciones, lecturas_por_sensor):
+    desconocidas = [s for s in secciones if s not in SECCIONES]
+    if desconocidas:
+        raise ValueError(f"Secciones desconocidas: {', '.join(desconocidas)}. Válidas: {', '.join(SECCIONES)}")
+    if not 1 <= lecturas_por_sensor <= buffer_lecturas.capacidad:
+        raise ValueError(f"lecturas debe ser un entero entre 1 y {buffer_lecturas.capacidad}")
+
+
+def version_dashboard(secciones, lecturas_por_sensor=LECTURAS_POR_SENSOR):
+    """
+    Versión de cada sección pedida (hash corto) y ETag del conjunto; con las secciones
+    en caché no consulta la base de datos.
+    Retorna (versiones, etag). Lanza ValueError si los parámetros no son válidos.
+    """
+    _validar(secciones, lecturas_por_sensor)
+    proceso = obtener_proceso_activo()
+    versiones = {
+        s: hashlib.sha1(_version_seccion(s, proceso, lecturas_por_sensor).encode()).hexdigest()[:16]
+        for s in secciones
+    }
+    resumen = "|".join(f"{s}={versiones[s]}" for s in secciones)
+    return versiones, "dashboard-" + hashlib.sha1(resumen.encode()).hexdigest()
+
+
+def _proceso(proceso):
+    if proceso is None:
+        return {"activo": False}
+    return {
+        "activo": True,
+        "id": proceso.id,
+        "fecha_inicio": proceso.fecha_inicio.isoformat(),
+        "dia_proceso": _dia_proceso(proceso),
+    }
+
+
+def _lecturas(proceso, sensor_ids, lecturas_por_sensor):
+    if proceso is None:
+        return {str(sensor_id): [] for sensor_id in sensor_ids}
+    ultimas = buffer_lecturas.obtener_varios(proceso.id, sensor_ids, lecturas_por_sensor)
+    return {
+        str(sensor_id): [
+            {
+                "id": l.id,
+                "sensor_id": l.sensor_id,
+                "valor": l.valor,
+                "fecha_hora": l.fecha_hora.isoformat(),
+                "observaciones": l.observaciones,
+            }
+            for l in lecturas
+        ]
+        for sensor_id, lecturas in ultimas.items()
+    }
+
+
+def _prediccion(proceso):
+    """
+    Última predicción del proceso activo. No bloquea si los modelos se están cargando
+    y nunca hace fallar al resto del dashboard.
+    """
+    if proceso is None:
+        return {"estado": "sin_proceso"}
+    ultimas = buffer_lecturas.obtener_varios(proceso.id, SENSOR_IDS.values(), 1)
+    if not all(ultimas.values()):
+        return {"estado": "sin_lecturas"}
+    ultimas = {nombre: ultimas[sensor_id][0] for nombre, sensor_id in SENSOR_IDS.items()}
+    if not cargador_modelos.listos():
+        if cargador_modelos.estado()["estado"] != "error":
+            cargador_modelos.iniciar()
+            return {"estado": "cargando"}
+        return {"estado": "error", "detalle": str(cargador_modelos.error)}
+    try:
+        resultado, desde_cache, edad = predecir_ultimas_lecturas(
+            proceso.id, ultimas["temperatura"], ultimas["presion"], ultimas["gas"]
+        )
+    except Exception as e:
+        print(f"❌ Error al calcular la predicción del dashboard: {e}")
+        return {"estado": "error", "detalle": str(e)}
+    return {
+        "estado": "listo",
+        **resultado,
+        "cache": {"hit": desde_cache, "edad_segundos": round(edad, 3)},
+    }
+
+
+def construir_dashboard(secciones=SECCIONES, lecturas_por_sensor=LECTURAS_POR_SENSOR):
+    """
+    Arma las secciones pedidas del dashboard.
+    Lanza ValueError si se pide una sección desconocida o un límite fuera de rango.
+    """
+    _validar(secciones, lecturas_por_sensor)
+
+    proceso = obtener_proceso_activo()
+    datos = {}
+    if "sensores" in secciones:
+        datos["sensores"] = _seccion_versionada(SENSORES, _sensores)
+    if "graficas" in secciones:
+        datos["graficas"] = _seccion_versionada(GRAFICAS, _graficas)
+    if "voz" in secciones:
+        datos["voz"] = _seccion_versionada(VOZ, _voz)
+    if "proceso" in secciones:
+        datos["proceso"] = _proceso(proceso)
+    if "lecturas" in secciones:
+        datos["lecturas"] = _lecturas(proceso, _sensor_ids(), lecturas_por_sensor)
+    if "prediccion" in secciones:
+        datos["prediccion"] = _prediccion(proceso)
+    return datos
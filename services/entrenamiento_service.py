@@ -0,0 +1,61 @@
+import numpy as np
+from sqlalchemy import select
+from database.connection import db
+from database.models.prediccion import Prediccion
+from database.models.proceso_biodigestor import ProcesoBiodigestor
+from services.series_service import TAMANO_LOTE_SERIES, iterar_filas_alineadas
+
+
+def _etiquetas_rango(proceso_id, desde, hasta):
+    """Etiquetas (fecha, alerta, tipo) de la tabla predicciones entre dos instantes, en orden."""
+    filas = db.session.execute(
+        select(Prediccion.fecha_hora, Prediccion.alerta_ia, Prediccion.tipo_alerta)
+        .where(
+            Prediccion.proceso_id == proceso_id,
+            Prediccion.fecha_hora >= desde,
+            Prediccion.fecha_hora <= hasta,
+        )
+        .order_by(Prediccion.fecha_hora, Prediccion.id)
+    ).all()
+    if not filas:
+        return None
+    fechas, alertas, tipos = zip(*filas)
+    return (
+        np.array(fechas, dtype="datetime64[us]"),
+        np.array(alertas, dtype=np.int8),
+        np.array(tipos, dtype=object),
+    )
+
+
+def iterar_datos_entrenamiento(proceso_ids=None, tamano_lote=TAMANO_LOTE_SERIES):
+    """
+    Genera bloques (features float32 Nx4, alerta, tipo) a partir de lecturas y procesos.
+    - Las tres series se alinean en el tiempo y dia_proceso se calcula de forma vectorizada.
+    - Cada fila se etiqueta con la predicción registrada para el mismo instante en la
+      tabla predicciones; las filas sin etiqueta se descartan. Son etiquetas generadas
+      por el modelo, no observadas: un modelo entrenado con ellas solo aprende a imitarlo.
+    Se lee por bloques paginados, así la memoria no depende de la cantidad de lecturas.
+    """
+    consulta = db.session.query(ProcesoBiodigestor.id, ProcesoBiodigestor.fecha_inicio)
+    if proceso_ids:
+        consulta = consulta.filter(ProcesoBiodigestor.id.in_(proceso_ids))
+
+    for proceso_id, fecha_inicio in consulta.order_by(ProcesoBiodigestor.id).all():
+        # Paginado: entre bloques se consultan las etiquetas en la misma conexión.
+        bloques = iterar_filas_alineadas(proceso_id, fecha_inicio, tamano_lote=tamano_lote, paginado=True)
+        for fechas, matriz, dias in bloques:
+            etiquetas = _etiquetas_rango(
+                proceso_id, fechas[0].astype(object), fechas[-1].astype(object)
+            )
+            if etiquetas is None:
+                continue
+            fechas_etiqueta, alertas, tipos = etiquetas
+            # Última etiqueta con fecha <= a la de cada fila; vale solo si la fecha coincide.
+            posiciones = np.searchsorted(fechas_etiqueta, fechas, side="right") - 1
+            validas = posiciones >= 0
+            validas[validas] = fechas_etiqueta[posiciones[validas]] == fechas[validas]
+            if not validas.any():
+                continue
+            posiciones = posiciones[validas]
+            features = np.column_stack((matriz[validas], dias[validas])).astype(np.float32)
+            yield features, alertas[posiciones], tipos[posiciones]
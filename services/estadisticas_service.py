@@ -0,0 +1,334 @@
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from types import SimpleNamespace
+import numpy as np
+from sqlalchemy import insert
+from database.connection import db
+from database.db_service import SENSOR_IDS
+from database.models.estadistica_sensor import EstadisticaSensor
+from database.models.lectura import Lectura
+from database.models.proceso_biodigestor import ProcesoBiodigestor
+from services.cuantiles import TDigest
+
+# Segundos entre cada volcado a la base de datos de lo acumulado en memoria por este worker.
+INTERVALO_VOLCADO = float(os.environ.get("ESTADISTICAS_INTERVALO", "10"))
+CUANTILES = {"p50": 0.50, "p95": 0.95, "p99": 0.99}
+
+_NOMBRES_SENSOR = {sensor_id: nombre for nombre, sensor_id in SENSOR_IDS.items()}
+
+
+class Acumulador:
+    """
+    Estadísticas de un conjunto de valores que se pueden combinar entre sí:
+    cantidad, media y m2 (Welford), mínimo, máximo y un t-digest para los cuantiles.
+    """
+
+    def __init__(self):
+        self.cantidad = 0
+        self.media = 0.0
+        self.m2 = 0.0
+        self.minimo = math.inf
+        self.maximo = -math.inf
+        self.digest = TDigest()
+
+    def _combinar(self, cantidad, media, m2, minimo, maximo):
+        # Actualización paralela de Welford (Chan et al.): exacta para cualquier partición.
+        total = self.cantidad + cantidad
+        delta = media - self.media
+        self.media += delta * cantidad / total
+        self.m2 += m2 + delta * delta * self.cantidad * cantidad / total
+        self.cantidad = total
+        self.minimo = min(self.minimo, minimo)
+        self.maximo = max(self.maximo, maximo)
+
+    def agregar(self, valores):
+        valores = np.asarray(valores, dtype=np.float64)
+        if not valores.size:
+            return
+        media = float(valores.mean())
+        self._combinar(
+            valores.size, media, float(((valores - media) ** 2).sum()),
+            float(valores.min()), float(valores.max())
+        )
+        self.digest.agregar_lote(valores)
+
+    def fusionar(self, otro):
+        if not otro.cantidad:
+            return
+        self._combinar(otro.cantidad, otro.media, otro.m2, otro.minimo, otro.maximo)
+        self.digest.fusionar(otro.digest)
+
+    def copia(self):
+        nuevo = Acumulador()
+        nuevo.fusionar(self)
+        return nuevo
+
+    @classmethod
+    def desde_fila(cls, fila):
+        acumulador = cls()
+        if fila.cantidad:
+            acumulador.cantidad = fila.cantidad
+            acumulador.media = fila.media
+            acumulador.m2 = fila.m2
+            acumulador.minimo = fila.minimo
+            acumulador.maximo = fila.maximo
+            if fila.digest:
+                acumulador.digest = TDigest.from_dict(json.loads(fila.digest))
+        return acumulador
+
+    def volcar_en_fila(self, fila):
+        fila.cantidad = self.cantidad
+        fila.media = self.media
+        fila.m2 = self.m2
+        fila.minimo = self.minimo if self.cantidad else None
+        fila.maximo = self.maximo if self.cantidad else None
+        fila.digest = json.dumps(self.digest.to_dict())
+
+    def resumen(self):
+        if not self.cantidad:
+            return {"count": 0, "mean": None, "variance": None, "std": None,
+                    "min": None, "max": None, **{nombre: None for nombre in CUANTILES}}
+        # Varianza muestral; con una sola lectura es 0.
+        varianza = self.m2 / (self.cantidad - 1) if self.cantidad > 1 else 0.0
+        return {
+            "count": self.cantidad,
+            "mean": self.media,
+            "variance": varianza,
+            "std": math.sqrt(varianza),
+            "min": self.minimo,
+            "max": self.maximo,
+            **{nombre: self.digest.cuantil(q) for nombre, q in CUANTILES.items()},
+        }
+
+
+class EstadisticasPendientes:
+    """
+    Aportes de este worker a las estadísticas de cada (proceso, sensor) que todavía
+    no se volcaron a la base de datos. Cada worker acumula los suyos y los combina
+    con la fila persistida en cada volcado.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pendientes = {}  # (proceso_id, sensor_id) -> Acumulador
+
+    def registrar(self, proceso_id, sensor_id, valores):
+        with self._lock:
+            acumulador = self._pendientes.get((proceso_id, sensor_id))
+            if acumulador is None:
+                acumulador = self._pendientes[(proceso_id, sensor_id)] = Acumulador()
+            acumulador.agregar(valores)
+
+    def extraer(self, proceso_id=None):
+        """Quita y retorna los pendientes (de un proceso o de todos)."""
+        with self._lock:
+            claves = [c for c in self._pendientes if proceso_id is None or c[0] == proceso_id]
+            return {clave: self._pendientes.pop(clave) for clave in claves}
+
+    def devolver(self, pendientes):
+        """Reincorpora pendientes que no se pudieron volcar, para el próximo intento."""
+        with self._lock:
+            for clave, acumulador in pendientes.items():
+                actual = self._pendientes.get(clave)
+                if actual is None:
+                    self._pendientes[clave] = acumulador
+                else:
+                    acumulador.fusionar(actual)
+                    self._pendientes[clave] = acumulador
+
+    def copia(self, proceso_id):
+        """Copia de los pendientes de un proceso por sensor (sin quitarlos)."""
+        with self._lock:
+            return {
+                sensor_id: acumulador.copia()
+                for (pid, sensor_id), acumulador in self._pendientes.items() if pid == proceso_id
+            }
+
+
+estadisticas_pendientes = EstadisticasPendientes()
+
+
+def acumular_estadisticas(proceso_id, lecturas):
+    """
+    Suma lecturas ya confirmadas a los pendientes de este worker.
+    lecturas: iterable de (sensor_id, valor).
+    """
+    por_sensor = {}
+    for sensor_id, valor in lecturas:
+        # Mismo tipo de clave que la columna sensor_id, para combinarse con su fila.
+        por_sensor.setdefault(int(sensor_id), []).append(valor)
+    for sensor_id, valores in por_sensor.items():
+        estadisticas_pendientes.registrar(proceso_id, sensor_id, valores)
+
+
+def guardar_pendientes(proceso_id=None):
+    """
+    Combina los pendientes de este worker con las filas persistidas.
+    Las filas de cada proceso se bloquean juntas (un solo SELECT ... FOR UPDATE, en orden
+    de sensor) mientras se combinan, para que los volcados de otros workers no se pisen.
+    Las filas congeladas no cambian: sus pendientes se descartan con un aviso.
+    Si algo falla después de extraerlos, los pendientes se devuelven.
+    Retorna la cantidad de (proceso, sensor) actualizados.
+    """
+    pendientes = estadisticas_pendientes.extraer(proceso_id)
+    if not pendientes:
+        return 0
+    nuevas = []  # filas que todavía no existen: se insertan juntas en una sola sentencia
+    descartados = []  # (proceso, sensor) cuyas estadísticas ya son definitivas
+    try:
+        por_proceso = {}
+        for (pid, sensor_id), acumulador in sorted(pendientes.items()):
+            por_proceso.setdefault(pid, {})[sensor_id] = acumulador
+        for pid, acumuladores in por_proceso.items():
+            filas = {
+                f.sensor_id: f
+                for f in EstadisticaSensor.query
+                .filter(EstadisticaSensor.proceso_id == pid,
+                        EstadisticaSensor.sensor_id.in_(list(acumuladores)))
+                .order_by(EstadisticaSensor.sensor_id)
+                .with_for_update()
+            }
+            for sensor_id, acumulador in acumuladores.items():
+                fila = filas.get(sensor_id)
+                if fila is not None and fila.congelado:
+                    descartados.append((pid, sensor_id))
+                    continue
+                if fila is None:
+                    fila = SimpleNamespace(proceso_id=pid, sensor_id=sensor_id)
+                    nuevas.append(fila)
+                    total = Acumulador()
+                else:
+                    total = Acumulador.desde_fila(fila)
+                total.fusionar(acumulador)
+                total.volcar_en_fila(fila)
+        if nuevas:
+            db.session.execute(insert(EstadisticaSensor), [vars(fila) for fila in nuevas])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        estadisticas_pendientes.devolver(pendientes)
+        raise RuntimeError(f"Error al guardar estadísticas: {e}")
+    if descartados:
+        print(f"❌ Estadísticas pendientes descartadas por estar congeladas (proceso, sensor): {descartados}. "
+              "Use `flask estadisticas recalcular` para reconstruirlas desde las lecturas.")
+    return len(pendientes) - len(descartados)
+
+
+def congelar_estadisticas(proceso_id):
+    """
+    Marca como definitivas las estadísticas de un proceso que terminó, reconstruidas desde
+    la tabla lecturas: incluyen también lo que otros workers todavía no volcaron (sus
+    pendientes se descartan en su próximo volcado, al encontrar las filas congeladas).
+    Retorna la cantidad de lecturas procesadas.
+    """
+    return recalcular_estadisticas(proceso_id)
+
+
+def obtener_estadisticas(proceso_id):
+    """
+    Estadísticas por sensor de un proceso: una fila por sensor, sin recorrer lecturas.
+    Incluye lo que este worker aún no volcó. Lanza LookupError si el proceso no existe.
+    """
+    proceso = ProcesoBiodigestor.query.get(proceso_id)
+    if not proceso:
+        raise LookupError(f"No existe el proceso {proceso_id}.")
+
+    filas = {f.sensor_id: f for f in EstadisticaSensor.query.filter_by(proceso_id=proceso_id)}
+    acumuladores = {sensor_id: Acumulador.desde_fila(fila) for sensor_id, fila in filas.items()}
+    for sensor_id, pendiente in estadisticas_pendientes.copia(proceso_id).items():
+        acumuladores.setdefault(sensor_id, Acumulador()).fusionar(pendiente)
+
+    return {
+        "proceso_id": proceso.id,
+        "estado": proceso.estado,
+        "congelado": bool(filas) and all(f.congelado for f in filas.values()),
+        "sensores": [
+            {
+                "sensor_id": sensor_id,
+                "sensor": _NOMBRES_SENSOR.get(sensor_id),
+                **acumuladores[sensor_id].resumen(),
+            }
+            for sensor_id in sorted(acumuladores)
+        ],
+    }
+
+
+def recalcular_estadisticas(proceso_id, tamano_lote=10000):
+    """
+    Reconstruye las estadísticas de un proceso a partir de la tabla lecturas
+    (paginación por id). Retorna la cantidad de lecturas procesadas.
+    Pensado para procesos finalizados: con el proceso activo, los pendientes de
+    otros workers se sumarían dos veces.
+    Lanza LookupError si el proceso no existe.
+    """
+    proceso = db.session.get(ProcesoBiodigestor, proceso_id)
+    if not proceso:
+        raise LookupError(f"No existe el proceso {proceso_id}.")
+    # Lo pendiente de este worker ya está confirmado en lecturas: se cuenta al recorrerlas.
+    estadisticas_pendientes.extraer(proceso_id)
+    try:
+        acumuladores, ultimo_id, procesadas = {}, 0, 0
+        while True:
+            lote = (
+                db.session.query(Lectura.id, Lectura.sensor_id, Lectura.valor)
+                .filter(Lectura.proceso_id == proceso_id, Lectura.id > ultimo_id)
+                .order_by(Lectura.id)
+                .limit(tamano_lote)
+                .all()
+            )
+            if not lote:
+                break
+            ids, sensores, valores = (np.array(c) for c in zip(*lote))
+            valores = valores.astype(np.float64)
+            for sensor_id in np.unique(sensores):
+                acumuladores.setdefault(int(sensor_id), Acumulador()).agregar(valores[sensores == sensor_id])
+            ultimo_id = int(ids[-1])
+            procesadas += len(lote)
+            if len(lote) < tamano_lote:
+                break
+
+        EstadisticaSensor.query.filter_by(proceso_id=proceso_id).delete()
+        filas = []
+        for sensor_id, acumulador in acumuladores.items():
+            fila = SimpleNamespace(
+                proceso_id=proceso_id, sensor_id=sensor_id,
+                congelado=proceso.estado == "FINALIZADO"
+            )
+            acumulador.volcar_en_fila(fila)
+            filas.append(vars(fila))
+        if filas:
+            db.session.execute(insert(EstadisticaSensor), filas)
+        db.session.commit()
+        return procesadas
+    except Exception as e:
+        db.session.rollback()
+        raise RuntimeError(f"Error al recalcular estadísticas del proceso {proceso_id}: {e}")
+
+
+def iniciar_volcado_estadisticas(app, intervalo=INTERVALO_VOLCADO):
+    """
+    Vuelca periódicamente en segundo plano las estadísticas pendientes de este worker,
+    y una última vez al terminar el proceso.
+    """
+    def _volcar():
+        with app.app_context():
+            try:
+                guardar_pendientes()
+            except Exception as e:
+                print(f"❌ {e}")
+            finally:
+                db.session.remove()
+
+    def _ciclo():
+        while True:
+            time.sleep(intervalo)
+            _volcar()
+
+    atexit.register(_volcar)
+    hilo = threading.Thread(target=_ciclo, name="volcado-estadisticas", daemon=True)
+    hilo.start()
+    return hilo
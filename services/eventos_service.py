@@ -0,0 +1,262 @@
+import atexit
+import itertools
+import json
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque, namedtuple
+from database.version_compartida import DIRECTORIO_ESTADO, proceso_vivo
+
+Evento = namedtuple("Evento", ["id", "tipo", "datos", "sensor_id"])
+
+TIPOS_EVENTO = ("lectura", "proceso", "prediccion", "alerta")
+# Eventos que se guardan por cliente antes de descartar los más antiguos.
+CAPACIDAD_COLA_CLIENTE = int(os.environ.get("SSE_CAPACIDAD_COLA", "256"))
+# Cada cliente SSE ocupa un hilo del worker mientras está conectado: el máximo de
+# suscriptores es una fracción de los hilos (gunicorn --threads) y deja siempre al
+# menos uno libre para el resto de las solicitudes.
+HILOS_WORKER = int(os.environ.get("GUNICORN_THREADS", "8"))
+FRACCION_HILOS_SSE = float(os.environ.get("SSE_FRACCION_HILOS", "0.5"))
+MAX_SUSCRIPTORES = max(min(int(HILOS_WORKER * FRACCION_HILOS_SSE), HILOS_WORKER - 1), 0)
+
+# Relevo de eventos entre workers a través del directorio de estado compartido.
+RELEVO_ACTIVO = os.environ.get("SSE_RELEVO", "1") == "1"
+DIRECTORIO_EVENTOS = os.path.join(DIRECTORIO_ESTADO, "eventos")
+INTERVALO_RELEVO = float(os.environ.get("SSE_RELEVO_INTERVALO", "0.2"))
+TAMANO_SEGMENTO_EVENTOS = 4 * 1024 * 1024
+# Eventos retenidos en memoria si el hilo del relevo se atrasa.
+MAX_PENDIENTES_RELEVO = 10000
+
+_PATRON_SEGMENTO = re.compile(r"^eventos-(?P<origen>(?P<pid>\d+)_[0-9a-f]+)-(?P<segmento>\d+)\.jsonl$")
+
+
+class Suscripcion:
+    """Cola de eventos de un cliente con sus filtros de tipo y sensor."""
+
+    def __init__(self, tipos=None, sensores=None, capacidad=CAPACIDAD_COLA_CLIENTE):
+        self.tipos = set(tipos) if tipos else None
+        self.sensores = set(sensores) if sensores else None
+        self.cola = queue.Queue(maxsize=capacidad)
+        self.descartados = 0
+
+    def acepta(self, evento):
+        if self.tipos is not None and evento.tipo not in self.tipos:
+            return False
+        # Los filtros de sensor solo aplican a eventos asociados a un sensor.
+        if self.sensores is not None and evento.sensor_id is not None:
+            return evento.sensor_id in self.sensores
+        return True
+
+    def entregar(self, evento):
+        """Encola sin bloquear; si el cliente va atrasado se descarta su evento más antiguo."""
+        while True:
+            try:
+                self.cola.put_nowait(evento)
+                return
+            except queue.Full:
+                try:
+                    self.cola.get_nowait()
+                    self.descartados += 1
+                except queue.Empty:
+                    pass
+
+
+class BusEventos:
+    """
+    Pub/sub en memoria del proceso, seguro entre hilos (workers gthread de gunicorn).
+    Los publicadores nunca se bloquean: cada suscriptor tiene su propia cola acotada.
+    Con el relevo activo, los eventos de este worker también se anotan para los demás
+    y los de los demás se entregan a los suscriptores locales (ver RelevoEventos).
+    """
+
+    def __init__(self, max_suscriptores=MAX_SUSCRIPTORES):
+        self.max_suscriptores = max_suscriptores
+        self.relevo = None
+        self._suscriptores = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def suscribir(self, tipos=None, sensores=None):
+        """Registra un cliente. Retorna None si se alcanzó el máximo de suscriptores."""
+        suscripcion = Suscripcion(tipos, sensores)
+        with self._lock:
+            if len(self._suscriptores) >= self.max_suscriptores:
+                return None
+            self._suscriptores.add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion):
+        with self._lock:
+            self._suscriptores.discard(suscripcion)
+
+    def publicar(self, tipo, datos, sensor_id=None):
+        """Difunde un evento generado en este worker, aquí y (con relevo) en los demás."""
+        if self.relevo is not None:
+            self.relevo.anotar(tipo, datos, sensor_id)
+        self.entregar(tipo, datos, sensor_id)
+
+    def entregar(self, tipo, datos, sensor_id=None):
+        """Entrega un evento a los suscriptores locales cuyos filtros lo aceptan."""
+        if not self._suscriptores:
+            return
+        evento = Evento(next(self._ids), tipo, datos, sensor_id)
+        with self._lock:
+            destinatarios = [s for s in self._suscriptores if s.acepta(evento)]
+        for suscripcion in destinatarios:
+            suscripcion.entregar(evento)
+
+    @property
+    def cantidad_suscriptores(self):
+        return len(self._suscriptores)
+
+
+class RelevoEventos:
+    """
+    Reenvía los eventos entre los workers de la máquina mediante archivos JSON por línea
+    en DIRECTORIO_EVENTOS, igual que el resto del estado compartido.
+    - publicar solo deja el evento en memoria; el hilo del relevo lo agrega cada
+      INTERVALO_RELEVO segundos al segmento propio del worker, en una sola escritura.
+    - El mismo hilo lee lo que agregaron los otros workers desde la última posición
+      leída y lo entrega a los suscriptores locales: un evento de otro worker llega en a
+      lo sumo dos intervalos.
+    - Los segmentos rotan al superar TAMANO_SEGMENTO_EVENTOS; se conserva el anterior para
+      un lector atrasado y los de workers terminados se borran al arrancar otro.
+    """
+
+    def __init__(self, bus, directorio=DIRECTORIO_EVENTOS, intervalo=INTERVALO_RELEVO):
+        self.bus = bus
+        self.directorio = directorio
+        self.intervalo = intervalo
+        self.origen = f"{os.getpid()}_{time.time_ns():x}"
+        self._lock = threading.Lock()
+        self._pendientes = deque(maxlen=MAX_PENDIENTES_RELEVO)
+        self._segmento = 0
+        self._posiciones = None
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def _ruta_segmento(self, segmento):
+        return os.path.join(self.directorio, f"eventos-{self.origen}-{segmento}.jsonl")
+
+    def anotar(self, tipo, datos, sensor_id):
+        with self._lock:
+            self._pendientes.append((tipo, datos, sensor_id))
+
+    def volcar(self):
+        """Agrega los eventos pendientes de este worker a su segmento."""
+        with self._lock:
+            if not self._pendientes:
+                return
+            eventos, self._pendientes = self._pendientes, deque(maxlen=MAX_PENDIENTES_RELEVO)
+        texto = "".join(
+            json.dumps({"tipo": tipo, "datos": datos, "sensor_id": sensor_id}, default=str) + "\n"
+            for tipo, datos, sensor_id in eventos
+        )
+        ruta = self._ruta_segmento(self._segmento)
+        with open(ruta, "a", encoding="utf-8") as archivo:
+            archivo.write(texto)
+            tamano = archivo.tell()
+        if tamano > TAMANO_SEGMENTO_EVENTOS:
+            self._segmento += 1
+            try:
+                os.remove(self._ruta_segmento(self._segmento - 2))
+            except FileNotFoundError:
+                pass
+
+    def _segmentos_ajenos(self):
+        """Nombres de los segmentos de los otros workers presentes en el directorio."""
+        nombres = []
+        for nombre in os.listdir(self.directorio):
+            coincidencia = _PATRON_SEGMENTO.match(nombre)
+            if coincidencia and coincidencia.group("origen") != self.origen:
+                nombres.append(nombre)
+        return nombres
+
+    def leer(self):
+        """
+        Entrega a los suscriptores locales lo que los otros workers agregaron desde la
+        última lectura. Sin suscriptores solo avanza las posiciones, sin leer el contenido.
+        """
+        posiciones = {}
+        for nombre in self._segmentos_ajenos():
+            ruta = os.path.join(self.directorio, nombre)
+            # Un segmento que aparece después de la primera pasada se lee desde el comienzo.
+            posicion = self._posiciones.get(nombre, 0) if self._posiciones is not None else None
+            try:
+                if posicion is None or not self.bus.cantidad_suscriptores:
+                    posiciones[nombre] = os.path.getsize(ruta)
+                    continue
+                with open(ruta, "rb") as archivo:
+                    archivo.seek(posicion)
+                    bloque = archivo.read()
+            except FileNotFoundError:
+                continue
+            # Solo se consumen líneas completas: el resto se relee en la próxima pasada.
+            completo = bloque[:bloque.rfind(b"\n") + 1]
+            posiciones[nombre] = posicion + len(completo)
+            for linea in completo.splitlines():
+                try:
+                    evento = json.loads(linea)
+                    self.bus.entregar(evento["tipo"], evento["datos"], evento.get("sensor_id"))
+                except (ValueError, KeyError) as e:
+                    print(f"❌ Evento inválido en {nombre}: {e}")
+        self._posiciones = posiciones
+
+    def limpiar_terminados(self):
+        """Borra los segmentos de workers que ya no existen."""
+        for nombre in self._segmentos_ajenos():
+            if not proceso_vivo(int(_PATRON_SEGMENTO.match(nombre).group("pid"))):
+                try:
+                    os.remove(os.path.join(self.directorio, nombre))
+                except FileNotFoundError:
+                    pass
+
+    def _ciclo(self):
+        while not self._detener.wait(self.intervalo):
+            try:
+                self.volcar()
+                self.leer()
+            except OSError as e:
+                print(f"❌ Error en el relevo de eventos: {e}")
+
+    def iniciar(self):
+        os.makedirs(self.directorio, exist_ok=True)
+        self.limpiar_terminados()
+        self.leer()
+        self.bus.relevo = self
+        self._hilo = threading.Thread(target=self._ciclo, name="relevo-eventos", daemon=True)
+        self._hilo.start()
+        atexit.register(self.detener)
+        return self._hilo
+
+    def detener(self):
+        self._detener.set()
+        try:
+            self.volcar()
+        except OSError as e:
+            print(f"❌ Error al volcar eventos pendientes: {e}")
+
+
+bus_eventos = BusEventos()
+
+
+def iniciar_relevo_eventos():
+    """Arranca el relevo de eventos entre workers de este proceso (con SSE_RELEVO=1)."""
+    if not RELEVO_ACTIVO or bus_eventos.relevo is not None:
+        return None
+    try:
+        return RelevoEventos(bus_eventos).iniciar()
+    except OSError as e:
+        # Sin directorio compartido, cada worker difunde solo sus propios eventos.
+        print(f"❌ No se pudo iniciar el relevo de eventos: {e}")
+        return None
+
+
+def publicar_evento(tipo, datos, sensor_id=None):
+    """Publica un evento sin que un fallo del canal afecte a la operación que lo genera."""
+    try:
+        bus_eventos.publicar(tipo, datos, sensor_id)
+    except Exception as e:
+        print(f"❌ Error al publicar evento '{tipo}': {e}")
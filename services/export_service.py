@@ -0,0 +1,152 @@
+import csv
+import io
+import os
+import tempfile
+from datetime import timedelta
+from database.models.proceso_biodigestor import ProcesoBiodigestor
+from services.series_service import iterar_filas_alineadas
+
+# Columnas en el formato ancho que espera ml/train_model.py.
+COLUMNAS_EXPORTACION = [
+    "fecha", "temperatura_celsius", "presion_biogas_kpa", "mq4_ppm", "dia_proceso"
+]
+FORMATOS_EXPORTACION = ("csv", "parquet", "xlsx")
+TIPOS_MIME = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+TAMANO_FRAGMENTO_ARCHIVO = 64 * 1024
+# Filas de datos por hoja de Excel (1.048.576 filas como máximo, menos el encabezado).
+FILAS_POR_HOJA_XLSX = 1048576 - 1
+
+
+def _filas(fechas, matriz, dias):
+    """Convierte un bloque alineado en filas de Python (fecha como texto ISO)."""
+    return zip(
+        fechas.astype("datetime64[s]").astype(str),
+        matriz[:, 0].tolist(), matriz[:, 1].tolist(), matriz[:, 2].tolist(),
+        dias.tolist(),
+    )
+
+
+def _exportar_csv(bloques):
+    salida = io.StringIO()
+    escritor = csv.writer(salida)
+    escritor.writerow(COLUMNAS_EXPORTACION)
+    for bloque in bloques:
+        escritor.writerows(_filas(*bloque))
+        yield salida.getvalue()
+        salida.seek(0)
+        salida.truncate()
+    yield salida.getvalue()
+
+
+class _SalidaEnMemoria(io.RawIOBase):
+    """Archivo de solo escritura que acumula bytes hasta que se vacía con leer_y_vaciar()."""
+
+    def __init__(self):
+        self._partes = []
+        self._posicion = 0
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        datos = bytes(datos)
+        self._partes.append(datos)
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self._posicion
+
+    def leer_y_vaciar(self):
+        datos = b"".join(self._partes)
+        self._partes = []
+        return datos
+
+
+def _exportar_parquet(bloques):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("La exportación a Parquet requiere el paquete 'pyarrow'.")
+
+    esquema = pa.schema([
+        ("fecha", pa.timestamp("us")),
+        ("temperatura_celsius", pa.float64()),
+        ("presion_biogas_kpa", pa.float64()),
+        ("mq4_ppm", pa.float64()),
+        ("dia_proceso", pa.int64()),
+    ])
+
+    def _generar():
+        salida = _SalidaEnMemoria()
+        # Cada bloque se escribe como un row group y se envía de inmediato.
+        with pq.ParquetWriter(salida, esquema) as escritor:
+            for fechas, matriz, dias in bloques:
+                escritor.write_table(pa.table(
+                    [fechas, matriz[:, 0], matriz[:, 1], matriz[:, 2], dias], schema=esquema
+                ))
+                yield salida.leer_y_vaciar()
+        yield salida.leer_y_vaciar()
+
+    return _generar()
+
+
+def _exportar_xlsx(bloques):
+    from openpyxl import Workbook
+
+    # En modo write-only openpyxl escribe las filas a disco en lugar de mantenerlas en memoria.
+    # Si las filas no caben en una hoja, continúan en "lecturas_2", "lecturas_3", ...
+    libro = Workbook(write_only=True)
+    hoja, hojas, en_hoja = None, 0, FILAS_POR_HOJA_XLSX
+    for bloque in bloques:
+        for fila in _filas(*bloque):
+            if en_hoja == FILAS_POR_HOJA_XLSX:
+                hojas += 1
+                hoja = libro.create_sheet("lecturas" if hojas == 1 else f"lecturas_{hojas}")
+                hoja.append(COLUMNAS_EXPORTACION)
+                en_hoja = 0
+            hoja.append(fila)
+            en_hoja += 1
+    if hoja is None:
+        libro.create_sheet("lecturas").append(COLUMNAS_EXPORTACION)
+
+    descriptor, ruta = tempfile.mkstemp(suffix=".xlsx")
+    os.close(descriptor)
+    try:
+        libro.save(ruta)
+        with open(ruta, "rb") as archivo:
+            while fragmento := archivo.read(TAMANO_FRAGMENTO_ARCHIVO):
+                yield fragmento
+    finally:
+        os.remove(ruta)
+
+
+def exportar_proceso(proceso_id, formato="csv", intervalo_segundos=0):
+    """
+    Retorna un generador con el contenido del archivo exportado de un proceso,
+    con las lecturas alineadas en el formato ancho de entrenamiento. Por defecto
+    exporta cada lectura; con `intervalo_segundos` conserva una fila por intervalo.
+    Lanza ValueError si el formato no es válido, LookupError si el proceso no existe
+    y RuntimeError si falta la dependencia opcional del formato.
+    """
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError(
+            f"Formato inválido. Valores válidos: {', '.join(FORMATOS_EXPORTACION)}"
+        )
+    proceso = ProcesoBiodigestor.query.get(proceso_id)
+    if not proceso:
+        raise LookupError(f"No existe el proceso {proceso_id}.")
+
+    intervalo = timedelta(seconds=intervalo_segundos) if intervalo_segundos else None
+    bloques = iterar_filas_alineadas(proceso.id, proceso.fecha_inicio, intervalo)
+
+    if formato == "csv":
+        return _exportar_csv(bloques)
+    if formato == "parquet":
+        return _exportar_parquet(bloques)
+    return _exportar_xlsx(bloques)
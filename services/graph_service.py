@@ -1,5 +1,6 @@
 from database.models.graph_config import GraphConfig
 from database.connection import db
+from database.recursos_versionados import marcar_cambio, GRAFICAS
 from datetime import datetime
 
 def guardar_o_actualizar_config(sensor_id, tipo_grafica):
@@ -16,6 +17,7 @@ def guardar_o_actualizar_config(sensor_id, tipo_grafica):
             config = GraphConfig(sensor_id=sensor_id, tipo_grafica=tipo_grafica)
             db.session.add(config)
         db.session.commit()
+        marcar_cambio(GRAFICAS)
         return config
     except Exception as e:
         db.session.rollback()
@@ -28,3 +30,10 @@ def obtener_todas_configs():
 def obtener_config_por_sensor(sensor_id):
     """Retorna la configuración de gráfica para un sensor específico."""
     return GraphConfig.query.filter_by(sensor_id=sensor_id).first()
+
+def config_to_dict(config):
+    return {
+        "sensor_id": config.sensor_id,
+        "tipo_grafica": config.tipo_grafica,
+        "fecha_modificacion": config.fecha_modificacion
+    }
@@ -0,0 +1,418 @@
+"""
+Ingesta asíncrona de lecturas (write-behind), activada con INGESTA_ASINCRONA=1.
+
+POST /api/lecturas valida la lectura, la anota en el archivo de respaldo del worker
+y la deja en una cola acotada en memoria; la respuesta (202) no espera a la base de
+datos. Un hilo escritor vacía la cola por lotes (por tamaño o por tiempo), con una
+transacción por lote.
+
+Archivos de respaldo, en INGESTA_DIR:
+    ingesta-<pid>_<marca>-<segmento>.wal   una lectura JSON por línea, con su número de secuencia
+    ingesta-<pid>_<marca>.ckpt             última secuencia confirmada en la base de datos
+(la marca distingue ejecuciones distintas que reciben el mismo pid)
+Un segmento se borra cuando todas sus lecturas están confirmadas. Al arrancar, los
+archivos de workers que ya no existen se reclaman (rename atómico) y se reinsertan
+las lecturas posteriores a su checkpoint.
+"""
+import atexit
+import glob
+import json
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from sqlalchemy.exc import InterfaceError, OperationalError
+from database.connection import db
+from database.proceso_estado import obtener_proceso_activo
+from database.version_compartida import DIRECTORIO_ESTADO, proceso_vivo
+from services.lectura_service import fecha_lectura_nueva, guardar_filas, sensores_validos, validar_item_lote
+
+INGESTA_ASINCRONA = os.environ.get("INGESTA_ASINCRONA", "0") == "1"
+DIRECTORIO_INGESTA = os.environ.get("INGESTA_DIR", os.path.join(DIRECTORIO_ESTADO, "ingesta"))
+# Lecturas en espera como máximo; con la cola llena se responde 429.
+CAPACIDAD_COLA = int(os.environ.get("INGESTA_CAPACIDAD", "10000"))
+TAMANO_LOTE = int(os.environ.get("INGESTA_TAMANO_LOTE", "500"))
+# Espera máxima (segundos) de una lectura en la cola antes de escribir un lote incompleto.
+INTERVALO_VOLCADO = float(os.environ.get("INGESTA_INTERVALO", "0.2"))
+# fsync en cada lectura: sobrevive también a un corte de energía, a costa de latencia.
+FSYNC = os.environ.get("INGESTA_FSYNC", "0") == "1"
+LECTURAS_POR_SEGMENTO = 50000
+# Segundos entre reintentos mientras la base de datos no responde, y tope del backoff.
+REINTENTO_INICIAL, REINTENTO_MAXIMO = 0.5, 30.0
+# Segundos sugeridos al cliente (Retry-After) cuando la cola está llena.
+REINTENTO_COLA_LLENA = 1
+
+_PATRON_ARCHIVO = re.compile(
+    r"^ingesta-(?P<origen>(?P<duenio>\d+)_[0-9a-f]+)(?:-(?P<segmento>\d+)\.wal|\.ckpt)$"
+)
+_PATRON_RECUPERANDO = re.compile(
+    r"^recuperando-(?P<duenio>\d+)-(?P<origen>\d+_[0-9a-f]+)(?:-(?P<segmento>\d+)\.wal|\.ckpt)$"
+)
+
+
+class ColaLlena(RuntimeError):
+    """La cola de ingesta alcanzó su capacidad."""
+
+
+class ArchivoRespaldo:
+    """Segmentos de respaldo de un worker y su checkpoint."""
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self.identidad = f"{os.getpid()}_{time.time_ns():x}"
+        os.makedirs(directorio, exist_ok=True)
+        self.segmento = 0
+        self._archivo = None
+        self._escritas_segmento = 0
+        self._sin_confirmar = {}  # segmento -> lecturas todavía no confirmadas
+
+    def _ruta_segmento(self, segmento):
+        return os.path.join(self.directorio, f"ingesta-{self.identidad}-{segmento}.wal")
+
+    @property
+    def ruta_checkpoint(self):
+        return os.path.join(self.directorio, f"ingesta-{self.identidad}.ckpt")
+
+    def anotar(self, secuencia, fila):
+        """Agrega una lectura al segmento actual. Retorna el segmento usado."""
+        if self._archivo is None or self._escritas_segmento >= LECTURAS_POR_SEGMENTO:
+            self._rotar()
+        self._archivo.write(json.dumps({"s": secuencia, **fila}, default=str) + "\n")
+        self._archivo.flush()
+        if FSYNC:
+            os.fsync(self._archivo.fileno())
+        self._escritas_segmento += 1
+        self._sin_confirmar[self.segmento] = self._sin_confirmar.get(self.segmento, 0) + 1
+        return self.segmento
+
+    def _rotar(self):
+        if self._archivo is not None:
+            self._archivo.close()
+            self._liberar(self.segmento)
+        self.segmento += 1
+        self._archivo = open(self._ruta_segmento(self.segmento), "a", encoding="utf-8")
+        self._escritas_segmento = 0
+
+    def confirmar(self, ultima_secuencia, por_segmento):
+        """Registra lecturas confirmadas y borra los segmentos cerrados que quedaron vacíos."""
+        _escribir_checkpoint(self.ruta_checkpoint, ultima_secuencia)
+        for segmento, cantidad in por_segmento.items():
+            self._sin_confirmar[segmento] -= cantidad
+            if segmento != self.segmento:
+                self._liberar(segmento)
+
+    def _liberar(self, segmento):
+        if not self._sin_confirmar.get(segmento):
+            self._sin_confirmar.pop(segmento, None)
+            try:
+                os.remove(self._ruta_segmento(segmento))
+            except FileNotFoundError:
+                pass
+
+    def cerrar(self):
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+            self._liberar(self.segmento)
+        if not self._sin_confirmar:
+            try:
+                os.remove(self.ruta_checkpoint)
+            except FileNotFoundError:
+                pass
+
+
+def reclamar_huerfanos(directorio):
+    """
+    Toma los archivos de respaldo de workers terminados (y los de una ejecución anterior
+    con el mismo pid), incluidos los que otro worker dejó a medio recuperar.
+    Retorna una lista de (origen, rutas de segmentos, ruta de checkpoint) ya renombrados
+    a este worker; el checkpoint puede no existir todavía.
+    """
+    propio = os.getpid()
+    por_origen = {}
+    for ruta in glob.glob(os.path.join(directorio, "*.wal")) + glob.glob(os.path.join(directorio, "*.ckpt")):
+        nombre = os.path.basename(ruta)
+        coincidencia = _PATRON_ARCHIVO.match(nombre) or _PATRON_RECUPERANDO.match(nombre)
+        if not coincidencia:
+            continue
+        partes = coincidencia.groupdict()
+        duenio = int(partes["duenio"])
+        if duenio != propio and proceso_vivo(duenio):
+            continue
+        origen = partes["origen"]
+        destino_base = os.path.join(directorio, f"recuperando-{propio}-{origen}")
+        destino = f"{destino_base}.ckpt" if partes["segmento"] is None else f"{destino_base}-{partes['segmento']}.wal"
+        if ruta != destino:
+            try:
+                # Solo un worker gana el rename; los demás ya no encuentran el archivo.
+                os.rename(ruta, destino)
+            except FileNotFoundError:
+                continue
+        reclamado = por_origen.setdefault(origen, ([], f"{destino_base}.ckpt"))
+        if partes["segmento"] is not None:
+            reclamado[0].append((int(partes["segmento"]), destino))
+
+    return [
+        (origen, [ruta for _, ruta in sorted(segmentos)], checkpoint)
+        for origen, (segmentos, checkpoint) in por_origen.items() if segmentos
+    ]
+
+
+def _leer_checkpoint(ruta):
+    try:
+        with open(ruta, encoding="utf-8") as archivo:
+            return int(archivo.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def _escribir_checkpoint(ruta, secuencia):
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        archivo.write(str(secuencia))
+    os.replace(temporal, ruta)
+
+
+def _leer_respaldo(rutas, ruta_checkpoint):
+    """(secuencia, fila) de las lecturas posteriores al checkpoint, en orden."""
+    confirmada = _leer_checkpoint(ruta_checkpoint)
+    filas = []
+    for ruta in rutas:
+        with open(ruta, encoding="utf-8") as archivo:
+            for linea in archivo:
+                try:
+                    fila = json.loads(linea)
+                except ValueError:
+                    # Última línea a medio escribir al caer el worker.
+                    continue
+                secuencia = fila.pop("s")
+                if secuencia > confirmada:
+                    fila["fecha_hora"] = datetime.fromisoformat(fila["fecha_hora"])
+                    filas.append((secuencia, fila))
+    return filas
+
+
+def _es_transitorio(error):
+    """Errores de conexión: el lote se reintenta completo."""
+    return isinstance(error, (OperationalError, InterfaceError))
+
+
+class ColaIngesta:
+    """
+    Cola acotada de lecturas validadas y su hilo escritor.
+    Cada lectura se anota en el archivo de respaldo antes de aceptarse, así una caída
+    del worker no pierde lecturas ya respondidas con 202.
+    """
+
+    def __init__(self, capacidad=CAPACIDAD_COLA, tamano_lote=TAMANO_LOTE,
+                 intervalo=INTERVALO_VOLCADO, directorio=DIRECTORIO_INGESTA):
+        self.capacidad = capacidad
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo
+        self.directorio = directorio
+        self._cola = queue.Queue()
+        self._lock = threading.Lock()
+        self._respaldo = None
+        self._secuencia = 0
+        self._hilo = None
+        self._detener = threading.Event()
+        self._latencias = deque(maxlen=1000)
+        self.contadores = {
+            "encoladas": 0, "escritas": 0, "lotes": 0, "rechazadas_cola_llena": 0,
+            "descartadas": 0, "errores_escritura": 0, "recuperadas": 0,
+        }
+
+    @property
+    def activa(self):
+        return self._hilo is not None
+
+    def encolar(self, item):
+        """
+        Valida una lectura y la deja en la cola. Retorna la fila encolada.
+        Lanza ValueError si es inválida, ColaLlena si no hay lugar y
+        RuntimeError si no hay proceso activo.
+        """
+        proceso = obtener_proceso_activo()
+        if not proceso:
+            raise RuntimeError("No hay proceso biodigestor activo. No se puede registrar lectura.")
+        ahora = fecha_lectura_nueva(proceso)
+        fila, error = validar_item_lote(item, sensores_validos(), ahora, proceso.fecha_inicio)
+        if error:
+            raise ValueError(error)
+        fila["proceso_id"] = proceso.id
+
+        with self._lock:
+            if self._cola.qsize() >= self.capacidad:
+                self.contadores["rechazadas_cola_llena"] += 1
+                raise ColaLlena("La cola de ingesta está llena, reintente más tarde.")
+            self._secuencia += 1
+            segmento = self._respaldo.anotar(self._secuencia, fila)
+            self._cola.put((self._secuencia, segmento, time.monotonic(), fila))
+            self.contadores["encoladas"] += 1
+        return fila
+
+    def _tomar_lote(self):
+        """Espera la primera lectura y junta más hasta llenar el lote o cumplir el intervalo."""
+        try:
+            lote = [self._cola.get(timeout=self.intervalo)]
+        except queue.Empty:
+            return []
+        limite = time.monotonic() + self.intervalo
+        while len(lote) < self.tamano_lote:
+            restante = limite - time.monotonic()
+            try:
+                lote.append(self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _escribir(self, por_proceso):
+        """
+        Escribe las filas agrupadas por proceso y quita de por_proceso lo ya confirmado,
+        así un reintento no duplica lecturas. Un error que no es de conexión se aísla
+        escribiendo fila por fila y descartando (con log) solo las que fallan.
+        """
+        for proceso_id in list(por_proceso):
+            grupo = por_proceso[proceso_id]
+            try:
+                guardar_filas(proceso_id, grupo)
+                del por_proceso[proceso_id]
+                continue
+            except Exception as e:
+                if _es_transitorio(e):
+                    raise
+            while grupo:
+                try:
+                    guardar_filas(proceso_id, grupo[:1])
+                except Exception as e:
+                    if _es_transitorio(e):
+                        raise
+                    self.contadores["descartadas"] += 1
+                    print(f"❌ Lectura descartada por la ingesta asíncrona: {grupo[0]} ({e})")
+                grupo.pop(0)
+            del por_proceso[proceso_id]
+
+    def _escribir_con_reintentos(self, filas):
+        """Escribe reintentando mientras la base de datos no responda. False si se detuvo antes."""
+        por_proceso = {}
+        for fila in filas:
+            por_proceso.setdefault(fila["proceso_id"], []).append(fila)
+        espera = REINTENTO_INICIAL
+        while True:
+            try:
+                self._escribir(por_proceso)
+                return True
+            except Exception as e:
+                self.contadores["errores_escritura"] += 1
+                print(f"❌ Error al escribir lote de ingesta ({len(filas)} lecturas), reintento en {espera:.1f}s: {e}")
+                db.session.remove()
+                if self._detener.wait(espera):
+                    return False
+                espera = min(espera * 2, REINTENTO_MAXIMO)
+
+    def _recuperar(self, reclamados):
+        for origen, rutas, checkpoint in reclamados:
+            filas = _leer_respaldo(rutas, checkpoint)
+            for inicio in range(0, len(filas), self.tamano_lote):
+                lote = filas[inicio:inicio + self.tamano_lote]
+                if not self._escribir_con_reintentos([fila for _, fila in lote]):
+                    # Los archivos quedan a nombre de este worker y se reclaman al reiniciar.
+                    return
+                _escribir_checkpoint(checkpoint, lote[-1][0])
+                self.contadores["recuperadas"] += len(lote)
+            print(f"✅ Ingesta: {len(filas)} lecturas recuperadas del worker {origen}.")
+            for ruta in rutas + [checkpoint]:
+                if os.path.exists(ruta):
+                    os.remove(ruta)
+
+    def _ciclo(self, app, reclamados):
+        with app.app_context():
+            try:
+                self._recuperar(reclamados)
+            except Exception as e:
+                print(f"❌ Error al recuperar respaldos de ingesta: {e}")
+            finally:
+                db.session.remove()
+            while not self._detener.is_set() or not self._cola.empty():
+                lote = self._tomar_lote()
+                if not lote:
+                    continue
+                inicio = time.perf_counter()
+                if not self._escribir_con_reintentos([fila for _, _, _, fila in lote]):
+                    # Sin base de datos al apagar: lo pendiente queda en el respaldo.
+                    break
+                db.session.remove()
+                with self._lock:
+                    por_segmento = {}
+                    for _, segmento, _, _ in lote:
+                        por_segmento[segmento] = por_segmento.get(segmento, 0) + 1
+                    self._respaldo.confirmar(lote[-1][0], por_segmento)
+                self._latencias.append((time.perf_counter() - inicio, time.monotonic() - lote[0][2]))
+                self.contadores["escritas"] += len(lote)
+                self.contadores["lotes"] += 1
+
+    def iniciar(self, app):
+        """Abre el respaldo de este worker y lanza el hilo escritor (una sola vez)."""
+        with self._lock:
+            if self._hilo is not None:
+                return self._hilo
+            os.makedirs(self.directorio, exist_ok=True)
+            # Antes de abrir el respaldo propio: un archivo con este mismo pid es de una ejecución anterior.
+            reclamados = reclamar_huerfanos(self.directorio)
+            self._respaldo = ArchivoRespaldo(self.directorio)
+            self._hilo = threading.Thread(
+                target=self._ciclo, args=(app, reclamados), name="ingesta-lecturas", daemon=True
+            )
+            self._hilo.start()
+        atexit.register(self.detener)
+        return self._hilo
+
+    def detener(self, espera=10.0):
+        """Vacía la cola (hasta `espera` segundos) y cierra el respaldo."""
+        if self._hilo is None:
+            return
+        self._detener.set()
+        self._hilo.join(espera)
+        with self._lock:
+            # Solo borra los segmentos ya confirmados por completo.
+            self._respaldo.cerrar()
+
+    def estado(self):
+        """Profundidad de la cola, contadores y latencias de los últimos lotes (ms)."""
+        latencias = list(self._latencias)
+
+        def _resumen(valores):
+            if not valores:
+                return None
+            ordenados = sorted(valores)
+            return {
+                "p50": round(ordenados[len(ordenados) // 2] * 1000, 2),
+                "p95": round(ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.95))] * 1000, 2),
+                "max": round(ordenados[-1] * 1000, 2),
+            }
+
+        return {
+            "activa": self.activa,
+            "profundidad": self._cola.qsize(),
+            "capacidad": self.capacidad,
+            "tamano_lote": self.tamano_lote,
+            **self.contadores,
+            "latencia_volcado_ms": _resumen([v for v, _ in latencias]),
+            "espera_en_cola_ms": _resumen([e for _, e in latencias]),
+        }
+
+
+cola_ingesta = ColaIngesta()
+
+
+def ingesta_asincrona_activa():
+    return cola_ingesta.activa
+
+
+def iniciar_ingesta(app):
+    """Lanza el escritor de la ingesta asíncrona si está habilitada (INGESTA_ASINCRONA=1)."""
+    if INGESTA_ASINCRONA:
+        cola_ingesta.iniciar(app)
@@ -1,44 +1,272 @@
 from database.models.lectura import Lectura
-from database.models.proceso_biodigestor import ProcesoBiodigestor
+from database.models.sensor import Sensor
 from database.connection import db
-from datetime import datetime
-from sqlalchemy import desc
-# Asegúrate de importar hay_proceso_activo si la usas en otros lugares
-from services.proceso_service import hay_proceso_activo 
+from database.proceso_estado import obtener_proceso_activo
+from database.buffer_lecturas import buffer_lecturas, LecturaReciente
+from database.recursos_versionados import obtener_recurso, SENSORES
+from services.agregados_service import registrar_en_agregados
+from services.eventos_service import publicar_evento
+from services.estadisticas_service import acumular_estadisticas
+from services.alertas_service import evaluar_lecturas
+from services.series_service import indices_lttb
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, desc, func, insert, literal, literal_column, or_, select
+import base64
+import math
+import numpy as np
 
-def obtener_proceso_activo():
-    """Retorna el objeto ProcesoBiodigestor activo, si existe, de lo contrario None."""
-    # Usamos la consulta directa que devuelve el objeto, no un booleano
-    return ProcesoBiodigestor.query.filter_by(estado='ACTIVO').first()
+def fecha_lectura_nueva(proceso):
+    """
+    Fecha asignada por el servidor a una lectura nueva del proceso activo.
+    Sin microsegundos, igual a lo que guarda una columna DATETIME de MySQL: así el buffer
+    en memoria y la base de datos devuelven la misma fecha. Nunca es anterior al inicio
+    del proceso (una lectura del mismo segundo en que inició quedaría antes al truncarla).
+    """
+    return max(datetime.utcnow().replace(microsecond=0), proceso.fecha_inicio)
+
+def _publicar_lecturas(proceso_id, lecturas):
+    """Difunde por el canal de eventos las lecturas recién confirmadas."""
+    for l in lecturas:
+        publicar_evento("lectura", {
+            "id": l.get("id"),
+            "sensor_id": l["sensor_id"],
+            "proceso_id": proceso_id,
+            "valor": l["valor"],
+            "fecha_hora": l["fecha_hora"].isoformat(),
+            "observaciones": l.get("observaciones")
+        }, sensor_id=l["sensor_id"])
+
+# Clave de la caché del conjunto de ids de sensores dentro del recurso versionado SENSORES.
+CLAVE_SENSORES_VALIDOS = "sensores_validos"
+
+def sensores_validos():
+    """
+    Conjunto de ids de sensores existentes, cacheado con la versión de la tabla sensores:
+    un alta en cualquier worker lo invalida en a lo sumo BMIS_VERSION_INTERVALO segundos.
+    """
+    recurso = obtener_recurso(SENSORES)
+    version = recurso.version()
+    sensores = recurso.obtener(CLAVE_SENSORES_VALIDOS, version)
+    if sensores is None:
+        sensores = frozenset(sensor_id for (sensor_id,) in db.session.query(Sensor.id).all())
+        recurso.guardar(CLAVE_SENSORES_VALIDOS, version, sensores)
+    return sensores
 
 def registrar_lectura(sensor_id, valor, observaciones=None):
     """
     Registra una lectura asociada a un proceso activo.
-    Lanza excepción si no hay proceso activo.
+    Lanza ValueError si la lectura es inválida y RuntimeError si no hay proceso activo.
     """
     proceso = obtener_proceso_activo()
     if not proceso:
         # Lanza una excepción que será capturada en el endpoint
         raise RuntimeError("No hay proceso biodigestor activo. No se puede registrar lectura.")
 
-    lectura = Lectura(
-        sensor_id=sensor_id,
-        valor=valor,
-        proceso_id=proceso.id, 
-        observaciones=observaciones,
-        fecha_hora=datetime.utcnow()
+    fila, error = validar_item_lote(
+        {"sensor_id": sensor_id, "valor": valor, "observaciones": observaciones},
+        sensores_validos(), fecha_lectura_nueva(proceso), proceso.fecha_inicio
     )
+    if error:
+        raise ValueError(error)
+
+    lectura = Lectura(proceso_id=proceso.id, **fila)
     try:
         db.session.add(lectura)
+        db.session.flush()
+        reciente = LecturaReciente(
+            lectura.id, lectura.sensor_id, float(lectura.valor),
+            lectura.fecha_hora, lectura.observaciones
+        )
+        registrar_en_agregados(proceso.id, [(reciente.sensor_id, reciente.fecha_hora, reciente.valor)])
         db.session.commit()
-        return lectura
     except Exception as e:
         db.session.rollback()
         raise RuntimeError(f"Error al registrar lectura: {e}")
 
-def obtener_lecturas():
-    """Retorna todas las lecturas ordenadas por fecha descendente."""
-    return Lectura.query.order_by(Lectura.fecha_hora.desc()).all()
+    buffer_lecturas.registrar(proceso.id, reciente)
+    acumular_estadisticas(proceso.id, [(reciente.sensor_id, reciente.valor)])
+    evaluar_lecturas(proceso.id, [(reciente.sensor_id, reciente.fecha_hora, reciente.valor)])
+    _publicar_lecturas(proceso.id, [reciente._asdict()])
+    return lectura
+
+# Límite de lecturas aceptadas en un único lote y tolerancia para relojes
+# adelantados de los gateways al enviar timestamps propios.
+MAX_LECTURAS_LOTE = 1000
+TOLERANCIA_FUTURO = timedelta(minutes=5)
+
+def parsear_fecha_hora(valor):
+    """Convierte un timestamp ISO 8601 del cliente a datetime UTC sin zona horaria."""
+    fecha = datetime.fromisoformat(str(valor))
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone(timezone.utc).replace(tzinfo=None)
+    return fecha
+
+def validar_item_lote(item, sensores_validos, ahora, inicio=None):
+    """
+    Valida una lectura del lote y la convierte en una fila lista para insertar.
+    Con inicio (fecha de inicio del proceso) rechaza fechas anteriores a él.
+    Retorna (fila, None) si es válida o (None, mensaje_error) si se rechaza.
+    """
+    if not isinstance(item, dict):
+        return None, "Formato inválido: se esperaba un objeto JSON."
+
+    sensor_id = item.get("sensor_id")
+    valor = item.get("valor")
+    if not sensor_id or valor is None:
+        return None, "Faltan datos obligatorios (sensor_id, valor)."
+    # bool es subclase de int: true/false no son ids ni valores válidos.
+    if not isinstance(sensor_id, int) or isinstance(sensor_id, bool):
+        return None, "sensor_id debe ser un entero."
+    if sensor_id not in sensores_validos:
+        return None, f"Sensor {sensor_id} no existe."
+    if not isinstance(valor, (int, float)) or isinstance(valor, bool) or not math.isfinite(valor):
+        return None, "El valor debe ser numérico."
+    valor = float(valor)
+
+    fecha_hora = ahora
+    if item.get("fecha_hora") is not None:
+        try:
+            fecha_hora = parsear_fecha_hora(item["fecha_hora"])
+        except ValueError:
+            return None, "fecha_hora inválida, use formato ISO 8601."
+        if fecha_hora > ahora + TOLERANCIA_FUTURO:
+            return None, "fecha_hora está en el futuro."
+        if inicio is not None and fecha_hora < inicio:
+            return None, "fecha_hora es anterior al inicio del proceso."
+
+    return {
+        "sensor_id": sensor_id,
+        "valor": valor,
+        "fecha_hora": fecha_hora,
+        "observaciones": item.get("observaciones"),
+    }, None
+
+def registrar_lecturas_lote(items):
+    """
+    Registra un lote de lecturas en una sola transacción.
+    Resuelve el proceso activo y los sensores válidos una única vez y
+    escribe todas las filas aceptadas con un INSERT masivo.
+    Retorna (resultados, filas): el resultado por ítem y las filas insertadas.
+    Lanza RuntimeError si no hay proceso activo o falla la inserción.
+    """
+    proceso = obtener_proceso_activo()
+    if not proceso:
+        raise RuntimeError("No hay proceso biodigestor activo. No se puede registrar lecturas.")
+
+    sensores = sensores_validos()
+    ahora = fecha_lectura_nueva(proceso)
+
+    resultados, filas = [], []
+    for indice, item in enumerate(items):
+        fila, error = validar_item_lote(item, sensores, ahora, proceso.fecha_inicio)
+        if error:
+            resultados.append({"indice": indice, "estado": "rechazada", "error": error})
+            continue
+        fila["proceso_id"] = proceso.id
+        filas.append(fila)
+        resultados.append({"indice": indice, "estado": "aceptada"})
+
+    if filas:
+        try:
+            guardar_filas(proceso.id, filas)
+        except Exception as e:
+            raise RuntimeError(f"Error al registrar lote de lecturas: {e}")
+
+    return resultados, filas
+
+def guardar_filas(proceso_id, filas):
+    """
+    Inserta filas ya validadas de un proceso en una sola transacción (INSERT masivo)
+    y actualiza agregados, buffers, estadísticas, detección de anomalías y eventos.
+    Propaga la excepción original de la base de datos tras el rollback.
+    """
+    try:
+        db.session.execute(insert(Lectura), filas)
+        registrar_en_agregados(
+            proceso_id, ((f["sensor_id"], f["fecha_hora"], f["valor"]) for f in filas)
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    # El INSERT masivo no devuelve los ids: los buffers se rehidratan al consultarse.
+    buffer_lecturas.invalidar(proceso_id, [fila["sensor_id"] for fila in filas])
+    acumular_estadisticas(proceso_id, ((f["sensor_id"], f["valor"]) for f in filas))
+    evaluar_lecturas(proceso_id, ((f["sensor_id"], f["fecha_hora"], f["valor"]) for f in filas))
+    _publicar_lecturas(proceso_id, filas)
+
+# Tamaño de página por defecto/máximo y de lote al transmitir en streaming.
+LIMITE_PAGINA_DEFECTO = 100
+LIMITE_PAGINA_MAX = 1000
+TAMANO_LOTE_STREAMING = 1000
+# Límite de puntos que se pueden pedir con reducción LTTB.
+MAX_PUNTOS_LTTB = 5000
+
+def codificar_cursor(fecha_hora, lectura_id):
+    """Cursor opaco con la posición (fecha_hora, id) de la última lectura entregada."""
+    crudo = f"{fecha_hora.isoformat()}|{lectura_id}".encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip("=")
+
+def decodificar_cursor(cursor):
+    """Retorna (fecha_hora, id) desde un cursor. Lanza ValueError si es inválido."""
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        fecha, lectura_id = crudo.split("|")
+        return datetime.fromisoformat(fecha), int(lectura_id)
+    except Exception:
+        raise ValueError("Cursor inválido.")
+
+def _consulta_lecturas(sensor_id=None, proceso_id=None, desde=None, hasta=None):
+    """SELECT de lecturas filtradas, ordenadas de la más reciente a la más antigua."""
+    consulta = select(
+        Lectura.id, Lectura.sensor_id, Lectura.valor,
+        Lectura.fecha_hora, Lectura.observaciones
+    )
+    if sensor_id is not None:
+        consulta = consulta.where(Lectura.sensor_id == sensor_id)
+    if proceso_id is not None:
+        consulta = consulta.where(Lectura.proceso_id == proceso_id)
+    if desde is not None:
+        consulta = consulta.where(Lectura.fecha_hora >= desde)
+    if hasta is not None:
+        consulta = consulta.where(Lectura.fecha_hora <= hasta)
+    return consulta.order_by(desc(Lectura.fecha_hora), desc(Lectura.id))
+
+def obtener_lecturas(limite=LIMITE_PAGINA_DEFECTO, cursor=None, **filtros):
+    """
+    Retorna una página de lecturas (más recientes primero) y el cursor de la siguiente,
+    o None si no hay más. Usa paginación por clave (fecha_hora, id): el costo de
+    cada página no depende de cuántas páginas se hayan recorrido antes.
+    Filtros opcionales: sensor_id, proceso_id, desde, hasta.
+    """
+    consulta = _consulta_lecturas(**filtros)
+    if cursor:
+        fecha_hora, lectura_id = decodificar_cursor(cursor)
+        consulta = consulta.where(or_(
+            Lectura.fecha_hora < fecha_hora,
+            and_(Lectura.fecha_hora == fecha_hora, Lectura.id < lectura_id)
+        ))
+
+    # Se pide una fila extra para saber si existe una página siguiente.
+    filas = db.session.execute(consulta.limit(limite + 1)).all()
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = codificar_cursor(filas[-1].fecha_hora, filas[-1].id)
+    return filas, siguiente
+
+def iterar_lecturas(tamano_lote=TAMANO_LOTE_STREAMING, **filtros):
+    """
+    Genera todas las lecturas filtradas en lotes desde un cursor del lado del servidor,
+    sin cargar el resultado completo en memoria.
+    """
+    consulta = _consulta_lecturas(**filtros).execution_options(yield_per=tamano_lote)
+    resultado = db.session.execute(consulta)
+    try:
+        for lote in resultado.partitions():
+            yield lote
+    finally:
+        resultado.close()
 
 def eliminar_lecturas_sensor(sensor_id):
     """Elimina todas las lecturas asociadas a un sensor."""
@@ -53,9 +281,11 @@ def eliminar_lecturas_sensor(sensor_id):
 def obtener_lecturas_por_sensor(sensor_id, limite=None):
     """
     Obtiene las últimas lecturas para un sensor, FILTRANDO por el proceso activo actual.
+    Con un límite dentro de la capacidad del buffer en memoria se sirve sin consultar
+    la base de datos (salvo para rehidratar un buffer frío).
     Si no hay proceso activo, devuelve una lista vacía.
     """
-    # 💡 CORRECCIÓN: Usamos obtener_proceso_activo() para asegurarnos de recibir el objeto o None.
+    # Proceso activo desde la caché compartida (ProcesoActivo o None).
     proceso_activo = obtener_proceso_activo() 
 
     if not proceso_activo:
@@ -63,7 +293,12 @@ def obtener_lecturas_por_sensor(sensor_id, limite=None):
         return []
 
     proceso_id = proceso_activo.id # Ahora es seguro acceder al ID
-    
+
+    if limite is not None:
+        recientes = buffer_lecturas.obtener(proceso_id, sensor_id, limite)
+        if recientes is not None:
+            return recientes
+
     query = Lectura.query.filter_by(
         sensor_id=sensor_id,
         proceso_id=proceso_id # FILTRO POR ID DE PROCESO
@@ -74,4 +309,59 @@ def obtener_lecturas_por_sensor(sensor_id, limite=None):
         
     print(f"✅ DB LOG: Obteniendo lecturas (Sensor: {sensor_id}, Proceso: {proceso_id})")
     return query.all()
-# -------------------------------------
\ No newline at end of file
+# -------------------------------------
+
+def _microsegundos_epoch(columna):
+    """
+    Expresión SQL con los microsegundos desde 1970 de una columna DateTime, según el motor.
+    Evita construir un datetime de Python por fila. None si el motor no está contemplado.
+    """
+    dialecto = db.session.get_bind().dialect.name
+    if dialecto == "mysql":
+        return func.timestampdiff(literal_column("MICROSECOND"), literal("1970-01-01 00:00:00"), columna)
+    if dialecto == "sqlite":
+        return (func.julianday(columna) - 2440587.5) * 86400000000.0
+    if dialecto == "postgresql":
+        return func.extract("epoch", columna) * 1000000.0
+    return None
+
+def obtener_lecturas_reducidas(sensor_id, proceso_id, max_puntos, desde=None, hasta=None,
+                               tamano_lote=TAMANO_LOTE_STREAMING * 50):
+    """
+    Retorna como máximo max_puntos lecturas de un sensor que conservan la forma de la
+    serie (Largest-Triangle-Three-Buckets), más recientes primero.
+    - El rango se lee con un cursor del lado del servidor, solo (id, instante, valor),
+      con el instante ya numérico desde SQL, y se acumula en arreglos NumPy.
+    - Las lecturas elegidas son filas reales: se traen completas en una segunda consulta.
+    """
+    instante = _microsegundos_epoch(Lectura.fecha_hora)
+    consulta = (
+        select(Lectura.id, instante if instante is not None else Lectura.fecha_hora, Lectura.valor)
+        .where(Lectura.sensor_id == sensor_id, Lectura.proceso_id == proceso_id)
+        .order_by(Lectura.fecha_hora, Lectura.id)
+    )
+    if desde is not None:
+        consulta = consulta.where(Lectura.fecha_hora >= desde)
+    if hasta is not None:
+        consulta = consulta.where(Lectura.fecha_hora <= hasta)
+
+    ids, instantes, valores = [], [], []
+    # Ejecución Core sobre la conexión de la sesión: sin la capa ORM por fila.
+    resultado = db.session.connection().execute(consulta.execution_options(yield_per=tamano_lote))
+    try:
+        for lote in resultado.partitions():
+            lote_ids, lote_instantes, lote_valores = zip(*lote)
+            ids.append(np.array(lote_ids, dtype=np.int64))
+            if instante is None:
+                lote_instantes = np.array(lote_instantes, dtype="datetime64[us]").astype(np.int64)
+            instantes.append(np.array(lote_instantes, dtype=np.float64))
+            valores.append(np.array(lote_valores, dtype=np.float64))
+    finally:
+        resultado.close()
+    if not ids:
+        return []
+
+    instantes = np.concatenate(instantes)
+    seleccion = indices_lttb(instantes - instantes[0], np.concatenate(valores), max_puntos)
+    elegidas = np.concatenate(ids)[seleccion].tolist()
+    return db.session.execute(_consulta_lecturas().where(Lectura.id.in_(elegidas))).all()
@@ -0,0 +1,104 @@
+"""
+Protección de los workers frente a ráfagas de login.
+
+- Cubetas de tokens en memoria por teléfono y por IP: un intento rechazado cuesta
+  una consulta a un diccionario, sin tocar la base de datos ni calcular hashes.
+- Un semáforo acota cuántos hashes de contraseña (check_password/set_password) se
+  calculan a la vez en el worker; si no hay lugar se responde 429 enseguida en vez de
+  encolar trabajo de CPU que frenaría la ingesta de lecturas.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Intentos de login/cambio de contraseña: ráfaga permitida y recarga por minuto.
+INTENTOS_TELEFONO = int(os.environ.get("LOGIN_INTENTOS_TELEFONO", "5"))
+RECARGA_TELEFONO_MIN = float(os.environ.get("LOGIN_RECARGA_TELEFONO_MIN", "1"))
+INTENTOS_IP = int(os.environ.get("LOGIN_INTENTOS_IP", "20"))
+RECARGA_IP_MIN = float(os.environ.get("LOGIN_RECARGA_IP_MIN", "20"))
+# Hashes de contraseña simultáneos por worker y espera máxima por un lugar (segundos).
+HASHES_SIMULTANEOS = int(os.environ.get("LOGIN_HASHES_SIMULTANEOS", max(1, (os.cpu_count() or 2) // 2)))
+ESPERA_HASH = float(os.environ.get("LOGIN_ESPERA_HASH", "0.05"))
+# Segundos sugeridos (Retry-After) cuando no hay lugar para calcular un hash.
+REINTENTO_HASH = 1
+
+
+class LimiteExcedido(RuntimeError):
+    """Se superó un límite; reintentar_en son los segundos sugeridos para el Retry-After."""
+
+    def __init__(self, mensaje, reintentar_en):
+        super().__init__(mensaje)
+        self.reintentar_en = max(1, int(reintentar_en + 0.999))
+
+
+class LimitadorTasa:
+    """
+    Cubetas de tokens por clave: `capacidad` intentos seguidos y `por_segundo` de recarga.
+    Una cubeta que volvió a llenarse equivale a no tenerla, así que se elimina en la
+    limpieza periódica: la memoria es proporcional a las claves activas.
+    """
+
+    def __init__(self, capacidad, por_segundo):
+        self.capacidad = capacidad
+        self.por_segundo = por_segundo
+        self._cubetas = {}  # clave -> (tokens, instante de la última actualización)
+        self._lock = threading.Lock()
+        # Tiempo en que una cubeta vacía vuelve a llenarse.
+        self._ttl = capacidad / por_segundo
+        self._proxima_limpieza = time.monotonic() + self._ttl
+
+    def consumir(self, clave, ahora=None):
+        """Retorna 0 si se admite el intento, o los segundos a esperar si no."""
+        ahora = time.monotonic() if ahora is None else ahora
+        with self._lock:
+            if ahora >= self._proxima_limpieza:
+                self._limpiar(ahora)
+            tokens, ultimo = self._cubetas.get(clave, (self.capacidad, ahora))
+            tokens = min(self.capacidad, tokens + (ahora - ultimo) * self.por_segundo)
+            if tokens >= 1:
+                self._cubetas[clave] = (tokens - 1, ahora)
+                return 0.0
+            self._cubetas[clave] = (tokens, ahora)
+            return (1 - tokens) / self.por_segundo
+
+    def _limpiar(self, ahora):
+        self._cubetas = {
+            clave: valor for clave, valor in self._cubetas.items() if ahora - valor[1] < self._ttl
+        }
+        self._proxima_limpieza = ahora + min(self._ttl, 60.0)
+
+    def __len__(self):
+        return len(self._cubetas)
+
+
+limitador_telefono = LimitadorTasa(INTENTOS_TELEFONO, RECARGA_TELEFONO_MIN / 60)
+limitador_ip = LimitadorTasa(INTENTOS_IP, RECARGA_IP_MIN / 60)
+_semaforo_hash = threading.BoundedSemaphore(HASHES_SIMULTANEOS)
+
+
+def verificar_intentos(telefono, ip):
+    """
+    Descuenta un intento de la IP y del teléfono.
+    Lanza LimiteExcedido si alguno se agotó (la IP se evalúa primero).
+    """
+    espera = limitador_ip.consumir(ip)
+    if espera:
+        raise LimiteExcedido("Demasiados intentos desde esta dirección. Intente más tarde.", espera)
+    espera = limitador_telefono.consumir(str(telefono))
+    if espera:
+        raise LimiteExcedido("Demasiados intentos para este teléfono. Intente más tarde.", espera)
+
+
+@contextmanager
+def lugar_para_hash():
+    """
+    Reserva un lugar para calcular un hash de contraseña.
+    Lanza LimiteExcedido si no se libera ninguno en ESPERA_HASH segundos.
+    """
+    if not _semaforo_hash.acquire(timeout=ESPERA_HASH):
+        raise LimiteExcedido("Servidor ocupado procesando inicios de sesión. Intente más tarde.", REINTENTO_HASH)
+    try:
+        yield
+    finally:
+        _semaforo_hash.release()
@@ -0,0 +1,425 @@
+"""
+Métricas de la aplicación en formato de texto de Prometheus (GET /metrics).
+
+- Cada worker acumula contadores, medidores e histogramas en memoria (un lock y unas
+  sumas por observación) y publica una instantánea en el directorio de estado cada
+  METRICAS_INTERVALO segundos y al terminar.
+- /metrics suma las instantáneas de todos los workers de la máquina. Los contadores e
+  histogramas de un worker terminado los absorbe otro worker vivo, para que los totales
+  no retrocedan; sus medidores (solicitudes en curso) se descartan.
+
+Se miden: latencia y solicitudes en curso por ruta, sentencias y tiempo de SQL por
+solicitud (eventos del engine de SQLAlchemy), espera para obtener una conexión del pool
+y tiempo de inferencia de los modelos.
+"""
+import atexit
+import bisect
+import glob
+import json
+import os
+import re
+import threading
+import time
+from flask import request
+from sqlalchemy import event
+from database.connection import db, PoolMedido
+from database.version_compartida import DIRECTORIO_ESTADO
+
+DIRECTORIO_METRICAS = os.environ.get("METRICAS_DIR", os.path.join(DIRECTORIO_ESTADO, "metricas"))
+INTERVALO_PUBLICACION = float(os.environ.get("METRICAS_INTERVALO", "5"))
+
+CUBETAS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CUBETAS_SENTENCIAS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Ruta usada para el SQL ejecutado fuera de una solicitud (hilos de fondo, comandos).
+RUTA_FONDO = "<fondo>"
+RUTA_DESCONOCIDA = "<sin_ruta>"
+
+# nombre -> (tipo, ayuda, cubetas)
+DEFINICIONES = {
+    "bmis_http_solicitudes_total": ("counter", "Solicitudes HTTP atendidas.", None),
+    "bmis_http_duracion_segundos": ("histogram", "Duración de las solicitudes HTTP.", CUBETAS_SEGUNDOS),
+    "bmis_http_en_curso": ("gauge", "Solicitudes HTTP en curso.", None),
+    "bmis_sql_sentencias_total": ("counter", "Sentencias SQL ejecutadas.", None),
+    "bmis_sql_segundos_total": ("counter", "Tiempo total en sentencias SQL.", None),
+    "bmis_sql_sentencias_por_solicitud": (
+        "histogram", "Sentencias SQL por solicitud HTTP.", CUBETAS_SENTENCIAS
+    ),
+    "bmis_sql_duracion_por_solicitud_segundos": (
+        "histogram", "Tiempo de SQL por solicitud HTTP.", CUBETAS_SEGUNDOS
+    ),
+    "bmis_pool_espera_segundos": (
+        "histogram", "Espera para obtener una conexión del pool.", CUBETAS_SEGUNDOS
+    ),
+    "bmis_inferencia_duracion_segundos": (
+        "histogram", "Duración de cada llamada a los modelos de IA.", CUBETAS_SEGUNDOS
+    ),
+    "bmis_inferencia_filas_total": ("counter", "Filas evaluadas por los modelos de IA.", None),
+}
+
+# worker-<pid>_<inicio>.json, o absorbiendo-<pid que lo absorbe>-worker-... mientras se suma.
+_PATRON_ARCHIVO = re.compile(
+    r"^(?:absorbiendo-(?P<duenio>\d+)-)?(?P<base>worker-(?P<pid>\d+)_[0-9a-f]+\.json)$"
+)
+
+
+def _proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class RegistroMetricas:
+    """Métricas de este worker. Las etiquetas son tuplas ordenadas de (nombre, valor)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.contadores = {}   # (nombre, etiquetas) -> valor
+        self.medidores = {}    # (nombre, etiquetas) -> valor
+        self.histogramas = {}  # (nombre, etiquetas) -> [conteos por cubeta (+Inf al final), suma]
+
+    def incrementar(self, nombre, etiquetas=(), valor=1):
+        with self._lock:
+            self._incrementar(nombre, etiquetas, valor)
+
+    def sumar_medidor(self, nombre, etiquetas=(), valor=1):
+        with self._lock:
+            self._sumar_medidor(nombre, etiquetas, valor)
+
+    def observar(self, nombre, valor, etiquetas=()):
+        with self._lock:
+            self._observar(nombre, valor, etiquetas)
+
+    def registrar_solicitud(self, solicitud, codigo, duracion):
+        """Todas las métricas de una solicitud terminada, con una sola toma del lock."""
+        ruta, ruta_metodo = solicitud.ruta, solicitud.ruta_metodo
+        with self._lock:
+            self._sumar_medidor("bmis_http_en_curso", ruta, -1)
+            self._incrementar("bmis_http_solicitudes_total", ruta_metodo + (("codigo", str(codigo)),), 1)
+            self._observar("bmis_http_duracion_segundos", duracion, ruta_metodo)
+            self._observar("bmis_sql_sentencias_por_solicitud", solicitud.sentencias, ruta)
+            if solicitud.sentencias:
+                self._incrementar("bmis_sql_sentencias_total", ruta, solicitud.sentencias)
+                self._incrementar("bmis_sql_segundos_total", ruta, solicitud.segundos_sql)
+                self._observar("bmis_sql_duracion_por_solicitud_segundos", solicitud.segundos_sql, ruta)
+
+    def _incrementar(self, nombre, etiquetas, valor):
+        clave = (nombre, etiquetas)
+        self.contadores[clave] = self.contadores.get(clave, 0) + valor
+
+    def _sumar_medidor(self, nombre, etiquetas, valor):
+        clave = (nombre, etiquetas)
+        self.medidores[clave] = self.medidores.get(clave, 0) + valor
+
+    def _observar(self, nombre, valor, etiquetas):
+        cubetas = DEFINICIONES[nombre][2]
+        clave = (nombre, etiquetas)
+        histograma = self.histogramas.get(clave)
+        if histograma is None:
+            histograma = self.histogramas[clave] = [[0] * (len(cubetas) + 1), 0.0]
+        histograma[0][bisect.bisect_left(cubetas, valor)] += 1
+        histograma[1] += valor
+
+    def instantanea(self):
+        with self._lock:
+            return {
+                "contadores": [[n, e, v] for (n, e), v in self.contadores.items()],
+                "medidores": [[n, e, v] for (n, e), v in self.medidores.items()],
+                "histogramas": [[n, e, list(c), s] for (n, e), (c, s) in self.histogramas.items()],
+            }
+
+    def vaciar(self):
+        with self._lock:
+            self.contadores, self.medidores, self.histogramas = {}, {}, {}
+
+    def absorber(self, instantanea):
+        """Suma los contadores e histogramas de otra instantánea (no sus medidores)."""
+        contadores, histogramas = _leer_instantanea(instantanea)
+        with self._lock:
+            for clave, valor in contadores.items():
+                self.contadores[clave] = self.contadores.get(clave, 0) + valor
+            for clave, (conteos, suma) in histogramas.items():
+                _sumar_histograma(self.histogramas, clave, conteos, suma)
+
+
+def _etiquetas(lista):
+    return tuple(tuple(par) for par in lista)
+
+
+def _leer_instantanea(instantanea, medidores=None):
+    contadores, histogramas = {}, {}
+    for nombre, etiquetas, valor in instantanea.get("contadores", []):
+        clave = (nombre, _etiquetas(etiquetas))
+        contadores[clave] = contadores.get(clave, 0) + valor
+    for nombre, etiquetas, conteos, suma in instantanea.get("histogramas", []):
+        _sumar_histograma(histogramas, (nombre, _etiquetas(etiquetas)), conteos, suma)
+    if medidores is not None:
+        for nombre, etiquetas, valor in instantanea.get("medidores", []):
+            clave = (nombre, _etiquetas(etiquetas))
+            medidores[clave] = medidores.get(clave, 0) + valor
+    return contadores, histogramas
+
+
+def _sumar_histograma(histogramas, clave, conteos, suma):
+    actual = histogramas.get(clave)
+    if actual is None:
+        histogramas[clave] = [list(conteos), suma]
+    elif len(actual[0]) == len(conteos):
+        actual[0] = [a + b for a, b in zip(actual[0], conteos)]
+        actual[1] += suma
+    # Cubetas distintas (otra versión del código): se ignora hasta que el worker termine.
+
+
+class PublicadorMetricas:
+    """Instantáneas por worker en DIRECTORIO_METRICAS y su combinación."""
+
+    def __init__(self, registro, directorio=DIRECTORIO_METRICAS):
+        self.registro = registro
+        self.directorio = directorio
+        self._lock = threading.Lock()
+        self.reiniciar_identidad()
+
+    def reiniciar_identidad(self):
+        self.identidad = f"{os.getpid()}_{time.time_ns():x}"
+        self.ruta = os.path.join(self.directorio, f"worker-{self.identidad}.json")
+
+    def publicar(self):
+        """Escribe de forma atómica la instantánea de este worker."""
+        with self._lock:
+            os.makedirs(self.directorio, exist_ok=True)
+            temporal = f"{self.ruta}.tmp"
+            with open(temporal, "w", encoding="utf-8") as archivo:
+                json.dump(self.registro.instantanea(), archivo, separators=(",", ":"))
+            os.replace(temporal, self.ruta)
+
+    def absorber_terminados(self):
+        """
+        Suma a este worker los contadores de los workers terminados y borra sus archivos.
+        Solo un worker gana el rename de cada archivo.
+        """
+        propio = os.getpid()
+        absorbidos = []
+        for ruta in glob.glob(os.path.join(self.directorio, "*.json")):
+            coincidencia = _PATRON_ARCHIVO.match(os.path.basename(ruta))
+            if not coincidencia or ruta == self.ruta:
+                continue
+            # Un archivo a medio absorber pertenece a quien lo renombró; uno con el mismo
+            # pid que este worker es de una ejecución anterior.
+            duenio = int(coincidencia["duenio"] or coincidencia["pid"])
+            if duenio != propio and _proceso_vivo(duenio):
+                continue
+            destino = os.path.join(self.directorio, f"absorbiendo-{propio}-{coincidencia['base']}")
+            try:
+                if ruta != destino:
+                    os.rename(ruta, destino)
+                with open(destino, encoding="utf-8") as archivo:
+                    self.registro.absorber(json.load(archivo))
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError) as e:
+                print(f"❌ Error al absorber métricas de {ruta}: {e}")
+            absorbidos.append(destino)
+        if absorbidos:
+            # Primero se publica la suma y recién después se borran los originales.
+            self.publicar()
+            for ruta in absorbidos:
+                try:
+                    os.remove(ruta)
+                except FileNotFoundError:
+                    pass
+
+    def combinar(self):
+        """Suma las instantáneas de todos los workers: (contadores, medidores, histogramas)."""
+        self.absorber_terminados()
+        self.publicar()
+        contadores, medidores, histogramas = {}, {}, {}
+        for ruta in glob.glob(os.path.join(self.directorio, "worker-*.json")):
+            try:
+                with open(ruta, encoding="utf-8") as archivo:
+                    instantanea = json.load(archivo)
+            except (OSError, ValueError):
+                continue  # El worker lo está reemplazando o ya terminó.
+            parciales, parciales_hist = _leer_instantanea(instantanea, medidores)
+            for clave, valor in parciales.items():
+                contadores[clave] = contadores.get(clave, 0) + valor
+            for clave, (conteos, suma) in parciales_hist.items():
+                _sumar_histograma(histogramas, clave, conteos, suma)
+        return contadores, medidores, histogramas
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _formatear_etiquetas(etiquetas, extra=()):
+    pares = tuple(etiquetas) + tuple(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in pares) + "}"
+
+
+def _numero(valor):
+    if isinstance(valor, float):
+        return repr(valor)
+    return str(valor)
+
+
+def formato_prometheus(contadores, medidores, histogramas):
+    """Texto de exposición de Prometheus (versión 0.0.4)."""
+    por_nombre = {}
+    for origen in (contadores, medidores, histogramas):
+        for (nombre, etiquetas), valor in origen.items():
+            por_nombre.setdefault(nombre, []).append((etiquetas, valor))
+
+    lineas = []
+    for nombre, (tipo, ayuda, cubetas) in DEFINICIONES.items():
+        series = sorted(por_nombre.get(nombre, []))
+        lineas.append(f"# HELP {nombre} {ayuda}")
+        lineas.append(f"# TYPE {nombre} {tipo}")
+        for etiquetas, valor in series:
+            if tipo != "histogram":
+                lineas.append(f"{nombre}{_formatear_etiquetas(etiquetas)} {_numero(valor)}")
+                continue
+            conteos, suma = valor
+            acumulado = 0
+            for limite, conteo in zip(list(cubetas) + ["+Inf"], conteos):
+                acumulado += conteo
+                le = limite if limite == "+Inf" else _numero(float(limite))
+                lineas.append(f"{nombre}_bucket{_formatear_etiquetas(etiquetas, [('le', le)])} {acumulado}")
+            lineas.append(f"{nombre}_sum{_formatear_etiquetas(etiquetas)} {_numero(float(suma))}")
+            lineas.append(f"{nombre}_count{_formatear_etiquetas(etiquetas)} {acumulado}")
+    return "\n".join(lineas) + "\n"
+
+
+registro_metricas = RegistroMetricas()
+publicador_metricas = PublicadorMetricas(registro_metricas)
+
+
+def _despues_de_fork():
+    # Con gunicorn --preload cada worker hereda una copia de lo medido en el master:
+    # empieza vacío y con su propio archivo para no contarlo dos veces.
+    registro_metricas.vaciar()
+    publicador_metricas.reiniciar_identidad()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_despues_de_fork)
+
+class SolicitudEnCurso:
+    """Medición de la solicitud que atiende un hilo."""
+    __slots__ = ("inicio", "ruta", "ruta_metodo", "codigo", "sentencias", "segundos_sql")
+
+    def __init__(self, inicio, ruta, ruta_metodo):
+        self.inicio = inicio
+        self.ruta = ruta
+        self.ruta_metodo = ruta_metodo
+        self.codigo = None
+        self.sentencias = 0
+        self.segundos_sql = 0.0
+
+
+# Solicitud en curso de cada hilo (None fuera de una solicitud: hilos de fondo, comandos).
+_local = threading.local()
+# (blueprint, regla, método) -> etiquetas ya armadas, para no rearmar tuplas en cada solicitud.
+_etiquetas_por_ruta = {}
+_ETIQUETAS_FONDO = (("blueprint", ""), ("ruta", RUTA_FONDO))
+
+
+def observar_inferencia(version, filas, segundos):
+    """Llamado por ai_service después de cada llamada a los modelos."""
+    etiquetas = (("version", str(version)),)
+    registro_metricas.observar("bmis_inferencia_duracion_segundos", segundos, etiquetas)
+    registro_metricas.incrementar("bmis_inferencia_filas_total", etiquetas, filas)
+
+
+def _etiquetas_ruta(solicitud):
+    regla = solicitud.url_rule.rule if solicitud.url_rule is not None else RUTA_DESCONOCIDA
+    clave = (solicitud.blueprint, regla, solicitud.method)
+    etiquetas = _etiquetas_por_ruta.get(clave)
+    if etiquetas is None:
+        ruta = (("blueprint", solicitud.blueprint or ""), ("ruta", regla))
+        etiquetas = _etiquetas_por_ruta[clave] = (ruta, ruta + (("metodo", solicitud.method),))
+    return etiquetas
+
+
+def _inicio_solicitud():
+    ruta, ruta_metodo = _etiquetas_ruta(request._get_current_object())
+    _local.solicitud = SolicitudEnCurso(time.perf_counter(), ruta, ruta_metodo)
+    registro_metricas.sumar_medidor("bmis_http_en_curso", ruta, 1)
+
+
+def _respuesta(respuesta):
+    solicitud = getattr(_local, "solicitud", None)
+    if solicitud is not None:
+        solicitud.codigo = respuesta.status_code
+    return respuesta
+
+
+def _fin_solicitud(error):
+    solicitud = getattr(_local, "solicitud", None)
+    if solicitud is None:
+        return
+    _local.solicitud = None
+    codigo = solicitud.codigo or (500 if error is not None else 200)
+    registro_metricas.registrar_solicitud(solicitud, codigo, time.perf_counter() - solicitud.inicio)
+
+
+def _antes_de_sentencia(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metricas_inicio", []).append(time.perf_counter())
+
+
+def _despues_de_sentencia(conn, cursor, statement, parameters, context, executemany):
+    pila = conn.info.get("metricas_inicio")
+    if not pila:
+        return
+    segundos = time.perf_counter() - pila.pop()
+    solicitud = getattr(_local, "solicitud", None)
+    if solicitud is not None:
+        solicitud.sentencias += 1
+        solicitud.segundos_sql += segundos
+    else:
+        registro_metricas.incrementar("bmis_sql_sentencias_total", _ETIQUETAS_FONDO)
+        registro_metricas.incrementar("bmis_sql_segundos_total", _ETIQUETAS_FONDO, segundos)
+
+
+def _espera_pool(segundos):
+    registro_metricas.observar("bmis_pool_espera_segundos", segundos)
+
+
+def instrumentar_app(app):
+    """Registra los hooks de solicitud de la app y los de SQLAlchemy de su engine."""
+    app.before_request(_inicio_solicitud)
+    app.after_request(_respuesta)
+    app.teardown_request(_fin_solicitud)
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", _antes_de_sentencia)
+        event.listen(db.engine, "after_cursor_execute", _despues_de_sentencia)
+    PoolMedido.observador = _espera_pool
+
+
+def iniciar_publicacion_metricas(intervalo=INTERVALO_PUBLICACION):
+    """Publica periódicamente la instantánea de este worker, y una última vez al terminar."""
+    def _publicar():
+        try:
+            publicador_metricas.publicar()
+        except OSError as e:
+            print(f"❌ Error al publicar métricas: {e}")
+
+    def _ciclo():
+        while True:
+            time.sleep(intervalo)
+            _publicar()
+
+    atexit.register(_publicar)
+    hilo = threading.Thread(target=_ciclo, name="publicacion-metricas", daemon=True)
+    hilo.start()
+    return hilo
+
+
+def exponer_metricas():
+    """Texto de /metrics con la suma de todos los workers."""
+    return formato_prometheus(*publicador_metricas.combinar())
@@ -0,0 +1,77 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Cantidad de resultados distintos que se conservan (uno por combinación de lecturas).
+MAX_PREDICCIONES_CACHE = int(os.environ.get("PREDICCION_CACHE_MAX", "64"))
+
+
+class _CalculoEnCurso:
+    """Resultado compartido de un cálculo que otros hilos esperan."""
+
+    def __init__(self):
+        self.listo = threading.Event()
+        self.resultado = None
+        self.creado_en = None
+        self.error = None
+
+
+class CachePredicciones:
+    """
+    Caché LRU de resultados de predicción con coalescencia de solicitudes (single-flight):
+    si varias solicitudes piden la misma clave a la vez, solo una ejecuta el modelo
+    y las demás esperan y reutilizan su resultado.
+    """
+
+    def __init__(self, max_entradas=MAX_PREDICCIONES_CACHE):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()  # clave -> (resultado, creado_en)
+        self._en_curso = {}             # clave -> _CalculoEnCurso
+        self._lock = threading.Lock()
+
+    def obtener_o_calcular(self, clave, calcular):
+        """
+        Retorna (resultado, desde_cache, edad_segundos).
+        desde_cache es True si el resultado no fue calculado por esta llamada.
+        Las excepciones de `calcular` se propagan a todas las solicitudes en espera.
+        """
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                self._entradas.move_to_end(clave)
+                resultado, creado_en = entrada
+                return resultado, True, time.time() - creado_en
+            calculo = self._en_curso.get(clave)
+            es_lider = calculo is None
+            if es_lider:
+                calculo = self._en_curso[clave] = _CalculoEnCurso()
+
+        if not es_lider:
+            calculo.listo.wait()
+            if calculo.error is not None:
+                raise calculo.error
+            return calculo.resultado, True, time.time() - calculo.creado_en
+
+        try:
+            calculo.resultado = calcular()
+            calculo.creado_en = time.time()
+        except Exception as e:
+            calculo.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._en_curso[clave]
+                if calculo.error is None:
+                    self._entradas[clave] = (calculo.resultado, calculo.creado_en)
+                    while len(self._entradas) > self.max_entradas:
+                        self._entradas.popitem(last=False)
+            calculo.listo.set()
+        return calculo.resultado, False, 0.0
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+
+cache_predicciones = CachePredicciones()
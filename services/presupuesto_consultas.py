@@ -0,0 +1,183 @@
+"""
+Presupuesto de consultas SQL por endpoint y detección de patrones N+1.
+
+- RegistroConsultas: registra las sentencias que ejecuta el hilo actual (eventos de
+  SQLAlchemy sobre todos los engines) mientras está activo.
+- @presupuesto_consultas(n) declara cuántas sentencias puede ejecutar una vista.
+- instalar_vigilancia(app): middleware de desarrollo (CONSULTAS_VIGILAR=1) que mide cada
+  solicitud y avisa si supera su presupuesto o repite una misma sentencia (posible N+1).
+  Con estricto=True (CONSULTAS_ESTRICTO=1) la solicitud falla con PresupuestoExcedido.
+- registro_consultas: fixture de pytest que activa el registro durante la prueba y la
+  hace fallar si alguna solicitud vigilada excedió su presupuesto. Se habilita con
+  `pytest_plugins = ["services.presupuesto_consultas"]` en el conftest.
+"""
+import os
+import threading
+from collections import Counter
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:
+    import pytest
+except ImportError:  # pytest solo se usa en las pruebas
+    pytest = None
+
+CONSULTAS_VIGILAR = os.environ.get("CONSULTAS_VIGILAR", "0") == "1"
+CONSULTAS_ESTRICTO = os.environ.get("CONSULTAS_ESTRICTO", "0") == "1"
+# Presupuesto de las vistas que no declaran uno (None = sin límite, solo detección de N+1).
+PRESUPUESTO_DEFECTO = int(os.environ["CONSULTAS_PRESUPUESTO_DEFECTO"]) \
+    if os.environ.get("CONSULTAS_PRESUPUESTO_DEFECTO") else None
+# Veces que puede repetirse la misma sentencia en una solicitud antes de considerarla N+1.
+UMBRAL_REPETICION = int(os.environ.get("CONSULTAS_UMBRAL_REPETICION", "3"))
+
+
+class PresupuestoExcedido(AssertionError):
+    """Una solicitud (o un bloque vigilado) ejecutó más consultas de las permitidas."""
+
+
+class RegistroConsultas:
+    """
+    Sentencias ejecutadas por este hilo mientras el registro está activo.
+    Se usa como context manager; los registros se pueden anidar.
+    """
+
+    def __init__(self):
+        self.sentencias = []  # (sql, parámetros)
+
+    def __enter__(self):
+        _instalar_escucha()
+        _activos().append(self)
+        return self
+
+    def __exit__(self, *exc):
+        _activos().remove(self)
+        return False
+
+    @property
+    def total(self):
+        return len(self.sentencias)
+
+    def repetidas(self, umbral=UMBRAL_REPETICION):
+        """{sql: veces} de las sentencias ejecutadas al menos `umbral` veces (posibles N+1)."""
+        conteo = Counter(sql for sql, _ in self.sentencias)
+        return {sql: veces for sql, veces in conteo.items() if veces >= umbral}
+
+    def problemas(self, maximo=None, umbral=UMBRAL_REPETICION):
+        """Descripción de cada problema encontrado (lista vacía si no hay ninguno)."""
+        problemas = []
+        if maximo is not None and self.total > maximo:
+            problemas.append(f"{self.total} consultas (presupuesto: {maximo})")
+        for sql, veces in self.repetidas(umbral).items():
+            problemas.append(f"posible N+1, {veces} veces: {' '.join(sql.split())[:200]}")
+        return problemas
+
+    def verificar(self, maximo=None, umbral=UMBRAL_REPETICION):
+        """Lanza PresupuestoExcedido si se superó el máximo o hubo sentencias repetidas."""
+        problemas = self.problemas(maximo, umbral)
+        if problemas:
+            raise PresupuestoExcedido("; ".join(problemas))
+
+
+_local = threading.local()
+_lock_escucha = threading.Lock()
+_escucha_instalada = False
+# Problemas detectados por el middleware en modo estricto (los consume el fixture de pytest).
+violaciones = []
+
+
+def _activos():
+    activos = getattr(_local, "registros", None)
+    if activos is None:
+        activos = _local.registros = []
+    return activos
+
+
+def _antes_de_sentencia(conn, cursor, statement, parameters, context, executemany):
+    registros = getattr(_local, "registros", None)
+    if registros:
+        for registro in registros:
+            registro.sentencias.append((statement, parameters))
+
+
+def _instalar_escucha():
+    """Escucha las sentencias de todos los engines (una sola vez por proceso)."""
+    global _escucha_instalada
+    with _lock_escucha:
+        if not _escucha_instalada:
+            event.listen(Engine, "before_cursor_execute", _antes_de_sentencia)
+            _escucha_instalada = True
+
+
+def presupuesto_consultas(maximo):
+    """Declara cuántas sentencias SQL puede ejecutar la vista decorada."""
+    def decorador(vista):
+        vista.presupuesto_consultas = maximo
+        return vista
+    return decorador
+
+
+def _presupuesto_de_la_vista():
+    vista = current_app.view_functions.get(request.endpoint)
+    return getattr(vista, "presupuesto_consultas", PRESUPUESTO_DEFECTO)
+
+
+def instalar_vigilancia(app, estricto=CONSULTAS_ESTRICTO):
+    """
+    Mide las consultas de cada solicitud y compara con el presupuesto de su vista.
+    Agrega el encabezado X-Consultas a cada respuesta. Pensado para desarrollo y pruebas.
+    """
+    _instalar_escucha()
+
+    @app.before_request
+    def _iniciar_registro():
+        registro = RegistroConsultas()
+        registro.__enter__()
+        _local.solicitud = registro
+
+    @app.after_request
+    def _revisar_registro(respuesta):
+        registro = getattr(_local, "solicitud", None)
+        if registro is None:
+            return respuesta
+        respuesta.headers["X-Consultas"] = str(registro.total)
+        problemas = registro.problemas(_presupuesto_de_la_vista())
+        if problemas:
+            mensaje = f"{request.method} {request.path}: " + "; ".join(problemas)
+            print(f"❌ Presupuesto de consultas: {mensaje}")
+            if estricto:
+                violaciones.append(mensaje)
+                raise PresupuestoExcedido(mensaje)
+        return respuesta
+
+    @app.teardown_request
+    def _cerrar_registro(error):
+        registro = getattr(_local, "solicitud", None)
+        if registro is not None:
+            _local.solicitud = None
+            registro.__exit__(None, None, None)
+
+
+def vigilar_consultas(app):
+    """Instala el middleware si CONSULTAS_VIGILAR=1 (llamado desde create_app)."""
+    if CONSULTAS_VIGILAR:
+        instalar_vigilancia(app)
+
+
+if pytest is not None:
+    @pytest.fixture
+    def registro_consultas():
+        """
+        Registra las consultas del hilo de la prueba (incluidas las del test client).
+        La prueba falla si el middleware estricto detectó un presupuesto excedido.
+            def test_graficas(client, registro_consultas):
+                client.get("/api/graficas")
+                registro_consultas.verificar(maximo=1)
+        """
+        del violaciones[:]
+        with RegistroConsultas() as registro:
+            yield registro
+        if violaciones:
+            detectadas = list(violaciones)
+            del violaciones[:]
+            pytest.fail("Presupuesto de consultas excedido:\n" + "\n".join(detectadas))
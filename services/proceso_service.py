@@ -1,18 +1,29 @@
 from database.models.proceso_biodigestor import ProcesoBiodigestor
 from database.connection import db
+from database.proceso_estado import obtener_proceso_activo, invalidar_proceso_activo
+from database.buffer_lecturas import buffer_lecturas
+from services.eventos_service import publicar_evento
+from services.estadisticas_service import congelar_estadisticas
+from services.alertas_service import cerrar_alertas_proceso
 from datetime import datetime
 
-def obtener_proceso_activo():
+def _consultar_proceso_activo():
+    """
+    Consulta directa a la base de datos del proceso activo (objeto ORM).
+    Solo para operaciones de escritura; las lecturas usan la caché compartida.
+    """
     return ProcesoBiodigestor.query.filter_by(estado='ACTIVO').first()
 
 def iniciar_proceso():
     """Inicia un nuevo proceso biodigestor si no hay uno activo."""
-    if obtener_proceso_activo():
+    if _consultar_proceso_activo():
         raise RuntimeError("Ya existe un proceso activo.")
     try:
         nuevo = ProcesoBiodigestor()
         db.session.add(nuevo)
         db.session.commit()
+        invalidar_proceso_activo()
+        publicar_evento("proceso", {"evento": "iniciado", **proceso_to_dict(nuevo)})
         return nuevo
     except Exception as e:
         db.session.rollback()
@@ -20,17 +31,35 @@ def iniciar_proceso():
 
 def finalizar_proceso():
     """Finaliza el proceso biodigestor activo."""
-    activo = obtener_proceso_activo()
+    activo = _consultar_proceso_activo()
     if not activo:
         raise RuntimeError("No hay procesos activos para finalizar.")
+    proceso_id, fecha_fin = activo.id, datetime.utcnow()
     try:
         activo.estado = "FINALIZADO"
-        activo.fecha_fin = datetime.utcnow()
+        activo.fecha_fin = fecha_fin
         db.session.commit()
-        return activo
+        invalidar_proceso_activo()
+        buffer_lecturas.descartar_proceso(proceso_id)
+        # Se serializa y se separa de la sesión ahora: cada commit posterior (estadísticas,
+        # alertas) lo expiraría y volver a leerlo costaría una consulta más por acceso.
+        datos = proceso_to_dict(activo)
+        db.session.expunge(activo)
     except Exception as e:
         db.session.rollback()
         raise RuntimeError(f"Error al finalizar proceso: {e}")
+    # El proceso ya quedó finalizado: un fallo en estos pasos solo se registra y no
+    # revierte el cierre (las estadísticas se rehacen con `flask estadisticas recalcular`).
+    try:
+        congelar_estadisticas(proceso_id)
+    except Exception as e:
+        print(f"❌ {e}")
+    try:
+        cerrar_alertas_proceso(proceso_id, fecha_fin)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+    publicar_evento("proceso", {"evento": "finalizado", **datos})
+    return activo
 
 def hay_proceso_activo():
     """Retorna True si existe un proceso activo."""
@@ -0,0 +1,228 @@
+import json
+import os
+import threading
+from datetime import datetime
+import numpy as np
+from sqlalchemy import insert
+from database.connection import db
+from database.models.lectura import Lectura
+from database.models.prediccion import Prediccion
+from database.models.proceso_biodigestor import ProcesoBiodigestor
+from database.version_compartida import DIRECTORIO_ESTADO
+from services.series_service import iterar_filas_alineadas
+from services.ai_service import predecir_lote
+
+try:
+    import fcntl
+except ImportError:  # Windows: el bloqueo solo cubre los hilos de este worker.
+    fcntl = None
+
+# Filas que se alinean y predicen juntas en cada llamada a los modelos.
+TAMANO_LOTE_REEVALUACION = 50000
+# Bloqueo y estado de cada reevaluación, compartidos por los workers de la máquina.
+DIRECTORIO_REEVALUACIONES = os.path.join(DIRECTORIO_ESTADO, "reevaluaciones")
+
+_lock = threading.Lock()
+_en_curso = set()  # proceso_id con una reevaluación en este worker (sin fcntl)
+
+
+def _ruta(proceso_id, extension):
+    return os.path.join(DIRECTORIO_REEVALUACIONES, f"proceso_{proceso_id}.{extension}")
+
+
+def _nuevo_trabajo(proceso_id):
+    return {
+        "proceso_id": proceso_id,
+        "estado": "en_curso",
+        "lecturas_totales": None,
+        "predicciones": 0,
+        "progreso": 0.0,
+        "confirmado_hasta": None,
+        "inicio": datetime.utcnow().isoformat(),
+        "fin": None,
+        "error": None,
+        "worker": os.getpid(),
+    }
+
+
+def _tomar_bloqueo(proceso_id):
+    """
+    Bloqueo exclusivo de la reevaluación de un proceso en todos los workers.
+    Retorna el archivo de bloqueo (se libera al cerrarlo, o si el worker muere)
+    o None si otra reevaluación del proceso lo tiene.
+    """
+    if fcntl is None:
+        with _lock:
+            if proceso_id in _en_curso:
+                return None
+            _en_curso.add(proceso_id)
+            return proceso_id
+    os.makedirs(DIRECTORIO_REEVALUACIONES, exist_ok=True)
+    archivo = open(_ruta(proceso_id, "lock"), "a")
+    try:
+        fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        archivo.close()
+        return None
+    return archivo
+
+
+def _liberar_bloqueo(bloqueo):
+    if fcntl is None:
+        with _lock:
+            _en_curso.discard(bloqueo)
+    else:
+        bloqueo.close()
+
+
+def _bloqueado(proceso_id):
+    """True si alguna reevaluación del proceso tiene el bloqueo ahora mismo."""
+    bloqueo = _tomar_bloqueo(proceso_id)
+    if bloqueo is None:
+        return True
+    _liberar_bloqueo(bloqueo)
+    return False
+
+
+def _guardar_trabajo(trabajo):
+    """Escribe de forma atómica el estado del trabajo para que lo lea cualquier worker."""
+    ruta = _ruta(trabajo["proceso_id"], "json")
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(DIRECTORIO_REEVALUACIONES, exist_ok=True)
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump(trabajo, archivo)
+        os.replace(temporal, ruta)
+    except OSError as e:
+        print(f"❌ Error al guardar el estado de la reevaluación {ruta}: {e}")
+
+
+def obtener_trabajo(proceso_id):
+    """
+    Retorna el estado de la última reevaluación del proceso (la haya lanzado cualquier
+    worker), o None. Un trabajo "en_curso" cuyo worker ya no tiene el bloqueo terminó
+    sin registrar su fin (el worker murió) y se informa como "interrumpido".
+    """
+    try:
+        with open(_ruta(proceso_id, "json"), encoding="utf-8") as archivo:
+            trabajo = json.load(archivo)
+    except (FileNotFoundError, ValueError):
+        return None
+    if trabajo["estado"] == "en_curso" and not _bloqueado(proceso_id):
+        # Relee por si el trabajo terminó entre la lectura y la verificación.
+        with open(_ruta(proceso_id, "json"), encoding="utf-8") as archivo:
+            trabajo = json.load(archivo)
+        if trabajo["estado"] == "en_curso":
+            trabajo["estado"] = "interrumpido"
+    return trabajo
+
+
+def reevaluar_proceso(proceso_id, n_jobs=-1, tamano_lote=TAMANO_LOTE_REEVALUACION, trabajo=None):
+    """
+    Recalcula las predicciones de los modelos en cada instante de un proceso.
+    - Alinea las tres series por bloques y calcula dia_proceso de forma vectorizada.
+    - Predice cada bloque completo de una vez, repartiendo los árboles en n_jobs núcleos.
+    - Confirma bloque por bloque: cada transacción borra las predicciones previas del
+      tramo de tiempo que cubre el bloque e inserta las nuevas, así ninguna transacción
+      crece con el tamaño del proceso. Mientras corre (o si se interrumpe), las consultas
+      ven predicciones nuevas hasta trabajo["confirmado_hasta"] y anteriores después,
+      nunca huecos ni instantes duplicados.
+    Retorna la cantidad de predicciones generadas.
+    """
+    trabajo = trabajo if trabajo is not None else _nuevo_trabajo(proceso_id)
+    proceso = ProcesoBiodigestor.query.get(proceso_id)
+    if not proceso:
+        raise LookupError(f"No existe el proceso {proceso_id}.")
+
+    def _reemplazar_tramo(desde, hasta, filas=()):
+        """Borra las predicciones previas con fecha en (desde, hasta] e inserta las filas."""
+        anteriores = Prediccion.query.filter(Prediccion.proceso_id == proceso_id)
+        if desde is not None:
+            anteriores = anteriores.filter(Prediccion.fecha_hora > desde)
+        if hasta is not None:
+            anteriores = anteriores.filter(Prediccion.fecha_hora <= hasta)
+        anteriores.delete(synchronize_session=False)
+        if filas:
+            db.session.execute(insert(Prediccion), filas)
+        db.session.commit()
+
+    try:
+        trabajo["lecturas_totales"] = Lectura.query.filter_by(proceso_id=proceso_id).count()
+        db.session.commit()
+
+        creado_en = datetime.utcnow()
+        confirmado_hasta = None
+        # Paginado: la conexión debe quedar libre para confirmar entre bloques.
+        bloques = iterar_filas_alineadas(
+            proceso_id, proceso.fecha_inicio, tamano_lote=tamano_lote, paginado=True
+        )
+        for fechas, matriz, dias in bloques:
+            alertas, tipos = predecir_lote(np.column_stack((matriz, dias)), n_jobs=n_jobs)
+            filas = [
+                {
+                    "proceso_id": proceso_id, "fecha_hora": fecha,
+                    "temperatura": temperatura, "presion": presion, "gas": gas,
+                    "dia_proceso": dia, "alerta_ia": alerta, "tipo_alerta": tipo,
+                    "creado_en": creado_en,
+                }
+                for fecha, (temperatura, presion, gas), dia, alerta, tipo in zip(
+                    fechas.astype("datetime64[us]").tolist(), matriz.tolist(),
+                    dias.tolist(), alertas.tolist(), tipos.tolist()
+                )
+            ]
+            _reemplazar_tramo(confirmado_hasta, filas[-1]["fecha_hora"], filas)
+            confirmado_hasta = filas[-1]["fecha_hora"]
+
+            trabajo["predicciones"] += len(filas)
+            trabajo["confirmado_hasta"] = confirmado_hasta.isoformat()
+            # Cada lectura produce como máximo una fila alineada.
+            trabajo["progreso"] = round(
+                min(100.0, 100.0 * trabajo["predicciones"] / max(trabajo["lecturas_totales"], 1)), 1
+            )
+            _guardar_trabajo(trabajo)
+        # Predicciones previas posteriores al último instante alineado (o todas, sin lecturas).
+        _reemplazar_tramo(confirmado_hasta, None)
+        return trabajo["predicciones"]
+    except Exception as e:
+        db.session.rollback()
+        raise RuntimeError(f"Error al reevaluar el proceso {proceso_id}: {e}")
+
+
+def iniciar_reevaluacion(app, proceso_id, n_jobs=-1, tamano_lote=TAMANO_LOTE_REEVALUACION):
+    """
+    Lanza la reevaluación de un proceso en un hilo en segundo plano.
+    Lanza LookupError si el proceso no existe y RuntimeError si ya hay una
+    reevaluación en curso para ese proceso en cualquier worker.
+    Retorna el estado inicial del trabajo.
+    """
+    if not ProcesoBiodigestor.query.get(proceso_id):
+        raise LookupError(f"No existe el proceso {proceso_id}.")
+    bloqueo = _tomar_bloqueo(proceso_id)
+    if bloqueo is None:
+        raise RuntimeError(f"Ya hay una reevaluación en curso para el proceso {proceso_id}.")
+    trabajo = _nuevo_trabajo(proceso_id)
+    _guardar_trabajo(trabajo)
+
+    def _ejecutar():
+        try:
+            with app.app_context():
+                try:
+                    reevaluar_proceso(proceso_id, n_jobs, tamano_lote, trabajo)
+                    estado, error = "completado", None
+                except Exception as e:
+                    print(f"❌ {e}")
+                    estado, error = "error", str(e)
+                finally:
+                    db.session.remove()
+            trabajo["estado"] = estado
+            trabajo["error"] = error
+            trabajo["fin"] = datetime.utcnow().isoformat()
+            if estado == "completado":
+                trabajo["progreso"] = 100.0
+            # El estado final se escribe antes de soltar el bloqueo.
+            _guardar_trabajo(trabajo)
+        finally:
+            _liberar_bloqueo(bloqueo)
+
+    threading.Thread(target=_ejecutar, name=f"reevaluacion-{proceso_id}", daemon=True).start()
+    return dict(trabajo)
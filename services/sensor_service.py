@@ -1,5 +1,6 @@
 from database.models.sensor import Sensor
 from database.connection import db
+from database.recursos_versionados import marcar_cambio, SENSORES
 
 def crear_sensor(nombre, tipo, unidad):
     """Crea un nuevo sensor si no existe otro con el mismo nombre."""
@@ -9,6 +10,7 @@ def crear_sensor(nombre, tipo, unidad):
     try:
         db.session.add(sensor)
         db.session.commit()
+        marcar_cambio(SENSORES)
         return sensor
     except Exception as e:
         db.session.rollback()
@@ -17,6 +19,9 @@ def crear_sensor(nombre, tipo, unidad):
 def obtener_sensores():
     return Sensor.query.all()
 
+def sensor_to_dict(sensor):
+    return {"id": sensor.id, "nombre": sensor.nombre, "tipo": sensor.tipo, "unidad": sensor.unidad}
+
 def obtener_sensor_por_id(sensor_id):
     return Sensor.query.get(sensor_id)
 
@@ -30,6 +35,7 @@ def actualizar_sensor(sensor_id, nombre=None, tipo=None, unidad=None, activo=Non
     if activo is not None: sensor.activo = activo
     try:
         db.session.commit()
+        marcar_cambio(SENSORES)
         return sensor
     except Exception as e:
         db.session.rollback()
@@ -43,6 +49,7 @@ def eliminar_sensor(sensor_id):
     sensor.activo = False
     try:
         db.session.commit()
+        marcar_cambio(SENSORES)
         return sensor
     except Exception as e:
         db.session.rollback()
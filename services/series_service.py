@@ -0,0 +1,175 @@
+import numpy as np
+from sqlalchemy import and_, or_, select
+from database.connection import db
+from database.models.lectura import Lectura
+from database.db_service import SENSOR_IDS
+
+# Orden de las columnas alineadas: el mismo que usan los modelos de IA.
+SENSORES_ALINEADOS = (SENSOR_IDS["temperatura"], SENSOR_IDS["presion"], SENSOR_IDS["gas"])
+
+TAMANO_LOTE_SERIES = 10000
+_UN_DIA = np.timedelta64(1, "D")
+
+
+def _a_arreglos(lote):
+    fechas, sensores, valores = zip(*lote)
+    return (
+        np.array(fechas, dtype="datetime64[us]"),
+        np.array(sensores, dtype=np.int64),
+        np.array(valores, dtype=np.float64),
+    )
+
+
+def iterar_bloques_proceso(proceso_id, tamano_lote=TAMANO_LOTE_SERIES, paginado=False):
+    """
+    Genera las lecturas de un proceso en orden cronológico como bloques de arreglos
+    NumPy (fechas datetime64[us], sensor_ids, valores), sin cargar el proceso completo.
+    - Por defecto lee desde un cursor del lado del servidor (yield_per).
+    - Con paginado=True cada bloque es una consulta independiente por clave
+      (fecha_hora, id), de modo que la conexión queda libre para escribir entre bloques.
+    """
+    consulta = (
+        select(Lectura.fecha_hora, Lectura.sensor_id, Lectura.valor, Lectura.id)
+        .where(Lectura.proceso_id == proceso_id)
+        .order_by(Lectura.fecha_hora, Lectura.id)
+    )
+
+    if paginado:
+        pagina = consulta
+        while True:
+            lote = db.session.execute(pagina.limit(tamano_lote)).all()
+            if not lote:
+                return
+            yield _a_arreglos([fila[:3] for fila in lote])
+            ultima_fecha, ultimo_id = lote[-1].fecha_hora, lote[-1].id
+            pagina = consulta.where(or_(
+                Lectura.fecha_hora > ultima_fecha,
+                and_(Lectura.fecha_hora == ultima_fecha, Lectura.id > ultimo_id)
+            ))
+
+    resultado = db.session.execute(consulta.execution_options(yield_per=tamano_lote))
+    try:
+        for lote in resultado.partitions():
+            yield _a_arreglos([fila[:3] for fila in lote])
+    finally:
+        resultado.close()
+
+
+def indices_lttb(x, y, max_puntos):
+    """
+    Largest-Triangle-Three-Buckets: índices de los max_puntos puntos que mejor conservan
+    la forma visual de la serie (x creciente). Siempre incluye el primero y el último.
+    Los promedios de los buckets salen de sumas acumuladas y el área de cada candidato
+    se calcula vectorizada por bucket; solo se itera sobre los buckets.
+    """
+    n = x.size
+    if max_puntos >= n or max_puntos < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n_buckets = max_puntos - 2
+    # Bordes de los buckets sobre los puntos intermedios [1, n-1).
+    bordes = np.linspace(1, n - 1, n_buckets + 1).astype(np.intp)
+
+    # Promedio del bucket siguiente a cada uno (para el último, el punto final).
+    suma_x = np.concatenate(([0.0], np.cumsum(x)))
+    suma_y = np.concatenate(([0.0], np.cumsum(y)))
+    inicio_sig = np.append(bordes[1:-1], n - 1)
+    fin_sig = np.append(bordes[2:], n)
+    cantidad = fin_sig - inicio_sig
+    promedio_x = (suma_x[fin_sig] - suma_x[inicio_sig]) / cantidad
+    promedio_y = (suma_y[fin_sig] - suma_y[inicio_sig]) / cantidad
+
+    seleccion = np.empty(max_puntos, dtype=np.intp)
+    seleccion[0], seleccion[-1] = 0, n - 1
+    anterior = 0
+    for b in range(n_buckets):
+        inicio, fin = bordes[b], bordes[b + 1]
+        ax, ay = x[anterior], y[anterior]
+        # El doble del área del triángulo (anterior, candidato, promedio siguiente).
+        areas = np.abs(
+            (ax - promedio_x[b]) * (y[inicio:fin] - ay) - (ax - x[inicio:fin]) * (promedio_y[b] - ay)
+        )
+        anterior = inicio + int(np.argmax(areas))
+        seleccion[b + 1] = anterior
+    return seleccion
+
+
+def _rellenar_hacia_adelante(columna, semilla):
+    """Reemplaza cada NaN por el último valor conocido (o la semilla del bloque anterior)."""
+    columna = np.concatenate(([semilla], columna))
+    indices = np.where(np.isnan(columna), 0, np.arange(columna.size))
+    np.maximum.accumulate(indices, out=indices)
+    return columna[indices][1:]
+
+
+def calcular_dia_proceso(fechas, fecha_inicio):
+    """Versión vectorizada del día de proceso: días completos desde el inicio + 1."""
+    return (fechas - np.datetime64(fecha_inicio, "us")) // _UN_DIA + 1
+
+
+class AlineadorSensores:
+    """
+    Alinea en el tiempo las series de temperatura, presión y gas de un proceso.
+    Cada lectura produce una fila con el último valor conocido de los tres sensores
+    (las filas se emiten solo cuando ya hay valores de los tres).
+    Con `intervalo` se conserva únicamente la última fila de cada intervalo y su
+    fecha es el comienzo del intervalo. El estado se mantiene entre bloques.
+    """
+
+    def __init__(self, intervalo=None):
+        self.intervalo = np.timedelta64(int(intervalo.total_seconds() * 1e6), "us") if intervalo else None
+        self._ultimos = np.full(len(SENSORES_ALINEADOS), np.nan)
+        self._pendiente = None  # (fecha, fila) del último intervalo, que puede continuar
+
+    def alinear(self, fechas, sensores, valores):
+        """Retorna (fechas, matriz Nx3) de las filas completas del bloque."""
+        matriz = np.empty((fechas.size, len(SENSORES_ALINEADOS)))
+        for j, sensor_id in enumerate(SENSORES_ALINEADOS):
+            columna = np.where(sensores == sensor_id, valores, np.nan)
+            matriz[:, j] = _rellenar_hacia_adelante(columna, self._ultimos[j])
+        if fechas.size:
+            self._ultimos = matriz[-1].copy()
+
+        completas = ~np.isnan(matriz).any(axis=1)
+        fechas, matriz = fechas[completas], matriz[completas]
+        if self.intervalo is None:
+            return fechas, matriz
+        return self._agrupar(fechas, matriz)
+
+    def _agrupar(self, fechas, matriz):
+        inicios = fechas - (fechas - np.datetime64(0, "us")) % self.intervalo
+        if self._pendiente is not None:
+            inicios = np.concatenate(([self._pendiente[0]], inicios))
+            matriz = np.vstack((self._pendiente[1], matriz))
+        if not inicios.size:
+            return inicios, matriz
+        # Última fila de cada intervalo; la final queda pendiente hasta el próximo bloque.
+        ultimas = np.append(inicios[1:] != inicios[:-1], False)
+        self._pendiente = (inicios[-1], matriz[-1])
+        return inicios[ultimas], matriz[ultimas]
+
+    def finalizar(self):
+        """Retorna la fila del último intervalo pendiente, si existe."""
+        if self._pendiente is None:
+            return np.array([], dtype="datetime64[us]"), np.empty((0, len(SENSORES_ALINEADOS)))
+        fecha, fila = self._pendiente
+        self._pendiente = None
+        return np.array([fecha]), fila.reshape(1, -1)
+
+
+def iterar_filas_alineadas(proceso_id, fecha_inicio, intervalo=None,
+                           tamano_lote=TAMANO_LOTE_SERIES, paginado=False):
+    """
+    Genera bloques (fechas, matriz Nx3 [temperatura, presion, gas], dia_proceso)
+    con las lecturas del proceso alineadas en el tiempo.
+    """
+    alineador = AlineadorSensores(intervalo)
+    for fechas, sensores, valores in iterar_bloques_proceso(proceso_id, tamano_lote, paginado):
+        fechas, matriz = alineador.alinear(fechas, sensores, valores)
+        if fechas.size:
+            yield fechas, matriz, calcular_dia_proceso(fechas, fecha_inicio)
+    fechas, matriz = alineador.finalizar()
+    if fechas.size:
+        yield fechas, matriz, calcular_dia_proceso(fechas, fecha_inicio)
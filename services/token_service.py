@@ -0,0 +1,215 @@
+"""
+Tokens de sesión firmados (HMAC-SHA256) sin estado en el servidor.
+
+Formato: <payload base64url>.<firma base64url>, con payload JSON
+    {"sub": id de usuario, "rol": rol, "tipo": "acceso"|"refresco", "iat": emisión (epoch con
+     milisegundos), "exp": vencimiento (epoch)}
+La verificación solo recalcula la firma y compara el vencimiento: no consulta la tabla
+usuarios. Los usuarios bloqueados se rechazan con una lista de revocación en memoria,
+compartida entre workers mediante un archivo y una VersionCompartida.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from database.version_compartida import DIRECTORIO_ESTADO, VersionCompartida
+
+TIPO_ACCESO = "acceso"
+TIPO_REFRESCO = "refresco"
+DURACION_ACCESO = int(os.environ.get("AUTH_DURACION_ACCESO", "900"))          # 15 minutos
+DURACION_REFRESCO = int(os.environ.get("AUTH_DURACION_REFRESCO", "604800"))   # 7 días
+# Tokens ya verificados que se recuerdan (se evita repetir el HMAC y el JSON).
+CAPACIDAD_CACHE_TOKENS = 4096
+
+
+class TokenInvalido(ValueError):
+    """Token mal formado, con firma inválida, vencido, de otro tipo o revocado."""
+
+
+def _b64(datos):
+    return base64.urlsafe_b64encode(datos).rstrip(b"=")
+
+
+def _de_b64(texto):
+    return base64.urlsafe_b64decode(texto + b"=" * (-len(texto) % 4))
+
+
+def _verificar_privado(ruta):
+    """Lanza RuntimeError si `ruta` no es de este usuario o si otros pueden escribirla (o leerla)."""
+    if not hasattr(os, "geteuid"):
+        return
+    datos = os.stat(ruta)
+    mascara = 0o022 if os.path.isdir(ruta) else 0o077
+    if datos.st_uid != os.geteuid() or datos.st_mode & mascara:
+        raise RuntimeError(
+            f"{ruta} no es privado de este usuario: defina AUTH_SECRETO o corrija dueño y permisos."
+        )
+
+
+def _cargar_secreto():
+    """
+    Clave de firma: AUTH_SECRETO, o (solo en desarrollo) una clave aleatoria generada una
+    única vez y compartida por los workers de la máquina a través del directorio de estado.
+    La clave generada solo se usa si el archivo y su directorio son privados del usuario.
+    """
+    secreto = os.environ.get("AUTH_SECRETO")
+    if secreto:
+        return secreto.encode()
+    ruta = os.path.join(DIRECTORIO_ESTADO, "auth.secreto")
+    os.makedirs(DIRECTORIO_ESTADO, mode=0o700, exist_ok=True)
+    _verificar_privado(DIRECTORIO_ESTADO)
+    try:
+        # O_EXCL: si dos workers arrancan a la vez, solo uno crea la clave.
+        descriptor = os.open(ruta, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(descriptor, "w") as archivo:
+            archivo.write(secrets.token_hex(32))
+    except FileExistsError:
+        pass
+    _verificar_privado(ruta)
+    for _ in range(50):
+        with open(ruta, encoding="utf-8") as archivo:
+            secreto = archivo.read().strip()
+        if secreto:
+            return secreto.encode()
+        time.sleep(0.01)  # El worker que la creó todavía la está escribiendo.
+    raise RuntimeError(f"No se pudo leer la clave de firma de {ruta}.")
+
+
+class ListaRevocacion:
+    """
+    Usuarios cuyos tokens emitidos hasta cierto instante ya no son válidos.
+    El conjunto vive en memoria; se relee del archivo compartido solo cuando otro
+    worker publica un cambio (como máximo una verificación de versión por segundo).
+    """
+
+    def __init__(self, directorio=DIRECTORIO_ESTADO):
+        self.ruta = os.path.join(directorio, "tokens_revocados.json")
+        self._version = VersionCompartida("tokens_revocados", directorio=directorio)
+        self._version_cargada = None
+        self._revocados = {}  # id de usuario -> instante de revocación (epoch, con milisegundos)
+        self._lock = threading.Lock()
+
+    def _sincronizar(self, forzar=False):
+        version = self._version.leer(forzar)
+        if version == self._version_cargada:
+            return
+        try:
+            with open(self.ruta, encoding="utf-8") as archivo:
+                revocados = {int(k): v for k, v in json.load(archivo).items()}
+        except (FileNotFoundError, ValueError):
+            revocados = {}
+        with self._lock:
+            self._revocados = revocados
+            self._version_cargada = version
+
+    def revocado(self, usuario_id, emitido_en):
+        """True si el token se emitió antes de la revocación (o en el mismo milisegundo)."""
+        self._sincronizar()
+        instante = self._revocados.get(usuario_id)
+        return instante is not None and emitido_en <= instante
+
+    def revocar(self, usuario_id):
+        """
+        Invalida todos los tokens emitidos hasta ahora para el usuario. Desbloquearlo no
+        los rehabilita: solo valen los que obtenga al volver a iniciar sesión.
+        """
+        self._sincronizar(forzar=True)
+        # Con milisegundos: un token obtenido al volver a iniciar sesión en el mismo
+        # segundo de la revocación sigue siendo válido.
+        ahora = round(time.time(), 3)
+        with self._lock:
+            # Pasada la vigencia del refresco, los tokens anteriores ya vencieron solos.
+            revocados = {
+                uid: instante for uid, instante in self._revocados.items()
+                if instante > ahora - DURACION_REFRESCO
+            }
+            revocados[usuario_id] = ahora
+            os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+            temporal = f"{self.ruta}.{os.getpid()}.tmp"
+            with open(temporal, "w", encoding="utf-8") as archivo:
+                json.dump(revocados, archivo)
+            os.replace(temporal, self.ruta)
+            self._revocados = revocados
+            self._version_cargada = self._version.publicar()
+
+
+class FirmadorTokens:
+    """Emite y verifica tokens; recuerda los últimos tokens válidos ya verificados."""
+
+    def __init__(self, secreto=None, revocacion=None, capacidad_cache=CAPACIDAD_CACHE_TOKENS):
+        self._secreto = secreto
+        self.revocacion = revocacion or ListaRevocacion()
+        self._cache = OrderedDict()
+        self._capacidad_cache = capacidad_cache
+        self._lock = threading.Lock()
+
+    @property
+    def secreto(self):
+        if self._secreto is None:
+            self._secreto = _cargar_secreto()
+        return self._secreto
+
+    def _firmar(self, contenido):
+        return _b64(hmac.new(self.secreto, contenido, hashlib.sha256).digest())
+
+    def emitir(self, usuario_id, rol, tipo=TIPO_ACCESO, duracion=None):
+        """Retorna (token, segundos de validez)."""
+        if duracion is None:
+            duracion = DURACION_ACCESO if tipo == TIPO_ACCESO else DURACION_REFRESCO
+        ahora = time.time()
+        # iat con milisegundos, para compararlo con el instante de revocación.
+        payload = {
+            "sub": usuario_id, "rol": rol, "tipo": tipo,
+            "iat": round(ahora, 3), "exp": int(ahora) + duracion,
+        }
+        contenido = _b64(json.dumps(payload, separators=(",", ":")).encode())
+        return (contenido + b"." + self._firmar(contenido)).decode(), duracion
+
+    def verificar(self, token, tipo=TIPO_ACCESO):
+        """Retorna el payload del token. Lanza TokenInvalido si no es aceptable."""
+        claims = self._cache.get(token)
+        if claims is None:
+            claims = self._decodificar(token)
+            with self._lock:
+                self._cache[token] = claims
+                if len(self._cache) > self._capacidad_cache:
+                    self._cache.popitem(last=False)
+        if claims["exp"] <= time.time():
+            raise TokenInvalido("El token expiró.")
+        if claims["tipo"] != tipo:
+            raise TokenInvalido("Tipo de token incorrecto.")
+        if self.revocacion.revocado(claims["sub"], claims["iat"]):
+            raise TokenInvalido("El token fue revocado.")
+        return claims
+
+    def _decodificar(self, token):
+        try:
+            contenido, firma = token.encode().split(b".")
+        except (ValueError, UnicodeEncodeError):
+            raise TokenInvalido("Token mal formado.")
+        if not hmac.compare_digest(firma, self._firmar(contenido)):
+            raise TokenInvalido("Firma inválida.")
+        try:
+            return json.loads(_de_b64(contenido))
+        except ValueError:
+            raise TokenInvalido("Token mal formado.")
+
+
+firmador = FirmadorTokens()
+
+
+def emitir_tokens(usuario):
+    """Par de tokens de una sesión nueva, listo para la respuesta de /auth/login."""
+    acceso, expira_en = firmador.emitir(usuario.id, usuario.rol, TIPO_ACCESO)
+    refresco, _ = firmador.emitir(usuario.id, usuario.rol, TIPO_REFRESCO)
+    return {
+        "access_token": acceso,
+        "refresh_token": refresco,
+        "token_type": "Bearer",
+        "expires_in": expira_en,
+    }
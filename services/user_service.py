@@ -1,6 +1,9 @@
 from database.models.user import User
 from database.connection import db
 from datetime import datetime
+from services.token_service import firmador, TokenInvalido, TIPO_ACCESO, TIPO_REFRESCO
+from services.limitador_service import lugar_para_hash
+from database.recursos_versionados import marcar_cambio, USUARIOS
 
 # -----------------------------------------------------------------
 # 1. Crear Usuario
@@ -18,12 +21,15 @@ def crear_usuario(nombre, telefono, password):
         estado="activo",
         conectado=False
     )
-    # Asume que el modelo User tiene un método set_password que hashea la contraseña
-    user.set_password(password)
+    # Asume que el modelo User tiene un método set_password que hashea la contraseña.
+    # Lanza LimiteExcedido si el worker ya está calculando el máximo de hashes.
+    with lugar_para_hash():
+        user.set_password(password)
 
     try:
         db.session.add(user)
         db.session.commit()
+        marcar_cambio(USUARIOS)
         return user, None
     except Exception as e:
         db.session.rollback()
@@ -35,15 +41,24 @@ def crear_usuario(nombre, telefono, password):
 # 2. Login de Usuario
 # -----------------------------------------------------------------
 def login_usuario(telefono, password):
-    """Verifica credenciales y actualiza la conexión del usuario."""
+    """
+    Verifica credenciales y actualiza la conexión del usuario.
+    Lanza LimiteExcedido si el worker ya está calculando el máximo de hashes.
+    """
     user = User.query.filter_by(telefono=telefono).first()
-    
+    if not user:
+        return None
+
     # Asume que el modelo User tiene un método check_password para verificar el hash
-    if user and user.check_password(password):
+    with lugar_para_hash():
+        valida = user.check_password(password)
+    if valida:
         # actualizar conexión
         user.conectado = True
         user.ultima_conexion = datetime.now()
         db.session.commit()
+        # Las listas de /api/users muestran conectado y ultima_conexion.
+        marcar_cambio(USUARIOS)
         return user
     return None
 
@@ -64,11 +79,33 @@ def restablecer_contrasena(telefono, nueva_contrasena):
     if not usuario:
         return False, "No se encontró el usuario"
 
-    try:
-        # Asume el método set_password para hashear la nueva contraseña
+    # Lanza LimiteExcedido si el worker ya está calculando el máximo de hashes.
+    with lugar_para_hash():
         usuario.set_password(nueva_contrasena)
+    try:
         db.session.commit()
         return True, None
     except Exception as e:
         db.session.rollback()
-        return False, "Error al actualizar la contraseña en la base de datos"
\ No newline at end of file
+        return False, "Error al actualizar la contraseña en la base de datos"
+
+# -----------------------------------------------------------------
+# 5. Renovar el Token de Acceso
+# -----------------------------------------------------------------
+def renovar_acceso(token_refresco):
+    """
+    Emite un nuevo token de acceso a partir de un token de refresco válido.
+    Es el único punto (una vez por renovación) en que se vuelve a consultar al usuario.
+    Retorna (datos del token, None) o (None, error).
+    """
+    try:
+        claims = firmador.verificar(token_refresco, TIPO_REFRESCO)
+    except TokenInvalido as e:
+        return None, str(e)
+
+    usuario = User.query.get(claims["sub"])
+    if not usuario or usuario.estado == "bloqueado":
+        return None, "El usuario no existe o está bloqueado"
+
+    acceso, expira_en = firmador.emitir(usuario.id, usuario.rol, TIPO_ACCESO)
+    return {"access_token": acceso, "token_type": "Bearer", "expires_in": expira_en}, None
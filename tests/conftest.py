@@ -0,0 +1,55 @@
+"""
+Configuración común de las pruebas: la app corre contra una base SQLite temporal, con el
+estado compartido en un directorio propio y la vigilancia de consultas en modo estricto
+(una solicitud que supera el presupuesto de su vista falla, ver services/presupuesto_consultas).
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Antes de importar la app: la configuración se lee al importar los módulos.
+_DIRECTORIO = tempfile.mkdtemp(prefix="bmis_pruebas_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DIRECTORIO, 'pruebas.db')}"
+os.environ["BMIS_ESTADO_DIR"] = _DIRECTORIO
+os.environ["PRECARGAR_MODELOS"] = "0"
+os.environ["CONSULTAS_VIGILAR"] = "1"
+os.environ["CONSULTAS_ESTRICTO"] = "1"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest_plugins = ["services.presupuesto_consultas"]
+
+SENSORES = [("gas", "MQ-4", "ppm"), ("temperatura", "DS18B20", "°C"), ("presion", "BMP280", "kPa")]
+
+
+@pytest.fixture(scope="session")
+def app():
+    """App creada con create_app sobre la base SQLite temporal, con el catálogo de sensores."""
+    import main
+    import commands.base_datos  # noqa: F401  (registra todos los modelos)
+    from database.connection import db
+    from database.models.sensor import Sensor
+
+    app = main.create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.create_all()
+        for sensor_id, (nombre, tipo, unidad) in enumerate(SENSORES, 1):
+            db.session.add(Sensor(id=sensor_id, nombre=nombre, tipo=tipo, unidad=unidad))
+        db.session.commit()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def proceso_activo(client):
+    """Finaliza el proceso activo que haya y comienza uno nuevo; retorna su id."""
+    client.post("/api/proceso/finalizar")
+    respuesta = client.post("/api/proceso/iniciar")
+    assert respuesta.status_code == 201, respuesta.get_json()
+    return respuesta.get_json()["id"]
@@ -0,0 +1,55 @@
+"""Agregados 1m/1h/1d: combinación (upsert) de buckets en línea y reconstrucción desde lecturas."""
+from datetime import datetime
+
+import pytest
+
+from database.connection import db
+from database.models.lectura_agregada import LecturaAgregada
+from services.agregados_service import RESOLUCIONES, recalcular_agregados, registrar_en_agregados
+
+SENSOR = 2
+
+
+def _buckets(proceso_id):
+    return {
+        b.resolucion: b for b in
+        LecturaAgregada.query.filter_by(proceso_id=proceso_id, sensor_id=SENSOR)
+    }
+
+
+def test_upsert_combina_el_bucket_existente(app, proceso_activo):
+    t = datetime(2026, 1, 1, 10, 15, 20)
+    with app.app_context():
+        registrar_en_agregados(proceso_activo, [(SENSOR, t, 30.0), (SENSOR, t.replace(second=40), 34.0)])
+        db.session.commit()
+        # Una lectura anterior en el mismo bucket no reemplaza al último valor.
+        registrar_en_agregados(proceso_activo, [(SENSOR, t.replace(second=5), 28.0)])
+        db.session.commit()
+
+        buckets = _buckets(proceso_activo)
+        assert set(buckets) == set(RESOLUCIONES)
+        for bucket in buckets.values():
+            assert (bucket.minimo, bucket.maximo, bucket.cantidad) == (28.0, 34.0, 3)
+            assert bucket.suma == pytest.approx(92.0)
+            assert (bucket.ultimo, bucket.ultimo_fecha) == (34.0, t.replace(second=40))
+        assert buckets["1m"].inicio == datetime(2026, 1, 1, 10, 15)
+        assert buckets["1d"].inicio == datetime(2026, 1, 1)
+        db.session.remove()
+
+
+def test_recalcular_el_proceso_activo(app, client, proceso_activo):
+    for valor in (30.0, 32.0, 34.0):
+        assert client.post("/api/lecturas", json={"sensor_id": SENSOR, "valor": valor}).status_code == 201
+
+    with app.app_context():
+        assert recalcular_agregados(proceso_activo) == 3
+        assert {b.cantidad for b in _buckets(proceso_activo).values()} == {3}
+        db.session.remove()
+
+    # Lo posterior a la reconstrucción se suma en línea sobre ella.
+    assert client.post("/api/lecturas", json={"sensor_id": SENSOR, "valor": 36.0}).status_code == 201
+    respuesta = client.get(f"/api/lecturas/{SENSOR}/serie", query_string={"resolucion": "1d"})
+    assert respuesta.status_code == 200
+    (punto,) = respuesta.get_json()["puntos"]
+    assert (punto["count"], punto["min"], punto["max"], punto["last"]) == (4, 30.0, 36.0, 36.0)
+    assert punto["avg"] == pytest.approx(33.0)
@@ -0,0 +1,71 @@
+"""Tokens de acceso (revocación al bloquear un usuario) y límites de intentos de login."""
+import time
+
+from services.token_service import ListaRevocacion
+
+
+def _registrar_y_entrar(client, telefono):
+    datos = {"nombre": "Operador", "telefono": telefono, "password": "clave-1", "confirm_password": "clave-1"}
+    respuesta = client.post("/auth/register", json=datos)
+    assert respuesta.status_code == 201, respuesta.get_json()
+    usuario_id = respuesta.get_json()["id"]
+    respuesta = client.post("/auth/login", json={"telefono": telefono, "password": "clave-1"})
+    assert respuesta.status_code == 200, respuesta.get_json()
+    return usuario_id, respuesta.get_json()
+
+
+def _autorizacion(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_bloquear_revoca_los_tokens_emitidos(client):
+    usuario_id, tokens = _registrar_y_entrar(client, "70000001")
+    # Token válido de otro rol: la ruta de administradores responde 403, no 401.
+    assert client.post("/api/modelos/rollback", headers=_autorizacion(tokens["access_token"])).status_code == 403
+
+    respuesta = client.put(f"/api/users/{usuario_id}/estado", json={"estado": "bloqueado"})
+    assert respuesta.status_code == 200
+
+    assert client.post("/api/modelos/rollback", headers=_autorizacion(tokens["access_token"])).status_code == 401
+    respuesta = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert respuesta.status_code == 401
+    assert "revocado" in respuesta.get_json()["error"]
+
+
+def test_revocacion_no_afecta_tokens_posteriores(tmp_path):
+    lista = ListaRevocacion(directorio=str(tmp_path))
+    emitido = round(time.time(), 3)
+    time.sleep(0.002)
+    lista.revocar(7)
+
+    assert lista.revocado(7, emitido)
+    assert not lista.revocado(7, round(time.time(), 3) + 0.001)
+    assert not lista.revocado(8, emitido)
+    # Otro worker (otra instancia sobre el mismo directorio) ve la revocación.
+    assert ListaRevocacion(directorio=str(tmp_path)).revocado(7, emitido)
+
+
+def test_login_limitado_por_telefono(client):
+    entorno = {"REMOTE_ADDR": "10.0.0.1"}
+    credenciales = {"telefono": "70000099", "password": "incorrecta"}
+    for _ in range(5):
+        respuesta = client.post("/auth/login", json=credenciales, environ_base=entorno)
+        assert respuesta.status_code == 401
+
+    respuesta = client.post("/auth/login", json=credenciales, environ_base=entorno)
+
+    assert respuesta.status_code == 429
+    assert int(respuesta.headers["Retry-After"]) >= 1
+
+
+def test_login_limitado_por_ip(client):
+    entorno = {"REMOTE_ADDR": "10.0.0.2"}
+    for i in range(20):
+        respuesta = client.post("/auth/login", json={"telefono": f"7100{i:04d}", "password": "x"},
+                                environ_base=entorno)
+        assert respuesta.status_code == 401
+
+    respuesta = client.post("/auth/login", json={"telefono": "71009999", "password": "x"}, environ_base=entorno)
+
+    assert respuesta.status_code == 429
+    assert "dirección" in respuesta.get_json()["error"]
@@ -0,0 +1,28 @@
+"""GET condicionales con ETag sobre los recursos versionados (ver routes/respuesta_condicional)."""
+from database.recursos_versionados import SENSORES, marcar_cambio
+
+
+def test_etag_responde_304_sin_consultar(client):
+    primera = client.get("/api/sensores")
+    assert primera.status_code == 200
+    etag = primera.headers["ETag"]
+    assert len(primera.get_json()) >= 3
+
+    respuesta = client.get("/api/sensores", headers={"If-None-Match": etag})
+
+    assert respuesta.status_code == 304
+    assert respuesta.headers["ETag"] == etag
+    assert respuesta.headers["X-Consultas"] == "0"
+    assert respuesta.get_data() == b""
+
+
+def test_etag_cambia_tras_una_escritura(app, client):
+    etag = client.get("/api/sensores").headers["ETag"]
+
+    with app.app_context():
+        marcar_cambio(SENSORES)
+    respuesta = client.get("/api/sensores", headers={"If-None-Match": etag})
+
+    assert respuesta.status_code == 200
+    assert respuesta.headers["ETag"] != etag
+    assert client.get("/api/sensores", headers={"If-None-Match": respuesta.headers["ETag"]}).status_code == 304
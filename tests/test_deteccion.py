@@ -0,0 +1,68 @@
+"""Detector en línea de anomalías (ml/deteccion) y persistencia de sus eventos en alertas."""
+from datetime import datetime, timedelta
+
+from database.db_service import SENSOR_IDS
+from ml.deteccion import REGLA_UMBRAL, TIPO_ZSCORE, DetectorAnomalias
+from ml.utils import TEMPERATURA_MAX
+
+TEMPERATURA = SENSOR_IDS["temperatura"]
+T0 = datetime(2026, 1, 1)
+
+
+def _evaluar(detector, valores, sensor_id=TEMPERATURA, desde=0):
+    transiciones = []
+    for i, valor in enumerate(valores, desde):
+        transiciones += detector.evaluar(1, sensor_id, valor, float(i), T0 + timedelta(seconds=i))
+    return transiciones
+
+
+def test_umbral_abre_y_cierra_un_evento():
+    detector = DetectorAnomalias({TEMPERATURA: "temperatura"}, calentamiento=1000)
+    fuera = TEMPERATURA_MAX + 5
+
+    transiciones = _evaluar(detector, [35.0, 35.2, fuera, fuera + 1, fuera - 1, 35.1, 35.0])
+
+    inicio, fin = [t for t in transiciones if t.regla == REGLA_UMBRAL]
+    assert (inicio.evento, inicio.tipo, inicio.valor) == ("inicio", "Temperatura alta", fuera)
+    assert (fin.evento, fin.fecha_hora) == ("fin", T0 + timedelta(seconds=5))
+    assert (fin.minimo, fin.maximo, fin.lecturas) == (fuera - 1, fuera + 1, 3)
+
+
+def test_zscore_con_histeresis():
+    # Sin regla de tasa, para aislar el z-score.
+    detector = DetectorAnomalias(
+        {TEMPERATURA: "temperatura"}, alfa=0.1, limite_z=4.0, calentamiento=30, tasas={}
+    )
+    estables = [35.0 + 0.1 * (i % 3) for i in range(40)]
+
+    assert _evaluar(detector, estables) == []
+    abiertas = _evaluar(detector, [38.0], desde=40)
+    assert [(t.tipo, t.evento) for t in abiertas] == [(TIPO_ZSCORE, "inicio")]
+    # Vuelve a la media: cierra recién por debajo de la mitad del límite.
+    cierres = _evaluar(detector, [35.1] * 5, desde=41)
+    assert [(t.tipo, t.evento) for t in cierres] == [(TIPO_ZSCORE, "fin")]
+
+
+def test_lectura_fuera_de_orden_se_ignora():
+    detector = DetectorAnomalias({TEMPERATURA: "temperatura"}, calentamiento=1000, tasas={})
+    fuera = TEMPERATURA_MAX + 5
+    assert len(_evaluar(detector, [fuera], desde=100)) == 1
+
+    # Anterior a la última evaluada: no cierra el evento abierto después.
+    assert _evaluar(detector, [35.0], desde=10) == []
+    (fin,) = _evaluar(detector, [35.0], desde=101)
+    assert fin.evento == "fin" and fin.fecha_hora == T0 + timedelta(seconds=101)
+
+
+def test_alertas_del_proceso(client, proceso_activo):
+    for valor in (35.0, TEMPERATURA_MAX + 5):
+        assert client.post("/api/lecturas", json={"sensor_id": TEMPERATURA, "valor": valor}).status_code == 201
+
+    abiertas = client.get(f"/api/procesos/{proceso_activo}/alertas", query_string={"abiertas": 1}).get_json()
+    (alerta,) = [a for a in abiertas if a["tipo"] == "Temperatura alta"]
+    assert alerta["fin"] is None
+
+    assert client.post("/api/lecturas", json={"sensor_id": TEMPERATURA, "valor": 35.0}).status_code == 201
+    alertas = client.get(f"/api/procesos/{proceso_activo}/alertas").get_json()
+    (alerta,) = [a for a in alertas if a["tipo"] == "Temperatura alta"]
+    assert alerta["fin"] is not None and alerta["fin"] >= alerta["inicio"]
@@ -0,0 +1,48 @@
+"""Recuperación de los archivos de respaldo (WAL) de la ingesta asíncrona de un worker caído."""
+import json
+import time
+from datetime import timedelta
+
+from database.connection import db
+from database.models.lectura import Lectura
+from database.models.proceso_biodigestor import ProcesoBiodigestor
+from database.version_compartida import proceso_vivo
+from services.ingesta_service import ColaIngesta
+
+
+def _pid_terminado():
+    return next(pid for pid in range(4_000_000, 1, -1) if not proceso_vivo(pid))
+
+
+def test_recupera_lo_posterior_al_checkpoint(app, proceso_activo, tmp_path):
+    with app.app_context():
+        inicio = db.session.get(ProcesoBiodigestor, proceso_activo).fecha_inicio
+    origen = f"{_pid_terminado()}_abc123"
+    lineas = [
+        json.dumps({
+            "s": secuencia, "sensor_id": 3, "valor": 100.0 + secuencia, "proceso_id": proceso_activo,
+            "fecha_hora": (inicio + timedelta(seconds=secuencia)).isoformat(),
+            "observaciones": f"wal-{secuencia}",
+        })
+        for secuencia in (1, 2, 3)
+    ]
+    # La última línea quedó a medio escribir al caer el worker.
+    (tmp_path / f"ingesta-{origen}-1.wal").write_text("\n".join(lineas) + '\n{"s": 4, "sens')
+    (tmp_path / f"ingesta-{origen}.ckpt").write_text("1")
+
+    cola = ColaIngesta(intervalo=0.05, directorio=str(tmp_path))
+    cola.iniciar(app)
+    limite = time.monotonic() + 10
+    while cola.contadores["recuperadas"] < 2 and time.monotonic() < limite:
+        time.sleep(0.05)
+    cola.detener()
+
+    assert cola.contadores["recuperadas"] == 2
+    with app.app_context():
+        recuperadas = (
+            Lectura.query.filter(Lectura.proceso_id == proceso_activo, Lectura.observaciones.like("wal-%"))
+            .order_by(Lectura.fecha_hora).all()
+        )
+        assert [(l.observaciones, l.valor) for l in recuperadas] == [("wal-2", 102.0), ("wal-3", 103.0)]
+        db.session.remove()
+    assert not [ruta.name for ruta in tmp_path.iterdir() if origen in ruta.name]
@@ -0,0 +1,138 @@
+"""
+Registro y consulta de lecturas: validación del POST individual y por lotes, paginación
+con cursores (keyset) y reducción de series con LTTB.
+"""
+from datetime import timedelta
+
+import numpy as np
+
+from database.connection import db
+from database.db_service import SENSOR_IDS
+from database.models.proceso_biodigestor import ProcesoBiodigestor
+from services.lectura_service import MAX_LECTURAS_LOTE
+from services.series_service import indices_lttb
+
+
+def _inicio_proceso(app, proceso_id):
+    with app.app_context():
+        return db.session.get(ProcesoBiodigestor, proceso_id).fecha_inicio
+
+
+def test_post_individual_valida_la_lectura(client, proceso_activo):
+    invalidas = [
+        {"sensor_id": "1", "valor": 1},
+        {"sensor_id": SENSOR_IDS["temperatura"], "valor": "30"},
+        {"sensor_id": SENSOR_IDS["temperatura"], "valor": True},
+        {"sensor_id": 99, "valor": 1},
+    ]
+    for cuerpo in invalidas:
+        respuesta = client.post("/api/lecturas", json=cuerpo)
+        assert respuesta.status_code == 400, cuerpo
+
+    respuesta = client.post("/api/lecturas", json={"sensor_id": SENSOR_IDS["temperatura"], "valor": 30})
+    assert respuesta.status_code == 201
+    assert respuesta.get_json()["valor"] == 30.0
+
+
+def test_lote_valida_cada_lectura(app, client, proceso_activo):
+    inicio = _inicio_proceso(app, proceso_activo)
+    temperatura = SENSOR_IDS["temperatura"]
+    lote = [
+        {"sensor_id": temperatura, "valor": 30.5},
+        {"sensor_id": temperatura, "valor": 31, "fecha_hora": (inicio + timedelta(seconds=1)).isoformat()},
+        "no es un objeto",
+        {"sensor_id": temperatura},
+        {"sensor_id": "2", "valor": 30},
+        {"sensor_id": 99, "valor": 30},
+        {"sensor_id": temperatura, "valor": False},
+        {"sensor_id": temperatura, "valor": 30, "fecha_hora": "ayer"},
+        {"sensor_id": temperatura, "valor": 30, "fecha_hora": (inicio + timedelta(days=1)).isoformat()},
+        {"sensor_id": temperatura, "valor": 30, "fecha_hora": (inicio - timedelta(days=1)).isoformat()},
+    ]
+
+    respuesta = client.post("/api/lecturas/batch", json={"lecturas": lote})
+
+    assert respuesta.status_code == 201
+    datos = respuesta.get_json()
+    assert (datos["aceptadas"], datos["rechazadas"]) == (2, 8)
+    estados = [r["estado"] for r in datos["resultados"]]
+    assert estados == ["aceptada"] * 2 + ["rechazada"] * 8
+    assert "anterior al inicio del proceso" in datos["resultados"][-1]["error"]
+
+
+def test_lote_sin_lecturas_validas_o_demasiado_grande(client, proceso_activo):
+    assert client.post("/api/lecturas/batch", json={"lecturas": []}).status_code == 400
+    respuesta = client.post("/api/lecturas/batch", json={"lecturas": [{"sensor_id": 99, "valor": 1}]})
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()["aceptadas"] == 0
+    demasiadas = [{"sensor_id": SENSOR_IDS["gas"], "valor": 1}] * (MAX_LECTURAS_LOTE + 1)
+    assert client.post("/api/lecturas/batch", json={"lecturas": demasiadas}).status_code == 413
+
+
+def test_paginacion_con_cursor(app, client, proceso_activo):
+    inicio = _inicio_proceso(app, proceso_activo)
+    presion = SENSOR_IDS["presion"]
+    # Pares de lecturas con la misma fecha: el cursor desempata por id.
+    lote = [
+        {"sensor_id": presion, "valor": float(i), "fecha_hora": (inicio + timedelta(seconds=i // 2)).isoformat()}
+        for i in range(25)
+    ]
+    assert client.post("/api/lecturas/batch", json={"lecturas": lote}).status_code == 201
+
+    paginas, cursor = [], None
+    while True:
+        consulta = {"sensor_id": presion, "proceso_id": proceso_activo, "limit": 10}
+        if cursor:
+            consulta["cursor"] = cursor
+        respuesta = client.get("/api/lecturas", query_string=consulta)
+        assert respuesta.status_code == 200
+        paginas.append(respuesta.get_json())
+        cursor = respuesta.headers.get("X-Siguiente-Cursor")
+        if not cursor:
+            break
+
+    assert [len(p) for p in paginas] == [10, 10, 5]
+    lecturas = [l for pagina in paginas for l in pagina]
+    assert len({l["id"] for l in lecturas}) == 25
+    claves = [(l["fecha_hora"], l["id"]) for l in lecturas]
+    assert claves == sorted(claves, reverse=True)
+
+
+def test_cursor_invalido(client):
+    respuesta = client.get("/api/lecturas", query_string={"cursor": "no-es-un-cursor"})
+    assert respuesta.status_code == 400
+
+
+def test_lttb_conserva_extremos_y_picos():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.sin(x / 50)
+    y[537] = 10.0
+
+    indices = indices_lttb(x, y, 50)
+
+    assert indices.size == 50
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+    assert 537 in indices
+    # Con menos puntos que el máximo la serie queda completa.
+    assert np.array_equal(indices_lttb(x[:10], y[:10], 50), np.arange(10))
+
+
+def test_lecturas_reducidas_por_sensor(app, client, proceso_activo):
+    inicio = _inicio_proceso(app, proceso_activo)
+    gas = SENSOR_IDS["gas"]
+    lote = [
+        {"sensor_id": gas, "valor": float(i % 7), "fecha_hora": (inicio + timedelta(seconds=i)).isoformat()}
+        for i in range(200)
+    ]
+    assert client.post("/api/lecturas/batch", json={"lecturas": lote}).status_code == 201
+
+    respuesta = client.get(f"/api/lecturas/{gas}", query_string={"max_puntos": 20})
+
+    assert respuesta.status_code == 200
+    puntos = respuesta.get_json()
+    assert len(puntos) == 20
+    fechas = sorted(p["fecha_hora"] for p in puntos)
+    assert fechas[0] == inicio.isoformat()
+    assert fechas[-1] == (inicio + timedelta(seconds=199)).isoformat()
+    assert client.get(f"/api/lecturas/{gas}", query_string={"max_puntos": 2}).status_code == 400
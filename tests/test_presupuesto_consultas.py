@@ -0,0 +1,61 @@
+"""
+Presupuestos de consultas de los endpoints más usados. El middleware estricto (ver
+conftest) hace fallar la prueba si una solicitud supera el presupuesto de su vista;
+además se comprueba el encabezado X-Consultas de cada respuesta.
+"""
+import pytest
+
+from database.connection import db
+from database.db_service import SENSOR_IDS
+from database.models.sensor import Sensor
+from services.ai_service import cargador_modelos
+from services.presupuesto_consultas import PresupuestoExcedido
+
+
+def _consultas(respuesta):
+    return int(respuesta.headers["X-Consultas"])
+
+
+def _registrar_lecturas(client, valores):
+    for sensor, valor in valores.items():
+        respuesta = client.post("/api/lecturas", json={"sensor_id": SENSOR_IDS[sensor], "valor": valor})
+        assert respuesta.status_code == 201, respuesta.get_json()
+
+
+def test_analizar(client, proceso_activo, registro_consultas):
+    _registrar_lecturas(client, {"temperatura": 36.5, "presion": 4.2, "gas": 900})
+    assert cargador_modelos.cargar() is not None, cargador_modelos.error
+
+    respuesta = client.get("/api/analizar")
+    assert respuesta.status_code == 200, respuesta.get_json()
+    assert _consultas(respuesta) <= 2
+
+
+def test_graficas(client, registro_consultas):
+    respuesta = client.get("/api/graficas")
+    assert respuesta.status_code == 200
+    assert _consultas(respuesta) <= 1
+
+
+def test_post_lecturas(client, proceso_activo, registro_consultas):
+    respuesta = client.post("/api/lecturas", json={"sensor_id": SENSOR_IDS["temperatura"], "valor": 36.5})
+    assert respuesta.status_code == 201, respuesta.get_json()
+    assert _consultas(respuesta) <= 8
+
+
+def test_finalizar_proceso(client, proceso_activo, registro_consultas):
+    _registrar_lecturas(client, {"temperatura": 36.5, "presion": 4.2, "gas": 900})
+
+    respuesta = client.post("/api/proceso/finalizar")
+    assert respuesta.status_code == 200, respuesta.get_json()
+    assert _consultas(respuesta) <= 8
+
+
+def test_detecta_n_mas_1(app, registro_consultas):
+    # N+1 deliberado: una consulta por sensor en lugar de una sola.
+    with app.app_context():
+        for sensor_id in SENSOR_IDS.values():
+            Sensor.query.filter_by(id=sensor_id).first()
+        db.session.remove()
+    with pytest.raises(PresupuestoExcedido, match="posible N\\+1"):
+        registro_consultas.verificar(maximo=1)